@@ -0,0 +1,254 @@
+"""
+Offline memory benchmark of the Tournaments participants and matches.
+
+The participants and matches of a synthetic bracket are built with the objects of the cog,
+storing their state in slots and reading the member from the guild's cache, and with a copy
+of the previous representation, copying the state of the member in an instance dict. The
+memory allocated, the number of objects tracked by the garbage collector and the duration of
+a full collection are compared.
+
+Each representation is built from lightweight fake members, then from real `discord.Member`
+objects, for which reading the attributes of the participants is also measured.
+
+Run from the root of the repository::
+
+    python -m benchmarks.bench_memory --players 2048 --output bench.json
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import shutil
+import tempfile
+import tracemalloc
+
+from copy import copy
+from functools import partial
+from typing import Tuple
+
+import discord
+
+from discord.state import ConnectionState
+
+from tournaments.objects import ChallongeMatch, ChallongeParticipant, Match
+
+from .bench_tournaments import (
+    BenchTournament,
+    build_tournament,
+    generate_bracket,
+    generate_guild,
+    setup_data_path,
+)
+from .common import measure, report, write_report
+
+
+class CopiedParticipant(discord.Member):
+    """
+    The previous representation of a participant, the state of the member is copied.
+    """
+
+    def __init__(self, member, tournament):
+        self._roles = discord.utils.SnowflakeList(member._roles, is_sorted=True)
+        self.joined_at = member.joined_at
+        self.premium_since = member.premium_since
+        self.client_status = copy(member.client_status)
+        self.guild = member.guild
+        self.nick = member.nick
+        self.activities = member.activities
+        self._state = member._state
+        self._user = member._user
+        self.tournament = tournament
+        self._player_id = None
+        self.elo = None
+        self.checked_in = False
+        self.match = None
+        self.spoke = False
+
+
+class CopiedMatch:
+    """
+    The previous representation of a match, with an instance dict.
+    """
+
+    def __init__(self, tournament, round, set, id, underway, player1, player2):
+        self.guild = tournament.guild
+        self.tournament = tournament
+        self.round = round
+        self.set = set
+        self.id = id
+        self.underway = underway
+        self.player1 = player1
+        self.player2 = player2
+        self._channel = None
+        self.start_time = None
+        self.end_time = None
+        self.status = "pending"
+        self.warned = None
+        self.streamer = None
+        self.on_hold = False
+        player1.match = self
+        player2.match = self
+        self.is_top8 = (
+            round >= tournament.top_8["winner"]["top8"]
+            or round <= tournament.top_8["loser"]["top8"]
+        )
+        self.is_bo5 = (
+            round >= tournament.top_8["winner"]["bo5"] or round <= tournament.top_8["loser"]["bo5"]
+        )
+        self.round_name = Match._get_name(self)
+        self.checked_dq = self.is_top8
+
+
+def use_discord_members(guild, roles: int, rng: random.Random):
+    """
+    Replace the fake members of the guild with `discord.Member` objects.
+    """
+    state = ConnectionState(dispatch=lambda *args: None, handlers={}, hooks={}, http=None)
+    for member_id, member in list(guild.members.items()):
+        data = {
+            "user": {
+                "id": str(member_id),
+                "username": member._user.name,
+                "discriminator": "0",
+                "avatar": None,
+                "global_name": None,
+            },
+            "roles": [str(x) for x in rng.sample(range(1000, 1100), roles)],
+            "joined_at": member.joined_at.isoformat(),
+            "flags": 0,
+        }
+        member = discord.Member(data=data, guild=guild, state=state)
+        guild.members[member_id] = guild.members_by_name[str(member)] = member
+
+
+def read(participants: list):
+    for participant in participants:
+        str(participant)
+        participant.display_name
+        participant.mention
+        participant.nick
+        participant.joined_at
+
+
+def build(
+    tournament, raw_participants, raw_matches, participant_cls, match_cls
+) -> Tuple[list, list]:
+    guild = tournament.guild
+    participants = {}
+    for data in raw_participants:
+        participant = participant_cls(guild.get_member_named(data["name"]), tournament)
+        participant._player_id = data["id"]
+        participants[data["id"]] = participant
+    matches = [
+        match_cls(
+            tournament,
+            data["round"],
+            str(i),
+            data["id"],
+            bool(data["underway_at"]),
+            participants[data["player1_id"]],
+            participants[data["player2_id"]],
+        )
+        for i, data in enumerate(raw_matches, start=1)
+        if data["player1_id"] and data["player2_id"]
+    ]
+    return list(participants.values()), matches
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.players < 4 or args.players & (args.players - 1):
+        raise ValueError("The number of players must be a power of two, at least 4.")
+    rng = random.Random(args.seed)
+    path = tempfile.mkdtemp(prefix="tournaments-bench-")
+    setup_data_path(path)
+
+    guild = generate_guild(args.players)
+    for member in guild.members.values():
+        member._roles = sorted(rng.sample(range(1000, 1100), args.roles))
+    raw_participants, raw_matches = generate_bracket(rng, args.players, args.complete)
+    BenchTournament.raw_participants = raw_participants
+    BenchTournament.raw_matches = raw_matches
+    tournament = build_tournament(guild)
+    representations = {
+        "records": (ChallongeParticipant, ChallongeMatch),
+        "copies": (CopiedParticipant, CopiedMatch),
+    }
+    results = {}
+    try:
+        tournament.phase = "ongoing"
+        await tournament._get_top8()
+        for kind in ("fake", "discord"):
+            if kind == "discord":
+                use_discord_members(guild, args.roles, rng)
+            for name, classes in representations.items():
+                results[f"{name}_{kind}"] = await run_representation(
+                    args, f"{name}_{kind}", tournament, raw_participants, raw_matches, classes
+                )
+    finally:
+        tournament.cancelling = True
+        shutil.rmtree(path, ignore_errors=True)
+
+    data = report("memory", args, results)
+    for kind in ("fake", "discord"):
+        data[f"ratio_{kind}"] = round(
+            results[f"copies_{kind}"]["bytes"] / results[f"records_{kind}"]["bytes"], 2
+        )
+    return data
+
+
+async def run_representation(
+    args: argparse.Namespace, name: str, tournament, raw_participants, raw_matches, classes
+) -> dict:
+    make = partial(build, tournament, raw_participants, raw_matches, *classes)
+
+    async def build_objects(i):
+        make()
+
+    timings = await measure(f"{name}_build", build_objects, args.repeat)
+    gc.collect()
+    tracked = len(gc.get_objects())
+    tracemalloc.start()
+    participants, matches = make()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracked = len(gc.get_objects()) - tracked
+
+    async def collect(i):
+        gc.collect()
+
+    result = {
+        "participants": len(participants),
+        "matches": len(matches),
+        "bytes": allocated,
+        "bytes_per_object": round(allocated / (len(participants) + len(matches)), 1),
+        "gc_tracked": tracked,
+        "build": timings,
+        "gc_collect": await measure(f"{name}_gc", collect, args.repeat),
+    }
+    if name.endswith("_discord"):
+        # the fake members only implement what building the objects needs
+
+        async def read_attributes(i):
+            read(participants)
+
+        result["read"] = await measure(f"{name}_read", read_attributes, args.repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--players", type=int, default=2048, help="a power of two")
+    parser.add_argument(
+        "--complete", type=float, default=0.75, help="part of complete first round sets"
+    )
+    parser.add_argument("--roles", type=int, default=3, help="roles of each member")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each measure")
+    parser.add_argument("--output", help="write the results in this file instead of stdout")
+    args = parser.parse_args()
+    write_report(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
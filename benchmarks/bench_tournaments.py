@@ -0,0 +1,340 @@
+"""
+Offline benchmarks for Tournaments.
+
+A Challonge tournament is driven with fake Discord objects and a synthetic double elimination
+bracket instead of the API, so no bot or network is needed. The bracket is generated half-way
+through the first round: most first round sets are complete, the others are open, and the
+following sets are open when both of their players are known.
+
+Run from the root of the repository::
+
+    python -m benchmarks.bench_tournaments --players 2048 --output bench.json
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import string
+import tempfile
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from redbot.core import data_manager
+
+from tournaments.objects import ChallongeTournament
+
+from .common import measure, report, write_report
+
+NOW = datetime(2024, 1, 1, 14, tzinfo=timezone.utc)
+
+
+# fake Discord objects, only what Participant and Match use
+
+
+class FakeUser:
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+        self.discriminator = "0"
+        self.bot = False
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", id: int, name: str):
+        self.guild = guild
+        self._user = FakeUser(id, name)
+        self._roles = []
+        self.client_status = {}
+        self._state = None
+        self.joined_at = NOW
+        self.premium_since = None
+        self.nick = None
+        self.activities = ()
+
+    @property
+    def id(self):
+        return self._user.id
+
+    def __str__(self):
+        return str(self._user)
+
+
+class FakeChannel:
+    def __init__(self, id: int):
+        self.id = id
+        self.mention = f"<#{id}>"
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class FakeGuild:
+    def __init__(self, id: int):
+        self.id = id
+        self.default_role = None
+        self.members: Dict[int, FakeMember] = {}
+        self.members_by_name: Dict[str, FakeMember] = {}
+        self.to_channel = FakeChannel(id + 1)
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self.members.get(member_id)
+
+    def get_member_named(self, name: str) -> Optional[FakeMember]:
+        return self.members_by_name.get(name)
+
+    def get_channel(self, channel_id: int):
+        return self.to_channel if channel_id == self.to_channel.id else None
+
+    def get_role(self, role_id: int):
+        return None
+
+
+class BenchTournament(ChallongeTournament):
+    """
+    Challonge tournament reading the bracket from memory instead of the API.
+    """
+
+    raw_participants: List[dict] = []
+    raw_matches: List[dict] = []
+
+    async def request(self, method, *args, **kwargs):
+        pass
+
+    async def list_participants(self):
+        return self.raw_participants
+
+    async def list_matches(self):
+        return self.raw_matches
+
+
+# synthetic data
+
+
+def get_identifier(number: int) -> str:
+    """
+    Opposite of the set number conversion of ChallongeMatch.build_from_api.
+    """
+    identifier = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        identifier = string.ascii_uppercase[remainder] + identifier
+    return identifier
+
+
+def generate_guild(players: int) -> FakeGuild:
+    guild = FakeGuild(100000000000000000)
+    for i in range(players):
+        member = FakeMember(guild, guild.id + 10 + i, f"player{i}")
+        guild.members[member.id] = member
+        guild.members_by_name[str(member)] = member
+    return guild
+
+
+def generate_bracket(rng: random.Random, players: int, complete: float):
+    """
+    Generate the participants and matches of a double elimination bracket, as returned by
+    Challonge. ``players`` must be a power of two.
+    """
+    participants = [
+        {"id": 5000000 + i, "name": f"player{i}", "active": True, "updated_at": NOW}
+        for i in range(players)
+    ]
+    ids = [x["id"] for x in participants]
+    rng.shuffle(ids)
+    matches = []
+
+    def add_match(round: int, player1: Optional[int], player2: Optional[int]) -> dict:
+        match = {
+            "id": 9000000 + len(matches),
+            "identifier": get_identifier(len(matches) + 1),
+            "round": round,
+            "player1_id": player1,
+            "player2_id": player2,
+            "state": "pending",
+            "winner_id": None,
+            "loser_id": None,
+            "scores_csv": "",
+            "underway_at": None,
+            "updated_at": NOW,
+        }
+        if player1 and player2:
+            match["state"] = "open"
+            if round == 1 and rng.random() < complete:
+                winner, loser = (player1, player2) if rng.random() < 0.5 else (player2, player1)
+                match.update(
+                    state="complete",
+                    winner_id=winner,
+                    loser_id=loser,
+                    scores_csv=rng.choice(("2-0", "2-1", "1-2", "0-2")),
+                )
+            elif rng.random() < 0.5:
+                match["underway_at"] = NOW.isoformat()
+        matches.append(match)
+        return match
+
+    # winners bracket
+    previous = [add_match(1, ids[i], ids[i + 1]) for i in range(0, players, 2)]
+    first_round = previous
+    round = 1
+    while len(previous) > 1:
+        round += 1
+        previous = [
+            add_match(round, previous[i]["winner_id"], previous[i + 1]["winner_id"])
+            for i in range(0, len(previous), 2)
+        ]
+    # losers bracket, the first round takes the losers of the first winners round
+    losers = [
+        add_match(-1, first_round[i]["loser_id"], first_round[i + 1]["loser_id"])
+        for i in range(0, len(first_round), 2)
+    ]
+    round = -1
+    while True:
+        round -= 1
+        losers = [add_match(round, None, None) for _ in losers]  # against winners bracket losers
+        if len(losers) == 1:
+            break
+        round -= 1
+        losers = [add_match(round, None, None) for _ in range(len(losers) // 2)]
+    # grand final
+    add_match(max(x["round"] for x in matches) + 1, None, None)
+    return participants, matches
+
+
+# runner
+
+
+def setup_data_path(path: str):
+    # Tournament.cancel removes its ranking folder from the cog's data path
+    data_manager.basic_config = {
+        "DATA_PATH": path,
+        "STORAGE_TYPE": "JSON",
+        "STORAGE_DETAILS": {},
+        "CORE_PATH_APPEND": "core",
+        "COG_PATH_APPEND": "cogs",
+    }
+    data_manager.instance_name = "benchmark"
+
+
+def build_tournament(guild: FakeGuild, cls=BenchTournament) -> BenchTournament:
+    config_data = {
+        "credentials": {"username": "benchmark", "api": "benchmark"},
+        "delay": 600,
+        "time_until_warn": {"bo3": (1500, 600), "bo5": (1800, 600)},
+        "autostop_register": False,
+        "register": {"opening": 0, "second_opening": 0, "closing": 0},
+        "checkin": {"opening": 0, "closing": 0},
+        "start_bo5": 0,
+        "channels": {"ruleset": None, "to": guild.to_channel.id},
+        "roles": {"player": None},
+        "baninfo": None,
+        "ranking": {"league_name": None, "league_id": None},
+        "stages": [],
+        "counterpicks": [],
+    }
+    return cls(
+        bot=None,
+        guild=guild,
+        config=None,
+        custom_config="default",
+        name="Benchmark",
+        game="Super Smash Bros. Ultimate",
+        url="https://challonge.com/benchmark",
+        id="12345678",
+        limit=None,
+        status="underway",
+        tournament_start=NOW,
+        bot_prefix="!",
+        cog_version="benchmark",
+        data=config_data,
+    )
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.players < 4 or args.players & (args.players - 1):
+        raise ValueError("The number of players must be a power of two, at least 4.")
+    rng = random.Random(args.seed)
+    path = tempfile.mkdtemp(prefix="tournaments-bench-")
+    setup_data_path(path)
+
+    guild = generate_guild(args.players)
+    participants, matches = generate_bracket(rng, args.players, args.complete)
+    BenchTournament.raw_participants = participants
+    BenchTournament.raw_matches = matches
+    tournament = build_tournament(guild)
+    results = {}
+    try:
+        await tournament._get_top8()
+        tournament.phase = "ongoing"
+
+        async def clear_participants(i):
+            tournament.participants = []
+
+        async def clear_matches(i):
+            tournament.matches = []
+
+        async def update_participants(i):
+            await tournament._update_participants_list()
+
+        async def update_matches(i):
+            await tournament._update_match_list()
+
+        # first tick of the tournament, nothing is cached
+        results["initial_participants"] = await measure(
+            "initial_participants", update_participants, args.repeat, setup=clear_participants
+        )
+        results["initial_matches"] = await measure(
+            "initial_matches", update_matches, args.repeat, setup=clear_matches
+        )
+        # following ticks, the bracket didn't change
+        results["tick_participants"] = await measure(
+            "tick_participants", update_participants, args.ticks
+        )
+        results["tick_matches"] = await measure("tick_matches", update_matches, args.ticks)
+
+        open_sets = list(tournament.matches)
+
+        async def find_match(i):
+            for j in range(args.lookups):
+                tournament.find_match(channel_id=guild.id + j)  # messages outside of sets
+            tournament.find_match(match_set=open_sets[i % len(open_sets)].set)
+
+        results["find_match"] = await measure("find_match", find_match, args.ticks)
+        sync = tournament.sync_stats.total
+        counts = {
+            "participants": len(participants),
+            "matches": len(matches),
+            "open_matches": sum(x["state"] == "open" for x in matches),
+            "cached_matches": len(tournament.matches),
+        }
+    finally:
+        tournament.cancelling = True
+        shutil.rmtree(path, ignore_errors=True)
+
+    data = report("tournaments", args, results)
+    data["bracket"] = counts
+    data["sync"] = sync
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--players", type=int, default=2048, help="a power of two")
+    parser.add_argument(
+        "--complete", type=float, default=0.75, help="part of complete first round sets"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the first tick")
+    parser.add_argument("--ticks", type=int, default=50, help="runs of the following ticks")
+    parser.add_argument("--lookups", type=int, default=1000, help="messages per find_match run")
+    parser.add_argument("--output", help="write the results in this file instead of stdout")
+    args = parser.parse_args()
+    write_report(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+"""
+Offline benchmarks for WarnSystem.
+
+The cog is driven with fake Discord objects (guild, members, channels, messages) and a
+real Red Config using the JSON driver in a temporary folder, so no bot or network is
+needed. Data is generated from a seed, results are printed as JSON with sorted keys to be
+compared between two commits.
+
+Run from the root of the repository::
+
+    python -m benchmarks.bench_warnsystem --members 5000 --cases 20000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import string
+import tempfile
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import discord
+
+from redbot.core import Config, _drivers, data_manager
+
+from warnsystem.api import API
+from warnsystem.cache import MemoryCache
+from warnsystem.converters import AdvancedMemberSelect
+from warnsystem.warnsystem import WarnSystem
+
+from .common import measure, report, write_report
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+WORDS = ["hello", "world", "discord", "spam", "raid", "nitro", "free", "link", "gg", "lol"]
+
+
+# fake Discord objects, only what WarnSystem uses
+
+
+class FakeAvatar:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+
+class FakeRole:
+    def __init__(self, id: int, name: str, position: int, permissions: int = 0):
+        self.id = id
+        self.name = name
+        self.position = position
+        self.permissions = discord.Permissions(permissions)
+        self.colour = self.color = discord.Colour.default()
+        self.mention = f"<@&{id}>"
+        self.managed = False
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMessage:
+    def __init__(self, id: int, channel, content: str = "", author=None, created_at=NOW):
+        self.id = id
+        self.channel = channel
+        self.guild = getattr(channel, "guild", None)
+        self.content = content
+        self.author = author
+        self.created_at = created_at
+
+
+class FakeChannel:
+    def __init__(self, id: int, guild: "FakeGuild", name: str = "modlog"):
+        self.id = id
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{id}>"
+        self.sent = 0
+
+    async def send(self, content=None, *, embed=None, delete_after=None):
+        self.sent += 1
+        return FakeMessage(self.guild.next_id(), self, content or "")
+
+    def permissions_for(self, member):
+        return discord.Permissions.all()
+
+
+class FakeMember(discord.Member):
+    # subclass for isinstance checks, the properties of discord.Member are shadowed by
+    # plain attributes and discord.Member.__init__ is never called
+    id = name = bot = roles = top_role = guild_permissions = mention = None
+    colour = color = display_avatar = activities = created_at = None
+
+    def __init__(self, id: int, guild: "FakeGuild", name: str, roles: List[FakeRole], **kwargs):
+        self.id = id
+        self.guild = guild
+        self._state = None
+        self.name = name
+        self.nick = kwargs.get("nick")
+        self.bot = kwargs.get("bot", False)
+        self.joined_at = kwargs.get("joined_at", NOW)
+        self.created_at = kwargs.get("created_at", NOW)
+        self.activities = ()
+        self.roles = [guild.default_role] + sorted(roles, key=lambda x: x.position)
+        self._roles = [x.id for x in roles]
+        self.top_role = self.roles[-1]
+        permissions = 0
+        for role in self.roles:
+            permissions |= role.permissions.value
+        self.guild_permissions = discord.Permissions(permissions)
+        self.display_avatar = FakeAvatar()
+        self.colour = self.color = discord.Colour.default()
+        self.mention = f"<@{id}>"
+
+    @property
+    def display_name(self):
+        return self.nick or self.name
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.guild.get_role(role_id) if role_id in self._roles else None
+
+    async def send(self, *args, **kwargs):
+        return None
+
+    async def add_roles(self, *roles, reason=None):
+        pass
+
+    async def remove_roles(self, *roles, reason=None):
+        pass
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return isinstance(other, FakeMember) and other.id == self.id
+
+    def __hash__(self):
+        return self.id >> 22
+
+
+class FakeGuild:
+    def __init__(self, id: int):
+        self.id = id
+        self.name = "Benchmark server"
+        self._state = None
+        self._next_id = id
+        self.default_role = FakeRole(id, "@everyone", 0, discord.Permissions.general().value)
+        self.roles: Dict[int, FakeRole] = {id: self.default_role}
+        self.members: List[FakeMember] = []
+        self.channels: Dict[int, FakeChannel] = {}
+        self.me: FakeMember = None
+        self.mute_role: FakeRole = None
+        self.owner_id = 0
+
+    def next_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.roles.get(role_id)
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self._members.get(member_id)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+    @property
+    def text_channels(self):
+        return list(self.channels.values())
+
+    async def kick(self, member, *, reason=None):
+        pass
+
+    async def ban(self, member, *, reason=None, delete_message_seconds=0):
+        pass
+
+    async def unban(self, member, *, reason=None):
+        pass
+
+    async def create_invite(self, **kwargs):
+        return "https://discord.gg/benchmark"
+
+
+class FakeBot:
+    def __init__(self, guild: FakeGuild):
+        self.guild = guild
+        self.user = guild.me
+        self.cogs = {}
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+    def get_user(self, user_id: int):
+        return self.guild.get_member(user_id)
+
+    def get_channel(self, channel_id: int):
+        return self.guild.get_channel(channel_id)
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def dispatch(self, event: str, *args, **kwargs):
+        pass
+
+    async def is_automod_immune(self, to_check) -> bool:
+        return False
+
+    async def is_mod(self, member) -> bool:
+        return False
+
+    async def is_owner(self, user) -> bool:
+        return False
+
+
+class FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeContext:
+    def __init__(self, bot: FakeBot, guild: FakeGuild):
+        self.bot = bot
+        self.guild = guild
+        self.author = guild.me
+
+    def typing(self):
+        return FakeTyping()
+
+
+# synthetic data
+
+
+def generate_guild(rng: random.Random, n_members: int, n_roles: int) -> FakeGuild:
+    guild = FakeGuild(100000000000000000)
+    perms = [
+        discord.Permissions.none().value,
+        discord.Permissions(kick_members=True).value,
+        discord.Permissions(manage_messages=True, mute_members=True).value,
+    ]
+    for position in range(1, n_roles + 1):
+        role = FakeRole(guild.next_id(), f"role-{position}", position, rng.choice(perms))
+        guild.roles[role.id] = role
+    roles = list(guild.roles.values())[1:]
+    guild.mute_role = FakeRole(guild.next_id(), "Muted", 1)
+    guild.roles[guild.mute_role.id] = guild.mute_role
+    bot_role = FakeRole(guild.next_id(), "bot", n_roles + 1, discord.Permissions.all().value)
+    guild.roles[bot_role.id] = bot_role
+    guild.me = FakeMember(guild.next_id(), guild, "WarnSystem", [bot_role], bot=True)
+    members = [guild.me]
+    for i in range(n_members):
+        name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+        members.append(
+            FakeMember(
+                guild.next_id(),
+                guild,
+                name,
+                rng.sample(roles, k=rng.randint(0, min(5, len(roles)))),
+                nick=name.upper() if rng.random() < 0.3 else None,
+                bot=rng.random() < 0.02,
+                joined_at=NOW - timedelta(seconds=rng.randint(0, 3 * 365 * 86400)),
+            )
+        )
+    guild.members = members
+    guild._members = {x.id: x for x in members}
+    channel = FakeChannel(guild.next_id(), guild)
+    guild.channels[channel.id] = channel
+    return guild
+
+
+def generate_modlogs(
+    rng: random.Random, guild: FakeGuild, n_cases: int, n_moderators: int
+) -> Dict[str, dict]:
+    members = guild.members[1:]
+    # moderators and part of the warned members left the server
+    moderators = [m.id for m in rng.sample(members, k=min(n_moderators, len(members)))]
+    moderators += [guild.next_id() for _ in range(n_moderators // 3)]
+    targets = [m.id for m in members] + [guild.next_id() for _ in range(len(members) // 2)]
+    modlogs = {}
+    for _ in range(n_cases):
+        member_id = rng.choice(targets)
+        level = rng.choice((1, 1, 1, 2, 3, 4, 5))
+        case = {
+            "level": level,
+            "author": rng.choice(moderators),
+            "reason": " ".join(rng.choices(WORDS, k=rng.randint(1, 12))),
+            "time": int((NOW - timedelta(seconds=rng.randint(0, 365 * 86400))).timestamp()),
+            "duration": rng.choice((None, 3600)) if level in (2, 5) else None,
+            "roles": [],
+        }
+        modlogs.setdefault(str(member_id), {"x": []})["x"].append(case)
+    for logs in modlogs.values():
+        logs["x"].sort(key=lambda x: x["time"])
+    return modlogs
+
+
+def generate_regex(rng: random.Random, n_regex: int) -> Dict[str, dict]:
+    # patterns which never match the generated messages, so no warning is triggered
+    return {
+        f"regex-{i}": {
+            "regex": rf"\b{rng.choice(WORDS)}{i}[0-9]{{3,}}\b",
+            "level": 1,
+            "time": None,
+            "reason": "Automod regex",
+        }
+        for i in range(n_regex)
+    }
+
+
+def generate_autowarns(rng: random.Random, n_autowarns: int) -> List[dict]:
+    # thresholds with and without time limit, some locked to a level or to the automod
+    return [
+        {
+            "level": rng.choice((0, 0, 1, 2)),
+            "number": rng.randint(2, 6),
+            "time": rng.choice((None, 3600, 86400, 7 * 86400, 30 * 86400)),
+            "automod_only": rng.random() < 0.2,
+            "warn": {
+                "level": rng.choice((2, 3, 5)),
+                "reason": "Autowarn",
+                "duration": rng.choice((None, 3600)),
+            },
+        }
+        for _ in range(n_autowarns)
+    ]
+
+
+def generate_messages(rng: random.Random, guild: FakeGuild, n_messages: int) -> List[FakeMessage]:
+    channel = guild.text_channels[0]
+    humans = [x for x in guild.members if not x.bot]
+    return [
+        FakeMessage(
+            guild.next_id(),
+            channel,
+            " ".join(rng.choices(WORDS, k=rng.randint(1, 30))),
+            rng.choice(humans),
+            NOW + timedelta(seconds=i),
+        )
+        for i in range(n_messages)
+    ]
+
+
+# runner
+
+
+def setup_config(path: str) -> Config:
+    data_manager.basic_config = {
+        "DATA_PATH": path,
+        "STORAGE_TYPE": "JSON",
+        "STORAGE_DETAILS": {},
+        "CORE_PATH_APPEND": "core",
+        "COG_PATH_APPEND": "cogs",
+    }
+    data_manager.instance_name = "benchmark"
+    config = Config.get_conf(None, 260, cog_name="WarnSystem", force_registration=True)
+    config.register_global(**WarnSystem.default_global)
+    config.register_guild(**WarnSystem.default_guild)
+    config.init_custom("MODLOGS", 2)
+    config.register_custom("MODLOGS", **WarnSystem.default_custom_member)
+    return config
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    path = tempfile.mkdtemp(prefix="warnsystem-bench-")
+    config = setup_config(path)
+    await _drivers.get_driver_class(_drivers.BackendType.JSON).initialize()
+
+    guild = generate_guild(rng, args.members, args.roles)
+    bot = FakeBot(guild)
+    cache = MemoryCache(bot, config)
+    api = API(bot, config, cache)
+    bot.cogs["WarnSystem"] = type("WarnSystem", (), {"api": api})()
+    results = {}
+    try:
+        guild_config = config.guild(guild)
+        await guild_config.channels.main.set(guild.text_channels[0].id)
+        await config.custom("MODLOGS", guild.id).set(
+            generate_modlogs(rng, guild, args.cases, args.moderators)
+        )
+        await cache.update_mute_role(guild, guild.mute_role)
+        await guild_config.automod.enabled.set(True)
+        cache.automod_enabled.append(guild.id)
+        await guild_config.automod.warnings.set(generate_autowarns(rng, args.autowarns))
+        await guild_config.automod.antispam.set_raw("enabled", value=True)
+        await guild_config.automod.antispam.set_raw("max_messages", value=10**9)
+        await guild_config.automod.antispam.set_raw(
+            "whitelist",
+            value=[
+                "".join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(args.whitelist)
+            ],
+        )
+        await guild_config.automod.regex.set(generate_regex(rng, args.regex))
+        messages = generate_messages(rng, guild, args.messages)
+        humans = [x for x in guild.members if not x.bot]
+
+        async def warn(i):
+            await api.warn(
+                guild, [humans[i % len(humans)]], guild.me, 1, "Benchmark", automod=False
+            )
+
+        results["warn"] = await measure("warn", warn, args.warns)
+
+        async def get_all_cases(i):
+            await api.get_all_cases(guild)
+
+        results["get_all_cases"] = await measure("get_all_cases", get_all_cases, args.repeat)
+
+        async def autowarn_check(i):
+            await api._automod_check_for_autowarn(guild, humans[i % len(humans)], guild.me, 1)
+
+        results["automod_check_for_autowarn"] = await measure(
+            "automod_check_for_autowarn", autowarn_check, min(args.warns, len(humans))
+        )
+
+        async def antispam(i):
+            await api.automod_process_antispam(messages[i])
+
+        results["automod_process_antispam"] = await measure(
+            "automod_process_antispam", antispam, len(messages)
+        )
+
+        async def regex(i):
+            await api.automod_process_regex(messages[i])
+
+        results["automod_process_regex"] = await measure(
+            "automod_process_regex", regex, min(len(messages), args.regex_messages)
+        )
+
+        ctx = FakeContext(bot, guild)
+        role = list(guild.roles.values())[1]
+        selections = {
+            "everyone": ["--everyone"],
+            "name_regex": ["--name", "^[a-f].*[aeiou]$"],
+            "has_role": ["--has-role", str(role.id)],
+            "joined_after": ["--joined-after", "1", "June", "2023"],
+            "last_njoins": ["--last-njoins", "100", "--only-humans"],
+            "combined": ["--has-any-perm", "kick_members", "--has-more-than-nroles", "1"],
+        }
+        for name, selection in selections.items():
+
+            async def select(i, selection=selection):
+                await AdvancedMemberSelect().convert(ctx, selection + ["--send-modlog"])
+
+            results[f"member_select_{name}"] = await measure(
+                f"member_select_{name}", select, args.repeat
+            )
+    finally:
+        api.re_pool.close()
+        api.autowarn_queue.stop()
+        api.antispam_warn_queue.stop()
+        shutil.rmtree(path, ignore_errors=True)
+
+    return report("warnsystem", args, results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--members", type=int, default=2000, help="members in the guild")
+    parser.add_argument("--roles", type=int, default=50, help="roles in the guild")
+    parser.add_argument("--cases", type=int, default=10000, help="cases in the modlog")
+    parser.add_argument("--moderators", type=int, default=30, help="authors of the cases")
+    parser.add_argument("--autowarns", type=int, default=5, help="automatic warns configured")
+    parser.add_argument("--regex", type=int, default=10, help="automod regex rules")
+    parser.add_argument("--whitelist", type=int, default=100, help="antispam whitelisted words")
+    parser.add_argument("--messages", type=int, default=2000, help="messages for the automod")
+    parser.add_argument("--regex-messages", type=int, default=200, help="messages for regex")
+    parser.add_argument("--warns", type=int, default=200, help="warnings given")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the heavy benchmarks")
+    parser.add_argument("--output", help="write the results in this file instead of stdout")
+    args = parser.parse_args()
+
+    write_report(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
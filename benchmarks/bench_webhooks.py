@@ -0,0 +1,150 @@
+"""
+Offline benchmark of the Tournaments webhook receiver.
+
+The receiver is started on the loopback interface and a stand-in for Challonge posts fake
+webhooks to it, one for each set finished on the website. The bracket and the Discord objects
+are the same as the Tournaments benchmark, the API is read from memory.
+
+Run from the root of the repository::
+
+    python -m benchmarks.bench_webhooks --players 2048 --output bench.json
+"""
+
+import aiohttp
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+
+from datetime import timedelta
+
+import achallonge
+
+from tournaments.webhooks import WebhookReceiver
+
+from .bench_tournaments import (
+    NOW,
+    BenchTournament,
+    build_tournament,
+    generate_bracket,
+    generate_guild,
+    setup_data_path,
+)
+from .common import measure, report, write_report
+
+
+class WebhookTournament(BenchTournament):
+    """
+    Benchmark tournament also answering single match requests. Launching sets and saving
+    are Discord and Config work, left out of the measures.
+    """
+
+    raw_matches_by_id = {}
+
+    async def request(self, method, *args, **kwargs):
+        if method is achallonge.matches.show:
+            return self.raw_matches_by_id[args[1]]
+        return await super().request(method, *args, **kwargs)
+
+    async def launch_sets(self):
+        pass
+
+    async def save(self):
+        pass
+
+
+class FakeCog:
+    def __init__(self, tournament: WebhookTournament):
+        self.tournaments = {tournament.guild.id: tournament}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.players < 4 or args.players & (args.players - 1):
+        raise ValueError("The number of players must be a power of two, at least 4.")
+    rng = random.Random(args.seed)
+    path = tempfile.mkdtemp(prefix="tournaments-bench-")
+    setup_data_path(path)
+
+    guild = generate_guild(args.players)
+    participants, matches = generate_bracket(rng, args.players, args.complete)
+    WebhookTournament.raw_participants = participants
+    WebhookTournament.raw_matches = matches
+    WebhookTournament.raw_matches_by_id = {x["id"]: x for x in matches}
+    tournament = build_tournament(guild, WebhookTournament)
+    receiver = WebhookReceiver(FakeCog(tournament), "benchmark")
+    results = {}
+    try:
+        await tournament._get_top8()
+        tournament.phase = "ongoing"
+        await tournament._update_participants_list()
+        await tournament._update_match_list()
+        open_sets = [x for x in tournament.matches if x.status == "pending"]
+        if len(open_sets) < args.webhooks:
+            raise ValueError(f"Only {len(open_sets)} open sets, lower --webhooks.")
+        # the first sets of the list are played
+        for match in open_sets[: args.webhooks]:
+            match.status = "ongoing"
+
+        # webhooks are ignored while the loop task is paused, pretend it is running
+        tournament.task = asyncio.get_running_loop().create_future()
+
+        await receiver.start("127.0.0.1", 0)
+        port = receiver.runner.addresses[0][1]
+        url = f"http://127.0.0.1:{port}{receiver.get_path(guild.id)}"
+        session = aiohttp.ClientSession()
+
+        async def score_set(i):
+            # score set on the website, Challonge updates the match
+            raw_match = WebhookTournament.raw_matches_by_id[open_sets[i].id]
+            raw_match.update(
+                state="complete",
+                winner_id=raw_match["player1_id"],
+                loser_id=raw_match["player2_id"],
+                scores_csv="2-1",
+                updated_at=NOW + timedelta(seconds=i + 1),
+            )
+
+        async def post_webhook(i):
+            # from the webhook to the set ended on Discord
+            payload = {"match": {"id": open_sets[i].id, "tournament_id": tournament.id}}
+            async with session.post(url, json=payload) as response:
+                assert response.status == 202, response.status
+            await asyncio.gather(*receiver.tasks)
+
+        results["webhook"] = await measure("webhook", post_webhook, args.webhooks, setup=score_set)
+        ended = sum(x.status == "finished" for x in open_sets[: args.webhooks])
+        if ended != args.webhooks:
+            raise RuntimeError(f"Only {ended} of {args.webhooks} sets were ended.")
+
+        # requests the stand-in must not be able to make
+        async with session.post(url.rsplit("/", 1)[0] + "/" + "0" * 32, json={}) as response:
+            rejected = {"bad_token": response.status}
+        async with session.post(url, data=b"not json") as response:
+            rejected["bad_body"] = response.status
+        await session.close()
+    finally:
+        await receiver.stop()
+        tournament.cancelling = True
+        shutil.rmtree(path, ignore_errors=True)
+
+    data = report("webhooks", args, results)
+    data["rejected"] = rejected
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--players", type=int, default=2048, help="a power of two")
+    parser.add_argument(
+        "--complete", type=float, default=0.75, help="part of complete first round sets"
+    )
+    parser.add_argument("--webhooks", type=int, default=50, help="sets scored on the website")
+    parser.add_argument("--output", help="write the results in this file instead of stdout")
+    args = parser.parse_args()
+    write_report(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Helpers shared by the benchmarks.
+"""
+
+import json
+import platform
+import sys
+import time
+
+from typing import Awaitable, Callable, Dict, Optional
+
+import discord
+
+
+async def measure(
+    name: str,
+    func: Callable[[int], Awaitable[None]],
+    iterations: int,
+    *,
+    setup: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> Dict[str, float]:
+    """
+    Run ``func`` the given number of times and return the statistics of the timings.
+
+    ``setup`` is called before each run and is not measured.
+    """
+    timings = []
+    for i in range(iterations):
+        if setup is not None:
+            await setup(i)
+        start = time.perf_counter()
+        await func(i)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    total = sum(timings)
+    result = {
+        "iterations": iterations,
+        "total_s": round(total, 6),
+        "mean_ms": round(total / iterations * 1000, 4),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 4),
+        "max_ms": round(timings[-1] * 1000, 4),
+    }
+    print(f"{name}: {result['mean_ms']}ms mean over {iterations} runs", file=sys.stderr)
+    return result
+
+
+def report(name: str, args, results: dict) -> dict:
+    return {
+        "benchmark": name,
+        "params": {k: v for k, v in sorted(vars(args).items()) if k != "output"},
+        "python": platform.python_version(),
+        "discord.py": discord.__version__,
+        "results": results,
+    }
+
+
+def write_report(data: dict, output: Optional[str] = None):
+    text = json.dumps(data, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
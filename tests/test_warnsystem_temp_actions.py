@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from warnsystem.api import API
+from warnsystem.cache import MemoryCache
+
+
+class FakeConfig:
+    async def all_guilds(self):
+        return {}
+
+
+class FakeMember:
+    def __init__(self, id: int, guild: "FakeGuild"):
+        self.id = id
+        self.guild = guild
+
+    def __str__(self):
+        return f"member-{self.id}"
+
+
+class FakeGuild:
+    def __init__(self, id: int):
+        self.id = id
+        self._state = None
+        self.members = {}
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    def get_role(self, role_id):
+        return None
+
+
+class FakeBot:
+    def __init__(self, guild: FakeGuild):
+        self.guilds = [guild]
+
+
+def make_action(level: int = 2) -> dict:
+    return {
+        "level": level,
+        "author": 1,
+        "reason": "Test",
+        "time": int(time.time()) - 3600,
+        "duration": 60,
+        "roles": [],
+    }
+
+
+def test_check_endwarn_with_changes_during_unmute(tmp_path):
+    """
+    Listeners add and remove temporary actions while the loop is unmuting a member.
+    """
+
+    async def run():
+        guild = FakeGuild(100)
+        for member_id in range(10, 15):
+            guild.members[member_id] = FakeMember(member_id, guild)
+        cache = MemoryCache(None, FakeConfig())
+        await cache.init_temp_actions(tmp_path / "journal")
+        for member_id in (10, 11, 12):
+            await cache.add_temp_action(guild, guild.members[member_id], make_action())
+
+        api = API.__new__(API)
+        api.bot = FakeBot(guild)
+        api.cache = cache
+        unmuted = []
+
+        async def unmute(member, reason, old_roles=None):
+            unmuted.append(member.id)
+            if member.id == 10:
+                # on_member_update removes a manually unmuted member, new mutes are added
+                await cache.remove_temp_action(guild, guild.members[11])
+                await cache.add_temp_action(guild, guild.members[13], make_action())
+                await cache.add_temp_action(guild, guild.members[14], make_action())
+            await asyncio.sleep(0)
+
+        api._unmute = unmute
+        await api._check_endwarn()
+        cache.temp_actions_journal.close()
+        return unmuted, await cache.get_temp_action(guild)
+
+    unmuted, remaining = asyncio.run(run())
+    assert unmuted == [10, 12]
+    assert sorted(remaining) == ["13", "14"]
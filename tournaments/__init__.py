@@ -125,6 +125,10 @@ async def update_config(config):
 async def restore_tournaments(bot, cog):
     await bot.wait_until_ready()
     await cog.restore_tournaments()
+    try:
+        await cog.start_webhook_receiver()
+    except Exception as e:
+        log.error("Failed to start the webhook receiver.", exc_info=e)
 
 
 def check_for_aiodns():
@@ -6,6 +6,7 @@ from .objects import Tournament
 if TYPE_CHECKING:
     from redbot.core.bot import Red
     from .tournaments import TournamentsConfig
+    from .webhooks import WebhookReceiver
 
 
 class MixinMeta(ABC):
@@ -21,6 +22,7 @@ class MixinMeta(ABC):
         self.bot: Red
         self.data: TournamentsConfig
         self.tournaments: Mapping[int, Tournament]
+        self.webhook: Optional[WebhookReceiver]
         self.__version__: str
 
     def _restore_tournament(self, guild: discord.Guild, data: dict = None) -> Tournament:
@@ -28,3 +30,9 @@ class MixinMeta(ABC):
 
     async def _get_settings(self, guild_id: int, config: Optional[str]) -> dict:
         pass
+
+    async def start_webhook_receiver(self):
+        pass
+
+    async def stop_webhook_receiver(self):
+        pass
@@ -0,0 +1,121 @@
+import achallonge
+import aiohttp
+import asyncio
+import logging
+
+from typing import Awaitable, Callable, ClassVar, Dict, Hashable, Optional, Tuple
+
+from .utils import CircuitBreaker, TokenBucket, async_http_retry
+
+log = logging.getLogger("red.laggron.tournaments")
+
+
+class ChallongeClient:
+    """
+    Sends the requests of all tournaments using the same Challonge account.
+
+    There is one client per credentials pair, shared between servers, so they share:
+
+    *   A HTTP session, keeping connections to Challonge open between requests
+    *   A `TokenBucket` limiting the rate of requests sent to Challonge
+    *   A `CircuitBreaker`, pausing requests during an outage
+    *   The requests in flight: if the same read request is made while the first one is
+        still waiting for its response, they both get the same response
+
+    Use `ChallongeClient.get` instead of creating an instance.
+
+    Parameters
+    ----------
+    credentials: dict
+        The ``login`` and ``password`` (API key) of the Challonge account.
+    """
+
+    # requests per second, and burst size
+    rate: ClassVar[float] = 5
+    burst: ClassVar[int] = 20
+
+    clients: ClassVar[Dict[Tuple[str, str], "ChallongeClient"]] = {}
+
+    def __init__(self, credentials: dict):
+        self.auth = aiohttp.BasicAuth(credentials["login"], credentials["password"])
+        self.bucket = TokenBucket(self.rate, self.burst)
+        self.breaker = CircuitBreaker()
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def get(cls, credentials: dict) -> "ChallongeClient":
+        """
+        Return the client of these credentials, created if needed.
+        """
+        key = (credentials["login"], credentials["password"])
+        try:
+            return cls.clients[key]
+        except KeyError:
+            client = cls.clients[key] = cls(credentials)
+            return client
+
+    @classmethod
+    async def close_all(cls):
+        """
+        Close the sessions of all clients. Called on cog unload.
+        """
+        clients = list(cls.clients.values())
+        cls.clients.clear()
+        for client in clients:
+            await client.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                auth=self.auth, timeout=aiohttp.ClientTimeout(total=achallonge.api.TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(
+        self,
+        factory: Callable[[], Awaitable],
+        *,
+        key: Optional[Hashable] = None,
+        retries: int = 3,
+    ):
+        """
+        Send a request, waiting for the rate limit. See `async_http_retry` for the errors.
+
+        Parameters
+        ----------
+        factory: Callable[[], Awaitable]
+            A function creating the request, called for each attempt.
+        key: Optional[Hashable]
+            Identifies a read request. If a request with the same key is in flight, its
+            response is shared instead of sending a new request.
+        retries: int
+            Number of retries after the first attempt.
+        """
+        if key is None:
+            return await self._send(factory, retries)
+        future = self.in_flight.get(key)
+        if future is None:
+            future = self.in_flight[key] = asyncio.ensure_future(self._send(factory, retries))
+            future.add_done_callback(lambda x: self._forget(key, x))
+        # the result is shared, don't modify it
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self.in_flight.get(key) is future:
+            del self.in_flight[key]
+        if not future.cancelled():
+            future.exception()  # the callers may be gone, don't warn about it
+
+    async def _send(self, factory: Callable[[], Awaitable], retries: int):
+        async def attempt():
+            await self.bucket.acquire()
+            return await factory()
+
+        return await async_http_retry(attempt, breaker=self.breaker, retries=retries)
@@ -775,8 +775,8 @@ you want the bot to override the previous list of participants, type `[p]upload
         #     return
         if ctx.author.id == player.match.player2.id:
             score = score[::-1]  # player1-player2 format
-        async with tournament.lock:
-            pass  # don't update scores while cache is being updated
+        # no need to wait for the lock, the loop won't check this match on the bracket until
+        # the score is uploaded
         await player.match.end(*score)
         await ctx.tick()
 
@@ -1,5 +1,7 @@
 from __future__ import annotations
 from copy import copy
+from operator import attrgetter
+from types import MemberDescriptorType as member_descriptor
 
 import discord
 import logging
@@ -11,13 +13,14 @@ import aiofiles.os
 import filecmp
 import csv
 import shutil
+import time
 
 from discord.ext import tasks
 from random import choice, shuffle
 from itertools import islice
 from datetime import datetime, timedelta, timezone
 from babel.dates import format_date, format_time
-from typing import Mapping, Optional, Tuple, List, Union
+from typing import Dict, Mapping, Optional, Tuple, List, Union
 
 from redbot import __version__ as red_version
 from redbot.core import Config
@@ -26,25 +29,157 @@ from redbot.core.i18n import Translator, get_babel_locale, set_contextual_locale
 from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.chat_formatting import humanize_timedelta, pagify
 
+from ..utils import CircuitOpenError, is_temporary_error
+
 log = logging.getLogger("red.laggron.tournaments")
 _ = Translator("Tournaments", __file__)
 
 MAX_ERRORS = 5
 TIME_UNTIL_CHANNEL_DELETION = 300
 TIME_UNTIL_TIMEOUT_DQ = 300
+# seconds between two refreshes of the whole bracket once webhooks are received
+WEBHOOK_SAFETY_INTERVAL = 300
+
+
+class _TrackedList(list):
+    """
+    A list counting its modifications, so the lookup indexes built from it know when they must
+    be rebuilt.
+    """
+
+    __slots__ = ("version",)
+
+    def __init__(self, iterable=()):
+        super().__init__(iterable)
+        self.version = 0
+
+
+def _tracked(name: str):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(_TrackedList, _name, _tracked(_name))
+del _name
+
+
+def _saved_slots(*names: str) -> Tuple[str, ...]:
+    """
+    Slots of a `_SavedRecord` subclass: the cache, and the storage of its ``saved_attributes``.
+    """
+    return ("_saved_dict", *(f"_saved_{x}" for x in names))
+
+
+def _saved_property(slot: member_descriptor) -> property:
+    set_slot = slot.__set__
 
+    def setter(self, value):
+        set_slot(self, value)
+        self._saved_dict = None
+
+    return property(slot.__get__, setter)
+
+
+class _SavedRecord:
+    """
+    Caches the result of ``to_dict`` until one of the ``saved_attributes`` is modified, so
+    saving a tournament doesn't serialize the participants and matches that didn't change.
+    Saved data that can't be modified after creation doesn't have to be listed.
 
-class Participant(discord.Member):
+    Subclasses declare their slots with `_saved_slots`. The saved attributes are properties
+    reading these slots without calling Python code, only modifying them clears the cache.
+    """
+
+    __slots__ = ()
+
+    saved_attributes: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.__dict__.get("saved_attributes", ()):
+            setattr(cls, name, _saved_property(cls.__dict__[f"_saved_{name}"]))
+
+    @property
+    def dirty(self) -> bool:
+        """
+        If the object was modified since it was last saved.
+        """
+        return getattr(self, "_saved_dict", None) is None
+
+    def saved_dict(self) -> dict:
+        """
+        Same as ``to_dict``, cached. Don't modify the result.
+        """
+        data = getattr(self, "_saved_dict", None)
+        if data is None:
+            data = self._saved_dict = self.to_dict()
+        return data
+
+
+class SyncStats:
+    """
+    Counters of the synchronization with the bracket, for the last loop tick and in total.
+
+    Counters are ``requests`` (API calls listing participants or matches), ``not_modified``
+    (requests answered with no new data), ``bytes`` (size of the received data),
+    ``processed`` (participants and matches created or checked for changes), ``skipped``
+    (participants and matches unchanged since the previous tick) and ``outdated``
+    (participants and matches left as is, the bot modified them during the requests).
+    """
+
+    __slots__ = ("ticks", "last", "total")
+
+    keys = ("requests", "not_modified", "bytes", "processed", "skipped", "outdated")
+
+    def __init__(self):
+        self.ticks = 0
+        self.last = dict.fromkeys(self.keys, 0)
+        self.total = dict.fromkeys(self.keys, 0)
+
+    def new_tick(self):
+        self.ticks += 1
+        self.last = dict.fromkeys(self.keys, 0)
+
+    def add(self, key: str, value: int = 1):
+        self.last[key] += value
+        self.total[key] += value
+
+
+class Participant(_SavedRecord, discord.Member):
     """
     Defines a participant in the tournament.
 
-    This inherits from `discord.Member` and adds the necessary additional methods.
+    This inherits from `discord.Member` and adds the necessary additional methods. Only the
+    user and the guild are stored, the rest of the member's state (roles, nickname, status...)
+    is read from the guild's cache when needed, see `member`.
 
     If you're implementing this for a new provider, the following methods need to be implemented:
 
     *   `player_id` (may be a var or a property)
     *   `destroy`
 
+    Participants use ``__slots__``, new attributes must be declared in the subclass's slots.
+
     Parameters
     ----------
     member: discord.Member
@@ -55,7 +190,8 @@ class Participant(discord.Member):
     Attributes
     ----------
     member: discord.Member
-        The member participating to the tournament
+        The member participating to the tournament, from the guild's cache. If they left the
+        server, the member object given on creation.
     tournament: Tournament
         The current tournament
     elo: int
@@ -68,18 +204,14 @@ class Participant(discord.Member):
         Defines if the member spoke once in their channel (used for AFK check)
     """
 
+    saved_attributes = ("_player_id", "spoke", "checked_in")
+    __slots__ = (*_saved_slots(*saved_attributes), "_member", "tournament", "elo", "match")
+
     def __init__(self, member: discord.Member, tournament: Tournament):
-        # code from discord.Member._copy
-        self._roles = discord.utils.SnowflakeList(member._roles, is_sorted=True)
-        self.joined_at = member.joined_at
-        self.premium_since = member.premium_since
-        self._client_status = member._client_status.copy()
-        self.guild = member.guild
-        self.nick = member.nick
-        self.activities = member.activities
-        self._state = member._state
-        # Reference will not be copied unless necessary by PRESENCE_UPDATE
+        # the other attributes of discord.Member are read from the cached member
         self._user = member._user
+        self.guild = member.guild
+        self._member = member
         # now our own stuff
         self.tournament = tournament
         self._player_id = None
@@ -95,6 +227,10 @@ class Participant(discord.Member):
             "tournament_id={0.tournament.id} spoke={0.spoke}>"
         ).format(self, self._user)
 
+    @property
+    def member(self) -> discord.Member:
+        return self.guild.get_member(self._user.id) or self._member
+
     @classmethod
     def from_saved_data(cls, tournament: Tournament, data: dict):
         member = tournament.guild.get_member(data["discord_id"])
@@ -127,7 +263,7 @@ class Participant(discord.Member):
         Checks the member in.
 
         In addition to changing the `checked_in` attribute, it also DMs the member
-        and saves the config.
+        and saves the list of participants.
         """
         self.checked_in = True
         log.debug(f"[Guild {self.guild.id}] Player {self} registered.")
@@ -161,7 +297,13 @@ class Participant(discord.Member):
         raise NotImplementedError
 
 
-class Match:
+for _name in discord.Member.__slots__:
+    if _name not in ("_user", "guild"):
+        setattr(Participant, _name, property(attrgetter(f"member.{_name}")))
+del _name
+
+
+class Match(_SavedRecord):
     """
     Defines a match in the tournament, with two players facing each other.
 
@@ -174,6 +316,8 @@ class Match:
     *   `mark_as_underway`
     *   `unmark_as_underway` (unused for now)
 
+    Matches use ``__slots__``, new attributes must be declared in the subclass's slots.
+
     Parameters
     ----------
     tournament: Tournament
@@ -245,6 +389,31 @@ class Match:
         AFK checks for this match.
     """
 
+    # the other saved attributes are never modified after creation
+    saved_attributes = (
+        "underway",
+        "_channel",
+        "start_time",
+        "end_time",
+        "status",
+        "checked_dq",
+        "warned",
+        "on_hold",
+    )
+    __slots__ = (
+        *_saved_slots(*saved_attributes),
+        "tournament",
+        "round",
+        "set",
+        "id",
+        "player1",
+        "player2",
+        "streamer",
+        "is_top8",
+        "is_bo5",
+        "round_name",
+    )
+
     def __init__(
         self,
         tournament: Tournament,
@@ -255,7 +424,6 @@ class Match:
         player1: Participant,
         player2: Participant,
     ):
-        self.guild: discord.Guild = tournament.guild
         self.tournament = tournament
         self.round = round
         self.set = set
@@ -263,7 +431,7 @@ class Match:
         self.underway = underway
         self.player1 = player1
         self.player2 = player2
-        self.channel: Optional[discord.TextChannel] = None
+        self._channel: Optional[discord.TextChannel] = None
         self.start_time: Optional[datetime] = None
         self.end_time: Optional[datetime] = None
         self.status = "pending"  # can be "pending" "ongoing" "finished"
@@ -294,12 +462,6 @@ class Match:
         ).format(self)
 
     def __del__(self):
-        if self.streamer is not None:
-            self.streamer.current_match = None
-            try:
-                self.streamer.matches.remove(self)
-            except ValueError:
-                pass
         if self.tournament.cancelling is False and self.channel:
             channel = self.guild.get_channel(self.channel.id)
             if channel is not None:
@@ -308,6 +470,32 @@ class Match:
                     f"the text channel with ID {channel.id} still exists."
                 )
 
+    @property
+    def guild(self) -> discord.Guild:
+        return self.tournament.guild
+
+    def detach_streamer(self):
+        """
+        Remove this match from its streamer's queue. Call this when dropping the match from the
+        tournament's list.
+        """
+        if self.streamer is None:
+            return
+        if self.streamer.current_match is self:
+            self.streamer.current_match = None
+        with contextlib.suppress(ValueError):
+            self.streamer.matches.remove(self)
+
+    @property
+    def channel(self) -> Optional[discord.TextChannel]:
+        return self._channel
+
+    @channel.setter
+    def channel(self, channel: Optional[discord.TextChannel]):
+        self._channel = channel
+        # the channel is a key of the tournament's match index
+        self.tournament._invalidate_index("matches")
+
     @property
     def duration(self) -> Optional[timedelta]:
         """
@@ -870,9 +1058,11 @@ class Match:
         upload: bool
             If the score should be uploaded to the bracket. Set `False` to only send the message
             with a note "score set on bracket" added. Defaults to `True`.
+
+            The score is uploaded in the background, see `Tournament.queue_score`.
         """
         if upload is True:
-            await self.set_scores(player1_score, player2_score)
+            await self.tournament.queue_score(self, player1_score, player2_score)
         self.cancel()
         winner = self.player1 if player1_score > player2_score else self.player2
         score = (
@@ -984,7 +1174,7 @@ class Match:
             score = (-1, 0)
         else:
             score = (0, -1)
-        await self.set_scores(*score)
+        await self.tournament.queue_score(self, *score)
         self.cancel()
         winner = self.player1 if self.player1.id != player.id else self.player2
         if self.channel is not None:
@@ -1246,8 +1436,9 @@ class Tournament:
         the reminder (minutes before check-in end date), and if the bot should DM members. This is
         calculated on check-in start.
     lock: asyncio.Lock
-        A lock acquired when the tournament is being refreshed by the loop task, to prevent
-        commands like win or dq from being run at the same time.
+        A lock acquired when the changes of the bracket are being applied by the loop task or
+        a webhook, to prevent commands like win or dq from being run at the same time. The
+        bracket itself is fetched before acquiring the lock.
 
         *New since beta 13:* The lock is also acquired with the ``[p]in`` command to prevent too
         many concurrent tasks, breaking the limit.
@@ -1255,6 +1446,19 @@ class Tournament:
         The task for the `loop_task` function (`discord.ext.tasks.Loop` object)
     task_errors: int
         Number of errors that occured within the loop task. If it reaches 5, task is cancelled.
+    bracket_version: int
+        Increased each time a write of the bot to the bracket succeeds. The matches and
+        players modified since the bracket was fetched are not checked, see `_record_write`.
+    sync_stats: SyncStats
+        Counters of the data received from the bracket by the loop task.
+    last_webhook: Optional[float]
+        When the last webhook of the bracket host was received (`time.monotonic`). Once set,
+        the loop task only refreshes the whole bracket every 5 minutes, the changes being
+        received with `process_webhook`.
+    pending_scores: Dict[int, Tuple[str, int, int, Union[int, str]]]
+        Scores set on Discord and not uploaded to the bracket yet, in order. Maps match IDs
+        to the set number, the scores of both players and the winner's player ID. See
+        `queue_score`.
     top_8: dict
         Represents when the top 8 and bo5 begins in the bracket.
     matches_to_announce: List[str]
@@ -1293,6 +1497,8 @@ class Tournament:
         self.tournament_start = tournament_start
         self.bot_prefix = bot_prefix
         self.cog_version = cog_version
+        # lookup indexes for find_participant, find_match and find_streamer
+        self._indexes: dict = {}
         self.participants: List[Participant] = []
         self.matches: List[Match] = []
         self.streamers: List[Streamer] = []
@@ -1412,6 +1618,17 @@ class Tournament:
         self.lock = asyncio.Lock()
         self.task: Optional[asyncio.Task] = None
         self.task_errors = 0
+        self.bracket_version = 0
+        # match and player IDs -> bracket_version of the last write of the bot modifying them
+        self.written_matches: Dict[int, int] = {}
+        self.written_players: Dict[Union[int, str], int] = {}
+        self.sync_stats = SyncStats()
+        self.last_webhook: Optional[float] = None
+        self.last_sync: Optional[float] = None  # last full refresh, time.monotonic
+        self.pending_scores: Dict[int, Tuple[str, int, int, Union[int, str]]] = {}
+        self._scores_task: Optional[asyncio.Task] = None
+        self._saved_data: Optional[dict] = None  # what was last written to Config
+        self._save_lock = asyncio.Lock()
         self.top_8 = {
             "winner": {"top8": None, "bo5": None},
             "loser": {"top8": None, "bo5": None},
@@ -1432,6 +1649,35 @@ class Tournament:
     match_object = Match
     tournament_type = "base"  # should be "challonge", or "smash.gg"...
 
+    # lists are tracked to keep the lookup indexes up to date
+    @property
+    def participants(self) -> List[Participant]:
+        return self._participants
+
+    @participants.setter
+    def participants(self, participants: List[Participant]):
+        self._participants = (
+            participants if isinstance(participants, _TrackedList) else _TrackedList(participants)
+        )
+
+    @property
+    def matches(self) -> List[Match]:
+        return self._matches
+
+    @matches.setter
+    def matches(self, matches: List[Match]):
+        self._matches = matches if isinstance(matches, _TrackedList) else _TrackedList(matches)
+
+    @property
+    def streamers(self) -> List[Streamer]:
+        return self._streamers
+
+    @streamers.setter
+    def streamers(self, streamers: List[Streamer]):
+        self._streamers = (
+            streamers if isinstance(streamers, _TrackedList) else _TrackedList(streamers)
+        )
+
     def cancel(self):
         """
         Correctly clears the object, stopping the task and removing ranking data.
@@ -1439,6 +1685,7 @@ class Tournament:
         self.cancelling = True
         if self.task:
             self.stop_loop_task()
+        self.stop_score_upload()
         # try:
         #     self.debug_task.cancel()
         # except AttributeError:
@@ -1484,6 +1731,7 @@ class Tournament:
         ignored_events = data.pop("ignored_events")
         register_message_id = data.pop("register_message_id")
         checkin_reminders = data.pop("checkin_reminders")
+        pending_scores = data.pop("pending_scores", [])
         del data["tournament_start"], data["tournament_type"]
         tournament = cls(
             bot,
@@ -1562,6 +1810,9 @@ class Tournament:
         tournament.checkin_phase = checkin
         tournament.ignored_events = ignored_events
         tournament.checkin_reminders = checkin_reminders
+        tournament.pending_scores = {x[0]: tuple(x[1:]) for x in pending_scores}
+        if tournament.pending_scores:
+            tournament.start_score_upload()
         if register_message_id and tournament.register_channel:
             try:
                 message = await tournament.register_channel.fetch_message(register_message_id)
@@ -1588,8 +1839,8 @@ class Tournament:
             "status": self.status,
             "tournament_start": (int(self.tournament_start.timestamp()), offset),
             "bot_prefix": self.bot_prefix,
-            "participants": [x.to_dict() for x in self.participants],
-            "matches": [x.to_dict() for x in self.matches],
+            "participants": [x.saved_dict() for x in self.participants],
+            "matches": [x.saved_dict() for x in self.matches],
             "streamers": [x.to_dict() for x in self.streamers],
             "winner_categories": [x.id for x in self.winner_categories],
             "loser_categories": [x.id for x in self.loser_categories],
@@ -1597,9 +1848,11 @@ class Tournament:
             "tournament_type": self.tournament_type,
             "register": self.register_phase,
             "checkin": self.checkin_phase,
-            "checkin_reminders": self.checkin_reminders,
-            "ignored_events": self.ignored_events,
+            # copied, modified in place
+            "checkin_reminders": copy(self.checkin_reminders),
+            "ignored_events": copy(self.ignored_events),
             "register_message_id": self.register_message.id if self.register_message else None,
+            "pending_scores": self._pending_scores_list(),
         }
         return data
 
@@ -1607,9 +1860,112 @@ class Tournament:
         """
         Saves data with Config. This is done with the loop task during a tournament but must be
         called while it's not ongoing.
+
+        Only the values modified since the last save are written, and nothing is written if
+        there is no change. Participants and matches are only serialized again if they were
+        modified.
+        """
+        async with self._save_lock:
+            data = self.to_dict()
+            group = self.data.guild(self.guild).tournament
+            if self._saved_data is None:
+                await group.set(data)
+            else:
+                # unchanged participants and matches are the same objects, compared instantly
+                changed = [x for x, y in data.items() if self._saved_data.get(x) != y]
+                for key in changed:
+                    await group.get_attr(key).set(data[key])
+            self._saved_data = data
+
+    def _pending_scores_list(self) -> list:
+        return [[match_id, *score] for match_id, score in self.pending_scores.items()]
+
+    async def _save_pending_scores(self):
+        # after a save that started before, which could write an outdated list
+        async with self._save_lock:
+            pending_scores = self._pending_scores_list()
+            await self.data.guild(self.guild).tournament.pending_scores.set(pending_scores)
+            if self._saved_data is not None:
+                self._saved_data["pending_scores"] = pending_scores
+
+    async def queue_score(
+        self,
+        match: Match,
+        player1_score: int,
+        player2_score: int,
+        winner: Optional[Participant] = None,
+    ):
         """
-        data = self.to_dict()
-        await self.data.guild(self.guild).tournament.set(data)
+        Saves the score of a match, to be uploaded to the bracket in the background.
+
+        Scores are uploaded in the order they were set, and kept in Config until they are, so
+        they are not lost if the bracket is unavailable or the bot restarts. Until then, the
+        bracket is not checked for changes on that match.
+
+        Parameters
+        ----------
+        match: Match
+            The finished match.
+        player1_score: int
+            First player's score.
+        player2_score: int
+            Second player's score.
+        winner: Optional[Participant]
+            The winner of the set. If not provided, the player with the highest score.
+        """
+        if winner is None:
+            winner = match.player1 if player1_score > player2_score else match.player2
+        self.pending_scores[match.id] = (match.set, player1_score, player2_score, winner.player_id)
+        await self._save_pending_scores()
+        self.start_score_upload()
+
+    def start_score_upload(self):
+        """
+        Starts the task uploading the `pending_scores`, if it isn't running.
+        """
+        if self._scores_task is None or self._scores_task.done():
+            self._scores_task = asyncio.create_task(self._upload_scores())
+
+    def stop_score_upload(self):
+        """
+        Stops the task uploading the `pending_scores`. They are kept in Config.
+        """
+        if self._scores_task is not None and not self._scores_task.done():
+            self._scores_task.cancel()
+
+    async def _upload_scores(self):
+        delay = 1
+        while self.pending_scores:
+            match_id, score = next(iter(self.pending_scores.items()))
+            match_set, player1_score, player2_score, winner_id = score
+            try:
+                await self.upload_score(match_id, player1_score, player2_score, winner_id)
+            except Exception as e:
+                if is_temporary_error(e):
+                    log.info(
+                        f"[Guild {self.guild.id}] Can't upload the score of set {match_set} "
+                        f"yet ({e!r}), retrying in {delay} seconds."
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+                    continue
+                log.error(
+                    f"[Guild {self.guild.id}] Failed to upload the score of set {match_set}.",
+                    exc_info=e,
+                )
+                with contextlib.suppress(discord.HTTPException):
+                    await self.to_channel.send(
+                        _(
+                            ":warning: The score of set {set} couldn't be uploaded to the "
+                            "bracket. You may have to set it manually.\nError: {error}"
+                        ).format(set=match_set, error=e)
+                    )
+            else:
+                log.debug(f"[Guild {self.guild.id}] Uploaded the score of set {match_set}.")
+            delay = 1
+            if self.pending_scores.get(match_id) == score:
+                del self.pending_scores[match_id]
+            await self._save_pending_scores()
 
     @property
     def allowed_roles(self):
@@ -1785,6 +2141,68 @@ class Tournament:
         )
 
     # tools for finding objects within the instance's lists of Participants, Matches and Streamers
+    # each list has dict indexes (key -> position), rebuilt when the list is modified
+    _index_keys = {
+        "participants": {
+            "player_id": lambda x: x.player_id,
+            "discord_id": lambda x: x.id,
+            "discord_name": lambda x: str(x),
+        },
+        "matches": {
+            "match_id": lambda x: x.id,
+            "match_set": lambda x: x.set,
+            "channel_id": lambda x: x.channel.id if x.channel else None,
+        },
+        "streamers": {
+            "channel": lambda x: x.channel,
+            "discord_id": lambda x: x.member.id,
+        },
+    }
+
+    def _invalidate_index(self, name: str):
+        """
+        Drop the indexes of a list, call this when an object's key changes.
+        """
+        self._indexes.pop(name, None)
+
+    def _build_index(self, name: str, key: str) -> dict:
+        get_key = self._index_keys[name][key]
+        index = {}
+        for i, item in enumerate(getattr(self, name)):
+            value = get_key(item)
+            if value is not None and value not in index:  # keep the first one, like a scan
+                index[value] = i
+        return index
+
+    def _get_index(self, name: str) -> Mapping[str, dict]:
+        items: _TrackedList = getattr(self, name)
+        try:
+            indexed, version, indexes = self._indexes[name]
+        except KeyError:
+            pass
+        else:
+            if indexed is items and version == items.version:
+                return indexes
+        indexes = {key: self._build_index(name, key) for key in self._index_keys[name]}
+        self._indexes[name] = (items, items.version, indexes)
+        return indexes
+
+    def _find(self, name: str, key: str, value, check=None) -> tuple:
+        items = getattr(self, name)
+        i = self._get_index(name)[key].get(value)
+        if check is None:
+            if i is None:
+                return None, None
+            return i, items[i]
+        if i is not None and check(items[i]):
+            return i, items[i]
+        # the key changed since the index was built, only this index is built again
+        index = self._get_index(name)[key] = self._build_index(name, key)
+        i = index.get(value)
+        if i is None:
+            return None, None
+        return i, items[i]
+
     def find_participant(
         self,
         *,
@@ -1817,25 +2235,18 @@ class Tournament:
         RuntimeError
             No parameter was provided
         """
+        # player IDs are assigned after creation and names can change on Discord, so these
+        # two keys are verified and scanned if missing
         if player_id:
-            try:
-                return next(
-                    filter(lambda x: x[1].player_id == player_id, enumerate(self.participants))
-                )
-            except StopIteration:
-                return None, None
+            return self._find(
+                "participants", "player_id", player_id, lambda x: x.player_id == player_id
+            )
         elif discord_id:
-            try:
-                return next(filter(lambda x: x[1].id == discord_id, enumerate(self.participants)))
-            except StopIteration:
-                return None, None
+            return self._find("participants", "discord_id", discord_id)
         elif discord_name:
-            try:
-                return next(
-                    filter(lambda x: str(x[1]) == discord_name, enumerate(self.participants))
-                )
-            except StopIteration:
-                return None, None
+            return self._find(
+                "participants", "discord_name", discord_name, lambda x: str(x) == discord_name
+            )
         raise RuntimeError("Provide either player_id, discord_id or discord_name")
 
     def find_match(
@@ -1873,25 +2284,11 @@ class Tournament:
             No parameter was provided
         """
         if match_id:
-            try:
-                return next(filter(lambda x: x[1].id == match_id, enumerate(self.matches)))
-            except StopIteration:
-                return None, None
+            return self._find("matches", "match_id", match_id)
         elif match_set:
-            try:
-                return next(filter(lambda x: x[1].set == match_set, enumerate(self.matches)))
-            except StopIteration:
-                return None, None
+            return self._find("matches", "match_set", match_set)
         elif channel_id:
-            try:
-                return next(
-                    filter(
-                        lambda x: x[1].channel and x[1].channel.id == channel_id,
-                        enumerate(self.matches),
-                    )
-                )
-            except StopIteration:
-                return None, None
+            return self._find("matches", "channel_id", channel_id)
         raise RuntimeError("Provide either match_id, match_set or channel_id")
 
     def find_streamer(
@@ -1922,17 +2319,9 @@ class Tournament:
             No parameter was provided
         """
         if channel:
-            try:
-                return next(filter(lambda x: x[1].channel == channel, enumerate(self.streamers)))
-            except StopIteration:
-                return None, None
+            return self._find("streamers", "channel", channel)
         elif discord_id:
-            try:
-                return next(
-                    filter(lambda x: x[1].member.id == discord_id, enumerate(self.streamers))
-                )
-            except StopIteration:
-                return None, None
+            return self._find("streamers", "discord_id", discord_id)
         raise RuntimeError("Provide either channel or discord_id")
 
     # registration and check-in related methods
@@ -2661,10 +3050,8 @@ class Tournament:
         channel deletion is required, and proceed.
         """
         match: Match
-        for i, match in filter(
-            lambda x: x[1].status != "pending" and x[1].channel is not None,
-            enumerate(self.matches),
-        ):
+        # the list can be replaced by a webhook while we're waiting for Discord
+        for match in [x for x in self.matches if x.status != "pending" and x.channel is not None]:
             if self.delay and match.status == "ongoing":
                 if not match.checked_dq and match.duration > self.delay:
                     log.debug(f"Checking inactivity for match {match.set}")
@@ -2681,7 +3068,9 @@ class Tournament:
                             f"[Guild {self.guild.id}] Can't delete set channel #{match.set}.",
                             exc_info=e,
                         )
-                    del self.matches[i]
+                    with contextlib.suppress(ValueError):
+                        self.matches.remove(match)
+                    match.detach_streamer()
 
     async def check_for_too_long_matches(self):
         """
@@ -2721,19 +3110,31 @@ class Tournament:
             finally:
                 self.stop_loop_task()
             return  # shouldn't be reached but to make sure
-        try:
-            await self._update_participants_list()
-            await self._update_match_list()
-            self.update_streamer_list()
-        except Exception as e:
-            log.error(
-                f"[Guild {self.guild.id}] Can't update internal match and participant list! "
-                "This may be an error from the upstream bracket, or the bot failed when "
-                "checking for changes.",
-                exc_info=e,
-            )
-            self.task_errors += 1
-            return
+        now = time.monotonic()
+        if (
+            self.last_webhook is None
+            or self.last_sync is None
+            or now - self.last_sync >= WEBHOOK_SAFETY_INTERVAL
+        ):
+            # with webhooks, changes are already received, this is only a safety net
+            self.sync_stats.new_tick()
+            try:
+                await self._synchronize_bracket()
+            except CircuitOpenError as e:
+                # not a bug, wait for the bracket to be available again
+                log.info(f"[Guild {self.guild.id}] Skipped bracket refresh: {e}")
+                return
+            except Exception as e:
+                log.error(
+                    f"[Guild {self.guild.id}] Can't update internal match and participant list! "
+                    "This may be an error from the upstream bracket, or the bot failed when "
+                    "checking for changes.",
+                    exc_info=e,
+                )
+                self.task_errors += 1
+                return
+            self.last_sync = now
+            log.debug(f"[Guild {self.guild.id}] Bracket synchronized: {self.sync_stats.last}")
         coros = [
             self.launch_sets(),
             self.check_for_channel_timeout(),
@@ -2762,7 +3163,8 @@ class Tournament:
         Does the required background stuff, such as updating the matches list, launch new matches,
         update streamers, check for AFK...
 
-        Running this will acquire our `lock`.
+        The bracket is fetched first, then our `lock` is acquired while the changes are applied.
+        Launching sets and streams is done after releasing it.
 
         See the documentation on a Loop object for more details.
 
@@ -2774,12 +3176,11 @@ class Tournament:
         asyncio.TimeoutError
             Running the task took more than 30 seconds
         """
-        # we're using a lock to prevent actions such as score setting of DQs being done while we're
+        # the lock prevents actions such as score setting of DQs being done while we're
         # updating the match list, which can make the bot think there were manual bracket changes
         try:
-            async with self.lock:
-                # since this will block other commands, we put an uncatched timeout
-                await asyncio.wait_for(self._loop_task(), 30)
+            # since this can block other commands, we put an uncatched timeout
+            await asyncio.wait_for(self._loop_task(), 30)
         except Exception:
             raise
         else:
@@ -2790,6 +3191,48 @@ class Tournament:
 
     loop_task.__doc__ = loop_task.coro.__doc__
 
+    async def process_webhook(self, payload: dict):
+        """
+        Refresh the bracket after a webhook of the bracket host, then launch the new sets
+        without waiting for the loop task.
+
+        Once a webhook is received, the loop task stops refreshing the whole bracket on each
+        run and only does it every 5 minutes, in case a webhook was lost.
+
+        Nothing is done while the loop task is paused.
+
+        Like the loop task, the changes are fetched first, then our `lock` is acquired while
+        they are applied. Launching sets and streams is done after releasing it.
+
+        Parameters
+        ----------
+        payload: dict
+            The JSON body of the webhook.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            Fetching the changes took more than 30 seconds
+        """
+        if self.phase != "ongoing" or self.task is None or self.task.done():
+            return
+        self.last_webhook = time.monotonic()
+        version = self.bracket_version
+        raw_participants, raw_matches, raw_match = await asyncio.wait_for(
+            self._fetch_webhook(payload), 30
+        )
+        async with self.lock:
+            if raw_participants is not None:
+                await self._update_participants_list(raw_participants, version)
+            if raw_matches is not None:
+                await self._update_match_list(raw_matches, version)
+            if raw_match is not None:
+                await self._update_match(raw_match, version)
+            self.update_streamer_list()
+        await self.launch_sets()
+        await self.launch_streams()
+        await self.save()
+
     async def cancel_timeouts(self):
         """
         Sometimes relaunching the bot after too long will result in a lot of DQs due to AFK checks,
@@ -2957,7 +3400,57 @@ class Tournament:
         """
         raise NotImplementedError
 
-    async def _update_participants_list(self):
+    def _record_write(
+        self, match_id: Optional[int] = None, player_id: Optional[Union[int, str]] = None
+    ):
+        """
+        Increases `bracket_version` after a write of the bot to the bracket succeeded, and
+        remembers the modified match or player.
+
+        Data fetched before may not include this change, so this match and player are left
+        as is when it is applied, they are checked again on the next refresh.
+
+        Parameters
+        ----------
+        match_id: Optional[int]
+            ID of the modified match, as returned by `Match.id`
+        player_id: Optional[Union[int, str]]
+            ID of the modified player, as returned by `Participant.player_id`
+        """
+        self.bracket_version += 1
+        if match_id is not None:
+            self.written_matches[match_id] = self.bracket_version
+        if player_id is not None:
+            self.written_players[player_id] = self.bracket_version
+
+    async def _synchronize_bracket(self):
+        """
+        Fetches the bracket, then applies its changes while holding our `lock`. The requests
+        are sent without the lock, so commands are not blocked by the bracket host.
+        """
+        version = self.bracket_version
+        raw_participants, raw_matches = await self._fetch_bracket()
+        async with self.lock:
+            await self._update_participants_list(raw_participants, version)
+            await self._update_match_list(raw_matches, version)
+            self.update_streamer_list()
+
+    async def _fetch_bracket(self) -> Tuple[list, list]:
+        """
+        Fetches the raw participants and matches of the bracket at the same time, to be given
+        to `_update_participants_list` and `_update_match_list`.
+
+        Returns
+        -------
+        Tuple[list, list]
+            The raw participants and matches.
+        """
+        participants, matches = await asyncio.gather(self.list_participants(), self.list_matches())
+        return participants, matches
+
+    async def _update_participants_list(
+        self, raw_participants: Optional[list] = None, version: Optional[int] = None
+    ):
         """
         Updates the internal list of participants, checking for changes such as:
 
@@ -2966,10 +3459,20 @@ class Tournament:
 
         .. warning:: A name change on remote is considered as a player removal + addition. If the
             name doesn't match any member, they will be rejected.
+
+        Parameters
+        ----------
+        raw_participants: Optional[list]
+            The participants as returned by `list_participants`, fetched if not provided.
+        version: Optional[int]
+            The `bracket_version` before ``raw_participants`` was fetched. Players modified
+            by the bot since then are left as is.
         """
         raise NotImplementedError
 
-    async def _update_match_list(self):
+    async def _update_match_list(
+        self, raw_matches: Optional[list] = None, version: Optional[int] = None
+    ):
         """
         Updates the internal list of changes, checking for changes such as:
 
@@ -2980,6 +3483,71 @@ class Tournament:
 
         *   Match reset (the set will be relaunched, ongoing/finished sets beyond this match in
             the bracket will be reset)
+
+        Parameters
+        ----------
+        raw_matches: Optional[list]
+            The matches as returned by `list_matches`, fetched if not provided.
+        version: Optional[int]
+            The `bracket_version` before ``raw_matches`` was fetched. Matches modified by the
+            bot since then, or with a modified player, are left as is.
+        """
+        raise NotImplementedError
+
+    async def upload_score(
+        self,
+        match_id: int,
+        player1_score: int,
+        player2_score: int,
+        winner_id: Union[int, str],
+    ):
+        """
+        Sets the score of a match on the bracket. Use `queue_score` instead of calling this.
+
+        Parameters
+        ----------
+        match_id: int
+            Match's ID on the bracket, as returned by `Match.id`
+        player1_score: int
+            First player's score.
+        player2_score: int
+            Second player's score.
+        winner_id: Union[int, str]
+            Winner's ID on the bracket, as returned by `Participant.player_id`
+        """
+        raise NotImplementedError
+
+    async def _update_match(self, raw_match: dict, version: int):
+        """
+        Updates a single match of the internal list, checking for the same changes as
+        `_update_match_list`. This is used when the bracket host notifies a change.
+
+        Parameters
+        ----------
+        raw_match: dict
+            The match as returned by the bracket host.
+        version: int
+            The `bracket_version` before ``raw_match`` was fetched.
+        """
+        raise NotImplementedError
+
+    async def _fetch_webhook(
+        self, payload: dict
+    ) -> Tuple[Optional[list], Optional[list], Optional[dict]]:
+        """
+        Reads a webhook sent by the bracket host and fetches what changed, to be given to
+        `_update_participants_list`, `_update_match_list` or `_update_match`.
+
+        Parameters
+        ----------
+        payload: dict
+            The JSON body of the webhook.
+
+        Returns
+        -------
+        Tuple[Optional[list], Optional[list], Optional[dict]]
+            The raw participants, matches and single match that were fetched, `None` for
+            what didn't change.
         """
         raise NotImplementedError
 
@@ -3146,7 +3714,7 @@ class Streamer:
         respect_order: bool = False,
     ):
         self.tournament = tournament
-        self.member = member
+        self._member = member
         self.channel = channel
         self.respect_order = respect_order
         self.link = f"https://www.twitch.tv/{channel}/"
@@ -3176,6 +3744,16 @@ class Streamer:
             cls.current_match = tournament.find_match(match_set=str(data["current_match"]))[1]
         return cls
 
+    @property
+    def member(self) -> discord.Member:
+        return self._member
+
+    @member.setter
+    def member(self, member: discord.Member):
+        self._member = member
+        # the member is a key of the tournament's streamer index
+        self.tournament._invalidate_index("streamers")
+
     def to_dict(self) -> dict:
         return {
             "member": self.member.id,
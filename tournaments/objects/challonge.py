@@ -1,16 +1,23 @@
 import achallonge
+import aiohttp
+import asyncio
 import discord
+import json
 import logging
 import string
 
+from achallonge import ChallongeException
+from collections import deque
 from copy import copy
-from typing import List, Optional, Tuple
+from functools import partial
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
 
 from redbot.core import Config
 from redbot.core.bot import Red
 from redbot.core.i18n import Translator
 
-from ..utils import async_http_retry
+from ..client import ChallongeClient
+from ..utils import CircuitBreaker, CircuitOpenError, is_temporary_error, parse_retry_after
 from .base import Tournament, Match, Participant
 
 log = logging.getLogger("red.laggron.tournaments")
@@ -18,6 +25,8 @@ _ = Translator("Tournaments", __file__)
 
 
 class ChallongeParticipant(Participant):
+    __slots__ = ()
+
     @classmethod
     def build_from_api(cls, tournament: Tournament, data: dict):
         """
@@ -53,6 +62,8 @@ class ChallongeParticipant(Participant):
 
 
 class ChallongeMatch(Match):
+    __slots__ = ()
+
     @classmethod
     async def build_from_api(cls, tournament: Tournament, data: dict):
         """
@@ -223,9 +234,51 @@ class ChallongeTournament(Tournament):
             data=config_data,
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # API path -> (ETag, Last-Modified, parsed data) of the last listing of participants
+        # and matches, for conditional requests
+        self._index_cache: Dict[str, Tuple[Optional[str], Optional[str], list]] = {}
+        # ID -> (updated_at, local state) of participants and matches when they were last
+        # processed, if both are the same on the next tick there is nothing to check
+        self._participant_marks: Dict[int, tuple] = {}
+        self._match_marks: Dict[int, tuple] = {}
+        # critical requests waiting for Challonge to be available again, sent in order
+        self.pending_writes: Deque[Callable[[], Awaitable]] = deque()
+        self._writes_task: Optional[asyncio.Task] = None
+
     participant_object = ChallongeParticipant
     match_object = ChallongeMatch
     tournament_type = "challonge"
+    # writes that must reach the bracket, queued during an outage instead of failing
+    critical_requests = (achallonge.matches.update, achallonge.participants.destroy)
+    # writes modifying a single match or participant, given as the second argument
+    match_writes = (
+        achallonge.matches.update,
+        achallonge.matches.mark_as_underway,
+        achallonge.matches.unmark_as_underway,
+    )
+    participant_writes = (achallonge.participants.destroy,)
+    # requests that can't be safely sent twice, they are never retried
+    unsafe_requests = (achallonge.participants.create, achallonge.participants.bulk_add)
+    # requests without side effects, identical ones in flight share the same response
+    read_requests = (
+        achallonge.tournaments.show,
+        achallonge.matches.index,
+        achallonge.matches.show,
+        achallonge.participants.index,
+    )
+
+    @property
+    def client(self) -> ChallongeClient:
+        """
+        The client shared with the other tournaments using the same Challonge account.
+        """
+        return ChallongeClient.get(self.credentials)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.client.breaker
 
     @classmethod
     def from_saved_data(cls, bot, guild, config, cog_version, data, config_data):
@@ -235,22 +288,141 @@ class ChallongeTournament(Tournament):
         """
         An util adding the credentials to the args before sending an API call.
 
-        Also wraps the request in a retry loop (max 3 then raise).
+        Also wraps the request in a retry loop (max 3 retries then raise), see
+        `async_http_retry`. While Challonge is unavailable, requests fail immediately with
+        `CircuitOpenError`, except for `critical_requests` which are queued and sent once
+        Challonge is back (`None` is returned).
         """
+        key = None
+        if method in self.read_requests or method == self._fetch_index:
+            key = (getattr(method, "__func__", method), args, tuple(sorted(kwargs.items())))
         kwargs.update(credentials=self.credentials)
-        return await async_http_retry(method(*args, **kwargs))
+        factory = partial(method, *args, **kwargs)
+        critical = method in self.critical_requests
+        if critical and (self.pending_writes or self.breaker.remaining):
+            # keep the order of the writes
+            self._queue_write(factory)
+            return
+        try:
+            result = await self.client.request(
+                factory, key=key, retries=0 if method in self.unsafe_requests else 3
+            )
+        except CircuitOpenError:
+            if not critical:
+                raise
+            self._queue_write(factory)
+            return
+        if key is None:
+            self._written(factory)
+        return result
+
+    def _written(self, factory: partial):
+        # the write succeeded, see _record_write
+        method, args = factory.func, factory.args
+        self._record_write(
+            match_id=args[1] if method in self.match_writes else None,
+            player_id=args[1] if method in self.participant_writes else None,
+        )
+
+    def _queue_write(self, factory: Callable[[], Awaitable]):
+        self.pending_writes.append(factory)
+        log.info(
+            f"[Guild {self.guild.id}] Challonge is unavailable, queued {factory.func.__module__}."
+            f"{factory.func.__name__} ({len(self.pending_writes)} pending)."
+        )
+        if self._writes_task is None or self._writes_task.done():
+            self._writes_task = asyncio.create_task(self._send_pending_writes())
+
+    async def _send_pending_writes(self):
+        while self.pending_writes:
+            await asyncio.sleep(self.breaker.remaining)
+            factory = self.pending_writes[0]
+            try:
+                await self.client.request(factory)
+            except Exception as e:
+                if is_temporary_error(e):
+                    continue  # the circuit is open again, or will be soon
+                log.error(
+                    f"[Guild {self.guild.id}] Failed to send a queued request to Challonge.",
+                    exc_info=e,
+                )
+            else:
+                self._written(factory)
+            self.pending_writes.popleft()
+
+    async def _fetch_index(self, path: str, credentials: dict) -> list:
+        """
+        List participants or matches, sending the ETag and Last-Modified date of the previous
+        response. If the data didn't change, the API answers 304 and the previous list is
+        returned as is, don't modify it.
+        """
+        url = f"https://{achallonge.api.CHALLONGE_API_URL}/{path}.json"
+        headers = {}
+        cached = self._index_cache.get(path)
+        if cached is not None:
+            etag, last_modified, data = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        self.sync_stats.add("requests")
+        async with self.client.session.get(
+            url, headers=headers, auth=aiohttp.BasicAuth(**credentials)
+        ) as response:
+            if response.status == 304 and cached is not None:
+                self.sync_stats.add("not_modified")
+                return data
+            if response.status >= 400:
+                error = ChallongeException(f"{response.status} {response.reason}")
+                error.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                raise error
+            body = await response.read()
+        self.sync_stats.add("bytes", len(body))
+        data = achallonge.api._parse(json.loads(body))
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._index_cache[path] = (etag, last_modified, data)
+        return data
 
     async def _get_all_rounds(self):
         return [x["round"] for x in await self.list_matches()]
 
-    async def _update_participants_list(self):
-        raw_participants = await self.list_participants()
+    @staticmethod
+    def _is_older(data: dict, mark: Optional[tuple]) -> bool:
+        # fetched before the data we last applied, a webhook was processed in the meantime
+        updated_at = data.get("updated_at")
+        return bool(mark and mark[0] and updated_at and updated_at < mark[0])
+
+    async def _update_participants_list(
+        self, raw_participants: Optional[list] = None, version: Optional[int] = None
+    ):
+        if version is None:
+            version = self.bracket_version
+        if raw_participants is None:
+            raw_participants = await self.list_participants()
+        # reversed, so the first participant is kept in case of duplicates
+        cached_participants = {x.player_id: x for x in reversed(self.participants)}
+        marks = self._participant_marks
+        skipped = 0
+        outdated = 0
         participants = []
         removed = []
         for participant in raw_participants:
-            cached: Participant
-            # yeah, discord.py tools works with that
-            cached = discord.utils.get(self.participants, player_id=participant["id"])
+            cached: Participant = cached_participants.get(participant["id"])
+            written = self.written_players.get(participant["id"], -1)
+            if written > version or self._is_older(participant, marks.get(participant["id"])):
+                # modified by the bot during the requests, or older than what we applied
+                outdated += 1
+                if cached is not None:
+                    participants.append(cached)
+                continue
+            mark = (participant.get("updated_at"), cached is not None)
+            if mark[0] is not None and marks.get(participant["id"]) == mark:
+                skipped += 1
+                if cached is not None:
+                    participants.append(cached)
+                continue
             if cached is None:
                 if participant["active"] is False:
                     continue  # disqualified player
@@ -295,79 +467,190 @@ class ChallongeTournament(Tournament):
                     )
                 )
         self.participants = participants
+        self.sync_stats.add("skipped", skipped)
+        self.sync_stats.add("outdated", outdated)
+        self.sync_stats.add("processed", len(raw_participants) - skipped)
+        if len(raw_participants) > skipped:
+            kept = set(x.player_id for x in participants)
+            for x in raw_participants:
+                if not self._is_older(x, marks.get(x["id"])):
+                    marks[x["id"]] = (x.get("updated_at"), x["id"] in kept)
+
+    def _is_outdated(self, match: dict, version: int) -> bool:
+        """
+        If the bot modified the match or one of its players after the given `bracket_version`,
+        or if the match is older than the one we last applied.
+        """
+        if self.written_matches.get(match["id"], -1) > version:
+            return True
+        if any(
+            self.written_players.get(match[x], -1) > version for x in ("player1_id", "player2_id")
+        ):
+            return True
+        return self._is_older(match, self._match_marks.get(match["id"]))
+
+    async def _check_match(
+        self, match: dict, cached: Optional[Match], version: int
+    ) -> Tuple[Optional[Match], bool]:
+        """
+        Create or check a match for changes upstream, compared to our cache.
 
-    async def _update_match_list(self):
-        raw_matches = await self.list_matches()
+        Returns the match to keep in cache (or `None`) and if it was changed on the bracket.
+        """
+        if match["id"] in self.pending_scores:
+            # our score isn't uploaded yet, the bracket is late
+            return cached, False
+        if self._is_outdated(match, version):
+            # modified during the requests, like pending scores we keep our version
+            self.sync_stats.add("outdated")
+            return cached, False
+        if cached is None:
+            if match["state"] != "open" or match["winner_id"]:
+                # still empty, or finished (and we don't want to load finished sets into cache)
+                return None, False
+            return await self.match_object.build_from_api(self, match), False
+        # we check for upstream bracket changes compared to our cache
+        if cached.status == "ongoing" and match["state"] == "complete":
+            # score was set manually
+            try:
+                winner_score, loser_score = match["scores_csv"].split("-")
+                winner_score = int(winner_score)
+                loser_score = int(loser_score)
+            except ValueError:
+                winner_score, loser_score = 0, -1
+            else:
+                if winner_score < loser_score:
+                    winner_score, loser_score = loser_score, winner_score
+            winner = self.find_participant(player_id=match["winner_id"])[1]
+            if winner == cached.player1:
+                await cached.end(winner_score, loser_score, upload=False)
+            else:
+                await cached.end(loser_score, winner_score, upload=False)
+            log.info(
+                f"[Guild {self.guild.id}] Ended set {cached.set} because of remote score "
+                f"update (score {match['scores_csv']} winner {str(winner)})"
+            )
+            return cached, True
+        elif cached.status == "ongoing" and match["state"] == "pending":
+            # the previously open match is now pending, this means the bracket changed
+            # mostl likely due to a score change on a parent match
+            await cached.force_end()
+            log.info(
+                f"[Guild {self.guild.id}] Ended set {cached.set} because of bracket "
+                "changes (now marked as pending by Challonge)."
+            )
+            return None, True
+        elif cached.status == "finished" and match["state"] == "open":
+            # the previously finished match is now open, this means a TO manually
+            # removed the score set previously. we are therefore relaunching
+            await cached.relaunch()
+            log.info(
+                f"[Guild {self.guild.id}] Reopening set {cached.set} because of bracket "
+                "changes (now marked as open by Challonge)."
+            )
+            return cached, True
+        # there is one last case where a finished match can be listed as pending
+        # unlike the above case, we don't have to immediatly do something, the updated
+        # sets will be automatically created when the time comes. we'll just leave the timer
+        # do its job and delete the channel.
+        return cached, False
+
+    async def _update_match_list(
+        self, raw_matches: Optional[list] = None, version: Optional[int] = None
+    ):
+        if version is None:
+            version = self.bracket_version
+        if raw_matches is None:
+            raw_matches = await self.list_matches()
+        cached_matches = {x.id: x for x in reversed(self.matches)}
+        marks = self._match_marks
+        skipped = 0
         matches = []
         remote_changes = []
         for match in raw_matches:
-            cached: Match
-            # yeah, discord.py tools works with that
-            cached = discord.utils.get(self.matches, id=match["id"])
-            if cached is None:
-                if match["state"] != "open" or match["winner_id"]:
-                    # still empty, or finished (and we don't want to load finished sets into cache)
-                    continue
-                match_object = await self.match_object.build_from_api(self, match)
-                if match_object:
-                    matches.append(match_object)
-                continue
-            # we check for upstream bracket changes compared to our cache
-            if cached.status == "ongoing" and match["state"] == "complete":
-                # score was set manually
-                try:
-                    winner_score, loser_score = match["scores_csv"].split("-")
-                    winner_score = int(winner_score)
-                    loser_score = int(loser_score)
-                except ValueError:
-                    winner_score, loser_score = 0, -1
-                else:
-                    if winner_score < loser_score:
-                        winner_score, loser_score = loser_score, winner_score
-                winner = discord.utils.get(self.participants, player_id=match["winner_id"])
-                if winner == cached.player1:
-                    await cached.end(winner_score, loser_score, upload=False)
-                else:
-                    await cached.end(loser_score, winner_score, upload=False)
-                log.info(
-                    f"[Guild {self.guild.id}] Ended set {cached.set} because of remote score "
-                    f"update (score {match['scores_csv']} winner {str(winner)})"
-                )
-                remote_changes.append(cached.set)
-            elif cached.status == "ongoing" and match["state"] == "pending":
-                # the previously open match is now pending, this means the bracket changed
-                # mostl likely due to a score change on a parent match
-                await cached.force_end()
-                log.info(
-                    f"[Guild {self.guild.id}] Ended set {cached.set} because of bracket "
-                    "changes (now marked as pending by Challonge)."
-                )
-                remote_changes.append(cached.set)
+            cached: Match = cached_matches.get(match["id"])
+            mark = (match.get("updated_at"), cached.status if cached is not None else None)
+            if mark[0] is not None and marks.get(match["id"]) == mark:
+                # neither the remote match nor our own changed since the last tick
+                skipped += 1
+                if cached is not None:
+                    matches.append(cached)
                 continue
-            elif cached.status == "finished" and match["state"] == "open":
-                # the previously finished match is now open, this means a TO manually
-                # removed the score set previously. we are therefore relaunching
-                await cached.relaunch()
-                log.info(
-                    f"[Guild {self.guild.id}] Reopening set {cached.set} because of bracket "
-                    "changes (now marked as open by Challonge)."
-                )
+            match_object, changed = await self._check_match(match, cached, version)
+            if match_object is not None:
+                matches.append(match_object)
+            if changed:
                 remote_changes.append(cached.set)
-            # there is one last case where a finished match can be listed as pending
-            # unlike the above case, we don't have to immediatly do something, the updated
-            # sets will be automatically created when the time comes. we'll just leave the timer
-            # do its job and delete the channel.
-            matches.append(cached)
-        difference = list(set(self.matches).difference(matches))
-        if difference:
+        kept = set(map(id, matches))
+        difference = [x for x in self.matches if id(x) not in kept]
+        if difference and log.isEnabledFor(logging.DEBUG):
             log.debug(
                 f"[Guild {self.guild.id}] Removing these matches from cache:\n"
                 + "\n".join([repr(x) for x in difference])
             )
+        for match in difference:
+            match.detach_streamer()
         self.matches = matches
+        self.sync_stats.add("skipped", skipped)
+        self.sync_stats.add("processed", len(raw_matches) - skipped)
+        if len(raw_matches) > skipped:
+            kept = {x.id: x.status for x in matches}
+            for x in raw_matches:
+                if not self._is_older(x, marks.get(x["id"])):
+                    marks[x["id"]] = (x.get("updated_at"), kept.get(x["id"]))
         if remote_changes:
             await self.warn_bracket_change(*remote_changes)
 
+    async def _update_match(self, raw_match: dict, version: int):
+        self.sync_stats.add("processed")
+        i, cached = self.find_match(match_id=raw_match["id"])
+        match_object, changed = await self._check_match(raw_match, cached, version)
+        if cached is None:
+            if match_object is not None:
+                self.matches.append(match_object)
+        elif match_object is None:
+            log.debug(f"[Guild {self.guild.id}] Removing this match from cache:\n{cached!r}")
+            del self.matches[i]
+            cached.detach_streamer()
+        if not self._is_older(raw_match, self._match_marks.get(raw_match["id"])):
+            self._match_marks[raw_match["id"]] = (
+                raw_match.get("updated_at"),
+                match_object.status if match_object is not None else None,
+            )
+        if changed:
+            await self.warn_bracket_change(cached.set)
+
+    async def _fetch_webhook(self, payload: dict):
+        # Challonge sends the object that changed, either in the format of the API
+        # ({"match": {...}}) or in the JSON:API format ({"data": {"type": "match", ...}})
+        data = payload.get("data")
+        if isinstance(data, dict):
+            kind = str(data.get("type", "")).lower()
+            attributes = data.get("attributes") or {}
+            object_id = data.get("id")
+        else:
+            kind = next((x for x in ("match", "participant") if x in payload), "")
+            attributes = payload.get(kind) or {}
+            object_id = attributes.get("id")
+        tournament_id = attributes.get("tournament_id")
+        if tournament_id is not None and str(tournament_id) != str(self.id):
+            log.debug(
+                f"[Guild {self.guild.id}] Ignored webhook for another tournament "
+                f"(ID: {tournament_id})."
+            )
+            return None, None, None
+        if kind == "match" and object_id:
+            raw_match = await self.request(achallonge.matches.show, self.id, int(object_id))
+            self.sync_stats.add("requests")
+            if raw_match["state"] != "complete":
+                return None, None, raw_match
+            # the players moved forward in the bracket, pick up the sets that are now open
+            return None, await self.list_matches(), None
+        elif kind == "participant":
+            return await self.list_participants(), None, None
+        # unknown event, refresh everything
+        return (*await self._fetch_bracket(), None)
+
     async def start(self):
         await self.request(achallonge.tournaments.start, self.id)
         self.phase = "ongoing"
@@ -434,15 +717,37 @@ class ChallongeTournament(Tournament):
                 participant._player_id = player["id"]
         return size
 
+    async def upload_score(
+        self,
+        match_id: int,
+        player1_score: int,
+        player2_score: int,
+        winner_id: Union[int, str],
+    ):
+        score = f"{player1_score}-{player2_score}"
+        # not through request, the caller keeps the score until it is uploaded
+        await self.client.request(
+            partial(
+                achallonge.matches.update,
+                self.id,
+                match_id,
+                scores_csv=score,
+                winner_id=winner_id,
+                credentials=self.credentials,
+            )
+        )
+        self._record_write(match_id=match_id)
+        log.debug(f"Set scores of match {match_id} (tournament {self.id} to {score}")
+
     async def destroy_player(self, player_id: str):
         await self.request(achallonge.participants.destroy, self.id, player_id)
         log.debug(f"Destroyed player {player_id} (tournament {self.id})")
 
     async def list_participants(self):
-        return await self.request(achallonge.participants.index, self.id)
+        return await self.request(self._fetch_index, f"tournaments/{self.id}/participants")
 
     async def list_matches(self):
-        return await self.request(achallonge.matches.index, self.id)
+        return await self.request(self._fetch_index, f"tournaments/{self.id}/matches")
 
     async def reset(self):
         await self.request(achallonge.tournaments.reset, self.id)
@@ -272,6 +272,128 @@ it directly.
         await self.data.guild(guild).credentials.username.set(username)
         await ctx.send(_("The username was successfully set."))
 
+    @challongeset.group(name="webhook")
+    async def challongeset_webhook(self, ctx: commands.Context):
+        """
+        Receive the bracket changes instantly with webhooks.
+
+        By default, the bot checks the bracket every 15 seconds for changes made on the \
+website. With webhooks, Challonge notifies the bot of each change, scores set on the website \
+are then applied instantly and the bot only checks the whole bracket every 5 minutes.
+
+        The bot owner must enable the receiver first with `[p]challongeset webhook toggle`, \
+then use `[p]challongeset webhook url` to get the address to give to Challonge.
+        """
+        pass
+
+    @challongeset_webhook.command(name="url")
+    async def challongeset_webhook_url(self, ctx: commands.Context):
+        """
+        Get the webhook URL of this server.
+
+        Add this URL in the webhooks of your Challonge account settings.
+
+        :warning: **Careful, this URL is private !**
+        """
+        if self.webhook is None:
+            await ctx.send(
+                _(
+                    "The webhook receiver is not enabled. The bot owner must enable it with "
+                    "`{prefix}challongeset webhook toggle`."
+                ).format(prefix=ctx.clean_prefix)
+            )
+            return
+        settings = await self.data.webhook.all()
+        if settings["public_url"]:
+            base_url = settings["public_url"].rstrip("/")
+        else:
+            base_url = "http://<{host}>:{port}".format(
+                host=_("bot's IP address"), port=settings["port"]
+            )
+        try:
+            await ctx.author.send(
+                _(
+                    "Webhook URL for **{guild}**:\n`{url}`\n\n"
+                    "Add this URL in the webhooks of your Challonge account settings. "
+                    "Keep it private."
+                ).format(guild=ctx.guild.name, url=base_url + self.webhook.get_path(ctx.guild.id))
+            )
+        except discord.HTTPException:
+            await ctx.send(_("I can't send you a DM, the URL must stay private."))
+        else:
+            await ctx.tick()
+
+    @challongeset_webhook.command(name="toggle")
+    @checks.is_owner()
+    async def challongeset_webhook_toggle(self, ctx: commands.Context):
+        """
+        Enable or disable the webhook receiver.
+
+        This is a global setting, the bot will listen for HTTP requests on the address set \
+with `[p]challongeset webhook bind`, which must be reachable by Challonge.
+        """
+        enabled = not await self.data.webhook.enabled()
+        await self.data.webhook.enabled.set(enabled)
+        try:
+            await self.start_webhook_receiver()
+        except OSError as e:
+            await self.data.webhook.enabled.set(False)
+            log.error("Failed to start the webhook receiver.", exc_info=e)
+            await ctx.send(_("Can't listen on the configured address: {error}").format(error=e))
+            return
+        if enabled:
+            await ctx.send(
+                _(
+                    "The webhook receiver is now enabled. Admins can get the URL of their server "
+                    "with `{prefix}challongeset webhook url`."
+                ).format(prefix=ctx.clean_prefix)
+            )
+        else:
+            await ctx.send(_("The webhook receiver is now disabled."))
+
+    @challongeset_webhook.command(name="bind")
+    @checks.is_owner()
+    async def challongeset_webhook_bind(self, ctx: commands.Context, host: str, port: int):
+        """
+        Set the address of the webhook receiver.
+
+        Default is `0.0.0.0 8742` (all interfaces, port 8742). Use `127.0.0.1` if the bot is \
+behind a reverse proxy.
+
+        Example: `[p]challongeset webhook bind 127.0.0.1 8742`
+        """
+        if not 0 < port < 65536:
+            await ctx.send(_("Invalid port."))
+            return
+        await self.data.webhook.host.set(host)
+        await self.data.webhook.port.set(port)
+        try:
+            await self.start_webhook_receiver()
+        except OSError as e:
+            log.error("Failed to start the webhook receiver.", exc_info=e)
+            await ctx.send(_("Can't listen on this address: {error}").format(error=e))
+            return
+        await ctx.send(_("The address of the webhook receiver was successfully set."))
+
+    @challongeset_webhook.command(name="publicurl")
+    @checks.is_owner()
+    async def challongeset_webhook_publicurl(
+        self, ctx: commands.Context, url: Optional[str] = None
+    ):
+        """
+        Set the public URL of the webhook receiver, shown in `[p]challongeset webhook url`.
+
+        Use this if the bot is behind a reverse proxy or a domain name. Don't give a URL to \
+reset it.
+
+        Example: `[p]challongeset webhook publicurl https://bot.example.com`
+        """
+        await self.data.webhook.public_url.set(url)
+        if url:
+            await ctx.send(_("The public URL was successfully set."))
+        else:
+            await ctx.send(_("The public URL was reset."))
+
     @commands.group(name="tset", aliases=["tournamentset"])
     @commands.guild_only()
     @checks.admin_or_permissions(administrator=True)
@@ -1541,7 +1663,7 @@ the start of the tournament, then closing 15 minutes before.
         async with ctx.typing():
             try:
                 data = await async_http_retry(
-                    achallonge.tournaments.show(url, credentials=credentials)
+                    lambda: achallonge.tournaments.show(url, credentials=credentials)
                 )
             except achallonge.ChallongeException as e:
                 error = error_mapping.get(e.args[0].split()[0])
@@ -1659,7 +1781,7 @@ the start of the tournament, then closing 15 minutes before.
         if result is False:
             return
         self.tournaments[guild.id] = tournament
-        await self.data.guild(guild).tournament.set(tournament.to_dict())
+        await tournament.save()
         await ctx.send(_("The tournament is now set!"))
 
     @mod_or_to()
@@ -1711,6 +1833,37 @@ the start of the tournament, then closing 15 minutes before.
                 ),
                 inline=False,
             )
+            if t.sync_stats.ticks:
+                last, total = t.sync_stats.last, t.sync_stats.total
+                embed.add_field(
+                    name=_("Bracket refresh"),
+                    value=_(
+                        "Last refresh: {size} KB received, {not_modified}/{requests} "
+                        "requests unchanged\n"
+                        "{processed} participants and matches checked, {skipped} skipped\n"
+                        "Total: {total_size} KB received in {ticks} refreshes, {outdated} "
+                        "changes of the bot kept over outdated data"
+                    ).format(
+                        size=round(last["bytes"] / 1024, 1),
+                        not_modified=last["not_modified"],
+                        requests=last["requests"],
+                        processed=last["processed"],
+                        skipped=last["skipped"],
+                        total_size=round(total["bytes"] / 1024, 1),
+                        ticks=t.sync_stats.ticks,
+                        outdated=total["outdated"],
+                    ),
+                    inline=False,
+                )
+            if t.pending_scores:
+                embed.add_field(
+                    name=_("Scores waiting for upload"),
+                    value=_("{count} sets: {sets}").format(
+                        count=len(t.pending_scores),
+                        sets=", ".join(str(x[0]) for x in list(t.pending_scores.values())[:50]),
+                    ),
+                    inline=False,
+                )
             if t.task is None or not t.loop_task.is_running():
                 embed.add_field(
                     name="\u200B",
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import secrets
 import achallonge
 import discord
 import shutil
@@ -15,12 +16,14 @@ from redbot.core.config import Group
 from redbot.core.data_manager import cog_data_path
 from redbot.core.i18n import Translator, cog_i18n
 
+from .client import ChallongeClient
 from .objects import Tournament, ChallongeTournament
 from .games import Games
 from .registration import Registration
 from .settings import Settings
 from .streams import Streams
 from .troubleshooting import Troubleshooting
+from .webhooks import WebhookReceiver
 
 log = logging.getLogger("red.laggron.tournaments")
 _ = Translator("Tournaments", __file__)
@@ -62,7 +65,14 @@ class Tournaments(
 ):
 
     default_global = {
-        "data_version": "0.0"  # will be edited after config update, current version is 1.0
+        "data_version": "0.0",  # will be edited after config update, current version is 1.0
+        "webhook": {  # receiver for bracket webhooks, see webhooks.py
+            "enabled": False,
+            "host": "0.0.0.0",
+            "port": 8742,
+            "public_url": None,
+            "secret": None,
+        },
     }
 
     default_guild_settings = {
@@ -88,6 +98,7 @@ class Tournaments(
             "ignored_events": None,
             "register_message_id": None,
             "checkin_reminders": [],
+            "pending_scores": [],
         },
     }
 
@@ -133,6 +144,7 @@ class Tournaments(
             cog_instance=self, identifier=260, force_registration=True
         )
         self.tournaments: Mapping[int, Tournament] = {}
+        self.webhook: Optional[WebhookReceiver] = None
 
         self.data.register_global(**self.default_global)
         self.data.register_guild(**self.default_guild_settings)
@@ -253,6 +265,31 @@ class Tournaments(
         else:
             log.info("No tournament had to be resumed.")
 
+    async def start_webhook_receiver(self):
+        """
+        Start (or restart) the webhook receiver if enabled.
+
+        Raises
+        ------
+        OSError
+            The configured address is invalid or already in use.
+        """
+        await self.stop_webhook_receiver()
+        settings = await self.data.webhook.all()
+        if not settings["enabled"]:
+            return
+        if settings["secret"] is None:
+            settings["secret"] = secrets.token_hex(32)
+            await self.data.webhook.secret.set(settings["secret"])
+        webhook = WebhookReceiver(self, settings["secret"])
+        await webhook.start(settings["host"], settings["port"])
+        self.webhook = webhook
+
+    async def stop_webhook_receiver(self):
+        if self.webhook is not None:
+            webhook, self.webhook = self.webhook, None
+            await webhook.stop()
+
     async def cog_command_error(self, ctx: commands.Context, error: commands.CommandError):
         error_mapping = {
             "401": _(
@@ -284,7 +321,7 @@ class Tournaments(
                 return await ctx.send(_("Challonge timed out responding, try again later."))
         await self.bot.on_command_error(ctx, error, unhandled_by_cog=True)
 
-    def cog_unload(self):
+    async def cog_unload(self):
         log.debug("Unloading cog...")
 
         # remove all handlers from the logger, this prevents adding
@@ -301,7 +338,11 @@ class Tournaments(
         tournament: Tournament
         for tournament in self.tournaments.values():
             tournament.stop_loop_task()
+            tournament.stop_score_upload()
         self.registration_loop.stop()
+        # the port must be released before a reload starts the receiver again
+        await self.stop_webhook_receiver()
+        await ChallongeClient.close_all()
 
         # remove ranking data
         shutil.rmtree(cog_data_path(self) / "ranking", ignore_errors=True)
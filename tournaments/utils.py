@@ -1,22 +1,31 @@
+import aiohttp
 import asyncio
 import logging
 import discord
+import random
+import time
 
 from achallonge import ChallongeException
-from typing import Optional
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
 
 from redbot.core import commands
 from redbot.core.i18n import Translator
 from redbot.core.utils.menus import start_adding_reactions
 from redbot.core.utils.predicates import ReactionPredicate
 
-from .objects import Tournament
+if TYPE_CHECKING:
+    from .objects import Tournament
 
 log = logging.getLogger("red.laggron.tournaments")
 _ = Translator("Tournaments", __file__)
 
 COG_NAME = "Tournaments"
 
+# HTTP statuses meaning the request can succeed later (rate limit or provider outage)
+RETRY_STATUSES = {"429", "500", "502", "503", "504", "520", "521", "522", "523", "524"}
+
 
 def credentials_check(command: commands.Command) -> commands.Command:
     """
@@ -84,28 +93,200 @@ def mod_or_to():
     return commands.check(check)
 
 
-async def async_http_retry(coro):
+class CircuitOpenError(ChallongeException):
+    """
+    Raised instead of sending a request while the `CircuitBreaker` is open.
+    """
+
+    def __init__(self, delay: float):
+        super().__init__(
+            f"Challonge is unavailable, requests are paused for {round(delay)} seconds."
+        )
+        self.delay = delay
+
+
+class CircuitBreaker:
     """
-    Retries the operation in case of a timeout.
+    Stops sending requests to a provider going through an outage.
+
+    After ``threshold`` failures in a row, the circuit opens for ``cooldown`` seconds (or
+    longer if the provider asked for it) and requests fail immediately with
+    `CircuitOpenError`. Once the cooldown is over, requests are sent again: a success closes
+    the circuit, a failure opens it again.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_until: Optional[float] = None  # time.monotonic
+
+    @property
+    def remaining(self) -> float:
+        """
+        Seconds until the circuit can be tested again, 0 if requests can be sent.
+        """
+        if self.opened_until is None:
+            return 0
+        return max(0, self.opened_until - time.monotonic())
+
+    def check(self):
+        """
+        Raises
+        ------
+        CircuitOpenError
+            The circuit is open.
+        """
+        remaining = self.remaining
+        if remaining:
+            raise CircuitOpenError(remaining)
+
+    def open(self, delay: float):
+        self.opened_until = time.monotonic() + delay
+        log.warning(f"Challonge is unavailable, pausing requests for {round(delay)} seconds.")
+
+    def success(self):
+        if self.opened_until is not None:
+            log.info("Challonge is available again, resuming requests.")
+        self.failures = 0
+        self.opened_until = None
+
+    def failure(self, retry_after: Optional[float] = None):
+        self.failures += 1
+        # too many errors, or the first request after the cooldown failed
+        if self.failures >= self.threshold or self.opened_until is not None:
+            self.open(max(self.cooldown, retry_after or 0))
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing ``rate`` requests per second on average, with bursts of ``capacity``
+    requests. Requests waiting for a token are served in order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
 
-    This function is made by Wonderfall.
+
+def is_temporary_error(error: Exception) -> bool:
+    """
+    Return `True` if the request failed because of a timeout, a connection error or a
+    temporary error from the provider (see `RETRY_STATUSES`), and can succeed later.
+    """
+    if isinstance(error, CircuitOpenError):
+        return True
+    if isinstance(error, ChallongeException):
+        return str(error).split(" ", 1)[0] in RETRY_STATUSES
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse the value of a Retry-After header, either seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+async def async_http_retry(
+    factory: Callable[[], Awaitable],
+    *,
+    retries: int = 3,
+    base_delay: float = 1,
+    max_delay: float = 10,
+    breaker: Optional[CircuitBreaker] = None,
+):
+    """
+    Sends a request, retrying in case of a temporary error (see `is_temporary_error`).
+
+    Retries are delayed with an exponential backoff and jitter, or with the delay of the
+    Retry-After header if the exception has a ``retry_after`` attribute. If this delay is
+    longer than ``max_delay``, the error is raised instead.
+
+    Based on the function made by Wonderfall.
     https://github.com/Wonderfall/ATOS/blob/cac2c561c8f1ce23277765bcb43cd6421129d8a1/utils/http_retry.py#L6
+
+    Parameters
+    ----------
+    factory: Callable[[], Awaitable]
+        A function creating the request, called for each attempt (a coroutine can only be
+        awaited once).
+    retries: int
+        Number of retries after the first attempt. Defaults to 3.
+    base_delay: float
+        Delay before the first retry, doubled after each retry. Defaults to 1 second.
+    max_delay: float
+        Maximum delay between two attempts. Defaults to 10 seconds.
+    breaker: Optional[CircuitBreaker]
+        A circuit breaker checked before each attempt, and notified of the results.
+
+    Raises
+    ------
+    CircuitOpenError
+        The circuit is open.
+    asyncio.TimeoutError
+        All attempts timed out.
     """
-    last_exc = None
-    for retry in range(1):
+    for retry in range(retries + 1):
+        if breaker is not None:
+            breaker.check()
         try:
-            return await coro
-        except ChallongeException as e:
-            last_exc = e
-            if "504" in str(e):  # Gateway timeout
-                await asyncio.sleep(1 + retry)
-            else:
+            result = await factory()
+        except Exception as e:
+            if not is_temporary_error(e):
                 raise
-        except asyncio.exceptions.TimeoutError as e:
             last_exc = e
-            continue
-    else:
-        raise asyncio.TimeoutError from last_exc
+        else:
+            if breaker is not None:
+                breaker.success()
+            return result
+        retry_after = getattr(last_exc, "retry_after", None)
+        if breaker is not None:
+            breaker.failure(retry_after)
+        if retry_after is not None:
+            if retry_after > max_delay:
+                if breaker is not None:
+                    breaker.open(max(breaker.remaining, retry_after))
+                break
+            delay = retry_after
+        else:
+            delay = min(max_delay, base_delay * 2**retry)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry == retries:
+            break
+        log.debug(f"Request to Challonge failed ({last_exc!r}), retrying in {delay:.1f}s.")
+        await asyncio.sleep(delay)
+    if isinstance(last_exc, ChallongeException):
+        raise last_exc
+    raise asyncio.TimeoutError from last_exc
 
 
 async def prompt_yes_or_no(
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+
+from aiohttp import web
+from typing import TYPE_CHECKING, Optional, Set
+
+if TYPE_CHECKING:
+    from .tournaments import Tournaments
+
+log = logging.getLogger("red.laggron.tournaments")
+
+
+class WebhookReceiver:
+    """
+    A small HTTP server receiving the webhooks of the bracket host.
+
+    Each server has its own URL, ``/tournaments/{guild_id}/{token}``, the token being derived
+    from a secret only known by the bot. The body only tells what changed, the data itself is
+    always fetched again from the bracket, so a forged request cannot modify a tournament.
+
+    Parameters
+    ----------
+    cog: Tournaments
+        The cog, used for finding the tournament of a server.
+    secret: str
+        The secret used for generating the tokens of each server.
+    """
+
+    def __init__(self, cog: "Tournaments", secret: str):
+        self.cog = cog
+        self.secret = secret
+        self.runner: Optional[web.AppRunner] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self.runner is not None
+
+    def get_token(self, guild_id: int) -> str:
+        digest = hmac.new(self.secret.encode(), str(guild_id).encode(), hashlib.sha256)
+        return digest.hexdigest()[:32]
+
+    def get_path(self, guild_id: int) -> str:
+        return f"/tournaments/{guild_id}/{self.get_token(guild_id)}"
+
+    async def start(self, host: str, port: int):
+        """
+        Start listening on the given address.
+
+        Raises
+        ------
+        OSError
+            The address is invalid or already in use.
+        """
+        app = web.Application()
+        app.router.add_post("/tournaments/{guild_id}/{token}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+        except Exception:
+            await runner.cleanup()
+            raise
+        self.runner = runner
+        log.info(f"Listening for webhooks on {host}:{port}.")
+
+    async def stop(self):
+        if self.runner is None:
+            return
+        runner, self.runner = self.runner, None
+        await runner.cleanup()
+        for task in self.tasks:
+            task.cancel()
+        log.info("Stopped listening for webhooks.")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        try:
+            guild_id = int(request.match_info["guild_id"])
+        except ValueError:
+            raise web.HTTPNotFound()
+        if not hmac.compare_digest(request.match_info["token"], self.get_token(guild_id)):
+            raise web.HTTPNotFound()
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Invalid JSON body.")
+        if not isinstance(payload, dict):
+            raise web.HTTPBadRequest(text="Invalid JSON body.")
+        tournament = self.cog.tournaments.get(guild_id)
+        if tournament is None or tournament.phase != "ongoing":
+            # nothing to refresh, but the hook is valid, don't make the host retry
+            return web.Response(status=204)
+        # answer now, the bracket host doesn't have to wait for the refresh
+        task = asyncio.create_task(self._process(tournament, payload))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.Response(status=202)
+
+    async def _process(self, tournament, payload: dict):
+        try:
+            await tournament.process_webhook(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"[Guild {tournament.guild.id}] Failed to process a webhook.", exc_info=e)
@@ -4,6 +4,7 @@ import re
 
 from redbot.core.i18n import Translator
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from datetime import datetime, timedelta
 
 try:
@@ -204,6 +205,8 @@ async def setup(bot: Red):
         ) from e
     await bot.add_cog(n)
     await n.cache.init_automod_enabled()
+    await n.api.metrics.init_enabled(n.data)
+    await n.cache.init_temp_actions(cog_data_path(n) / "temp_actions.jsonl")
     n.task = bot.loop.create_task(n.api._loop_task())
     if n.cache.automod_enabled:
         n.api.enable_automod()
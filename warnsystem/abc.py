@@ -22,3 +22,4 @@ class MixinMeta(ABC):
         self.data: Config
         self.cache: MemoryCache
         self.api: API
+        self.rerender_tasks: dict
@@ -5,8 +5,9 @@ import re
 import functools
 
 from copy import deepcopy
-from collections import namedtuple
-from typing import Union, Optional, Iterable, Callable, Awaitable
+from collections import Counter, OrderedDict, namedtuple
+from collections.abc import Mapping
+from typing import Union, Optional, Iterable, Callable, Awaitable, Tuple
 from datetime import datetime, timedelta, timezone
 from multiprocessing import TimeoutError
 from multiprocessing.pool import Pool
@@ -23,11 +24,15 @@ except RuntimeError:
     pass  # running sphinx-build raises an error when importing this module
 
 from .cache import MemoryCache
+from .metrics import WarnMetrics
+from .queues import KeyedQueue
 from . import errors
 
 log = logging.getLogger("red.laggron.warnsystem")
 _ = Translator("WarnSystem", __file__)
 id_pattern = re.compile(r"([0-9]{15,21})$")
+invite_pattern = re.compile(r"(https?://)?(discord\.gg|discord(app)?\.com/invite)/[\w-]+")
+RERENDER_BATCH_SIZE = 25  # modlog messages edited between two saves of the position
 
 
 class SafeMember:
@@ -157,6 +162,97 @@ class UnavailableMember(discord.Object, discord.abc.Messageable):
         return channel
 
 
+class UserResolver:
+    """
+    Resolve user IDs into users, giving one shared object per ID.
+
+    Users not cached by the bot are given as :class:`UnavailableMember`, taken from the
+    given LRU cache if any so they can be shared between successive listings.
+    """
+
+    lru_size = 2000
+
+    def __init__(self, bot: Red, lru: Optional["OrderedDict[int, UnavailableMember]"] = None):
+        self.bot = bot
+        self.lru = lru
+        self.users = {}
+
+    def resolve(self, user_id: Union[int, str]) -> Union[discord.User, UnavailableMember]:
+        user_id = int(user_id)
+        try:
+            return self.users[user_id]
+        except KeyError:
+            pass
+        user = self.bot.get_user(user_id)
+        if user is None:
+            user = self._get_unavailable(user_id)
+        self.users[user_id] = user
+        return user
+
+    def _get_unavailable(self, user_id: int) -> UnavailableMember:
+        if self.lru is None:
+            # gotta get that state somehow
+            return UnavailableMember(self.bot, self.bot.user._state, user_id)
+        try:
+            self.lru.move_to_end(user_id)
+            return self.lru[user_id]
+        except KeyError:
+            pass
+        user = self.lru[user_id] = UnavailableMember(self.bot, self.bot.user._state, user_id)
+        if len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+        return user
+
+
+class Case(Mapping):
+    """
+    A case of the guild modlog, as returned by :meth:`API.get_all_cases`.
+
+    Values are accessed like a :py:class:`dict` (``case["level"]``) or as attributes.
+    """
+
+    __slots__ = (
+        "member",
+        "level",
+        "author",
+        "reason",
+        "time",
+        "duration",
+        "roles",
+        "modlog_message",
+    )
+
+    def __init__(
+        self,
+        member: Union[discord.User, UnavailableMember],
+        author: Union[discord.User, UnavailableMember],
+        data: dict,
+        time: Optional[datetime],
+    ):
+        self.member = member
+        self.level = data["level"]
+        self.author = author
+        self.reason = data["reason"]
+        self.time = time
+        self.duration = data.get("duration")
+        self.roles = data.get("roles", [])
+        self.modlog_message = data.get("modlog_message")
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        return f"<Case member={self.member.id} level={self.level} time={self.time}>"
+
+
 class API:
     """
     Interact with WarnSystem from your cog.
@@ -184,10 +280,17 @@ class API:
         self.cache = cache
         self.re_pool = Pool(maxtasksperchild=1000)
         self.regex_timeout = 1
-        self.warned_guilds = []  # see automod_check_for_autowarn
+        self.unavailable_users = OrderedDict()  # LRU of UnavailableMember, see get_all_cases
+        self.metrics = WarnMetrics(bot)  # see warn
+        # checking a modlog for autowarns can be heavy, those checks are queued instead
+        self.autowarn_queue = KeyedQueue("autowarn check", self.automod_check_for_autowarn)
         self.antispam = {}  # see automod_process_antispam
-        self.antispam_warn_queue = {}  # see automod_warn
-        self.automod_warn_task: asyncio.Task
+        # since this is asyncronous code, sometimes there can be too many warnings performed
+        # especially with message antispam, since it treats multiple messages simultaneously
+        # a member is not queued again until their warn is done, preventing duplicate warnings
+        self.antispam_warn_queue = KeyedQueue(
+            "antispam warn", self._automod_antispam_warn, dedupe_running=True
+        )
 
     def _get_datetime(self, time: int) -> datetime:
         return datetime.fromtimestamp(int(time), tz=timezone.utc)
@@ -397,40 +500,237 @@ class API:
                 ]
 
             However, if you didn't specify a user, you got all cases of the guild. As for the user,
-            you will get a :py:class:`list` of the cases, with another key for specifying the
-            warned user:
+            you will get a :py:class:`list` of the cases, given as :class:`Case` objects which
+            can be read like a :py:class:`dict`, with another key for specifying the warned user:
 
             .. code-block:: python3
 
                 {  # case #1
                     "level"     : int,  # between 1 and 5, the warning level
-                    "author"    : Union[discord.Member, str],  # the member that warned the user
+                    "author"    : discord.User,  # the member that warned the user
                     "reason"    : Optional[str],  # the reason of the warn, can be None
                     "time"      : datetime.datetime,  # the date when the warn was set
 
                     "member"    : discord.User,  # the member warned, this key is specific to guild
                 }
+
+            Users are shared between cases, users not cached by the bot are given as
+            :class:`UnavailableMember`.
         """
         if user:
             return await self.data.custom("MODLOGS", guild.id, user.id).x()
         logs = await self.data.custom("MODLOGS", guild.id).all()
+        users = UserResolver(self.bot, self.unavailable_users)
         all_cases = []
         for member, content in logs.items():
             if member == "x":
                 continue
+            member = users.resolve(member)
             for log in content["x"]:
                 time = log["time"]
-                if time:
-                    log["time"] = self._get_datetime(time)
-                # gotta get that state somehow
-                log["member"] = self.bot.get_user(int(member)) or UnavailableMember(
-                    self.bot, self.bot.user._state, member
-                )
-                log["author"] = self.bot.get_user(int(log["author"])) or UnavailableMember(
-                    self.bot, self.bot.user._state, log["author"]
+                all_cases.append(
+                    Case(
+                        member,
+                        users.resolve(log["author"]),
+                        log,
+                        self._get_datetime(time) if time else time,
+                    )
                 )
-                all_cases.append(log)
-        return sorted(all_cases, key=lambda x: x["time"])  # sorted from oldest to newest
+        return sorted(all_cases, key=lambda x: x.time)  # sorted from oldest to newest
+
+    async def _get_case_modlog_embed(
+        self,
+        guild: discord.Guild,
+        member: Union[discord.Member, discord.User, UnavailableMember],
+        case: dict,
+        previous_cases: list,
+        old_embed: Optional[discord.Embed] = None,
+    ) -> discord.Embed:
+        """
+        Render the modlog embed of a stored case again, with the current settings.
+
+        No invite is created, the one of ``old_embed`` is reused. If there is none, the
+        description of ``old_embed`` is kept.
+        """
+        try:
+            author_id = int(case["author"])
+        except (TypeError, ValueError):
+            # not an ID (None or imported cases), shown as is like in [p]warnings
+            author_id = None
+            author = UnavailableMember(self.bot, guild._state, 0)
+        else:
+            author = (
+                guild.get_member(author_id)
+                or self.bot.get_user(author_id)
+                or UnavailableMember(self.bot, guild._state, author_id)
+            )
+        invite = None
+        if old_embed and old_embed.description:
+            invite = invite_pattern.search(old_embed.description)
+        duration = self._get_timedelta(case["duration"]) if case.get("duration") else None
+        embeds = await self.get_embeds(
+            guild,
+            member,
+            author,
+            case["level"],
+            case["reason"],
+            duration,
+            self._get_datetime(case["time"]),
+            previous_cases=previous_cases,
+            create_invite=False,
+            invite=invite.group() if invite else None,
+        )
+        embed = embeds[0]
+        if author_id is None:
+            embed.set_field_at(
+                1, name=_("Moderator"), value="ID: " + str(case["author"]), inline=True
+            )
+        if old_embed and not invite:
+            embed.description = old_embed.description
+        return embed
+
+    async def _edit_modlog_message(
+        self,
+        guild: discord.Guild,
+        member: Union[discord.Member, discord.User, UnavailableMember],
+        case: dict,
+        previous_cases: list,
+    ) -> bool:
+        # the embed is rendered from the case, the message is only fetched for its invite
+        channel_id, message_id = case["modlog_message"].values()
+        channel: discord.TextChannel = guild.get_channel(channel_id)
+        if channel is None:
+            log.warn(
+                f"[Guild {guild.id}] Failed to edit modlog message. "
+                f"Channel {channel_id} not found."
+            )
+            return False
+        message = channel.get_partial_message(message_id)
+        modlog_description = await self.data.guild(guild).embed_description_modlog.get_raw(
+            case["level"]
+        )
+        try:
+            old_embed = None
+            if "{invite}" in modlog_description:
+                old_message = await message.fetch()
+                old_embed = old_message.embeds[0] if old_message.embeds else None
+            embed = await self._get_case_modlog_embed(
+                guild, member, case, previous_cases, old_embed
+            )
+            await message.edit(embed=embed)
+        except discord.errors.NotFound:
+            log.warn(
+                f"[Guild {guild.id}] Failed to edit modlog message. "
+                f"Message {message_id} in channel {channel.id} not found."
+            )
+            return False
+        except discord.errors.Forbidden:
+            log.warn(
+                f"[Guild {guild.id}] Failed to edit modlog message. "
+                f"No permissions to edit messages in channel {channel.id}."
+            )
+            return False
+        except discord.errors.HTTPException as e:
+            log.error(
+                f"[Guild {guild.id}] Failed to edit modlog message. "
+                "Unknown error when attempting message edition.",
+                exc_info=e,
+            )
+            return False
+        return True
+
+    async def _delete_modlog_message(
+        self, guild: discord.Guild, channel_id: int, message_id: int
+    ) -> bool:
+        channel: discord.TextChannel = guild.get_channel(channel_id)
+        if channel is None:
+            log.warn(
+                f"[Guild {guild.id}] Failed to delete modlog message. "
+                f"Channel {channel_id} not found."
+            )
+            return False
+        try:
+            await channel.get_partial_message(message_id).delete()
+        except discord.errors.NotFound:
+            log.warn(
+                f"[Guild {guild.id}] Failed to delete modlog message. "
+                f"Message {message_id} in channel {channel.id} not found."
+            )
+            return False
+        except discord.errors.Forbidden:
+            log.warn(
+                f"[Guild {guild.id}] Failed to delete modlog message. "
+                f"No permissions to delete messages in channel {channel.id}."
+            )
+            return False
+        except discord.errors.HTTPException as e:
+            log.error(
+                f"[Guild {guild.id}] Failed to delete modlog message. "
+                "Unknown error when attempting message deletion.",
+                exc_info=e,
+            )
+            return False
+        return True
+
+    async def rerender_modlog(
+        self, guild: discord.Guild, *, restart: bool = False, workers: int = 3
+    ) -> Tuple[int, int]:
+        """
+        Edit all modlog messages of the guild with the current embed settings.
+
+        Messages are edited concurrently, in order of member ID then case number. The position
+        is saved after each batch, an interrupted job continues from there on the next call.
+
+        Parameters
+        ----------
+        guild: discord.Guild
+            The guild where the modlog messages should be edited.
+        restart: bool
+            Start from the first message, even if a previous job was interrupted.
+        workers: int
+            The number of messages edited at the same time. discord.py already waits for the
+            rate limits of the channels, this only limits how many requests are waiting.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The number of messages edited, and the number of messages that failed.
+        """
+        cursor = None if restart else await self.data.guild(guild).rerender_cursor()
+        cursor = tuple(cursor) if cursor else (0, 0)
+        modlogs = await self.data.custom("MODLOGS", guild.id).all()
+        users = UserResolver(self.bot, self.unavailable_users)
+        results = Counter()
+
+        async def edit(member, case: dict, previous_cases: list):
+            edited = await self._edit_modlog_message(guild, member, case, previous_cases)
+            results[edited] += 1
+
+        queue = KeyedQueue("modlog rerender", edit, workers=workers, maxsize=0)  # see batches
+        try:
+            batch = 0
+            for member_id in sorted(int(x) for x in modlogs if x != "x"):
+                logs = modlogs[str(member_id)]["x"]
+                member = guild.get_member(member_id) or users.resolve(member_id)
+                for index, case in enumerate(logs, start=1):
+                    if (member_id, index) <= cursor or "modlog_message" not in case:
+                        continue
+                    await queue.put((member_id, index), member, case, logs[: index - 1])
+                    batch += 1
+                    if batch >= RERENDER_BATCH_SIZE:
+                        await queue.queue.join()
+                        await self.data.guild(guild).rerender_cursor.set([member_id, index])
+                        batch = 0
+            await queue.queue.join()
+        finally:
+            queue.stop()
+        await self.data.guild(guild).rerender_cursor.clear()
+        # jobs that raised are only counted by the queue
+        failed = results[False] + queue.failed
+        log.info(
+            f"[Guild {guild.id}] Re-rendered {results[True]} modlog messages, {failed} failed."
+        )
+        return results[True], failed
 
     async def edit_case(
         self,
@@ -466,68 +766,16 @@ class API:
         ~warnsystem.errors.NotFound
             The case requested doesn't exist.
         """
-
-        async def edit_message(channel_id: int, message_id: int, new_reason: str):
-            channel: discord.TextChannel = guild.get_channel(channel_id)
-            if channel is None:
-                log.warn(
-                    f"[Guild {guild.id}] Failed to edit modlog message. "
-                    f"Channel {channel_id} not found."
-                )
-                return False
-            try:
-                message: discord.Message = await channel.fetch_message(message_id)
-            except discord.errors.NotFound:
-                log.warn(
-                    f"[Guild {guild.id}] Failed to edit modlog message. "
-                    f"Message {message_id} in channel {channel.id} not found."
-                )
-                return False
-            except discord.errors.Forbidden:
-                log.warn(
-                    f"[Guild {guild.id}] Failed to edit modlog message. "
-                    f"No permissions to fetch messages in channel {channel.id}."
-                )
-                return False
-            except discord.errors.HTTPException as e:
-                log.error(
-                    f"[Guild {guild.id}] Failed to edit modlog message. API exception raised.",
-                    exc_info=e,
-                )
-                return False
-            try:
-                embed: discord.Embed = message.embeds[0]
-                embed.set_field_at(
-                    len(embed.fields) - 2, name=_("Reason"), value=new_reason, inline=False
-                )
-            except IndexError as e:
-                log.error(
-                    f"[Guild {guild.id}] Failed to edit modlog message. Embed is malformed.",
-                    exc_info=e,
-                )
-                return False
-            try:
-                await message.edit(embed=embed)
-            except discord.errors.HTTPException as e:
-                log.error(
-                    f"[Guild {guild.id}] Failed to edit modlog message. "
-                    "Unknown error when attempting message edition.",
-                    exc_info=e,
-                )
-                return False
-            return True
-
         if len(new_reason) > 1024:
             raise errors.BadArgument("The reason must not be above 1024 characters.")
-        case = await self.get_case(guild, user, index)
-        case["reason"] = new_reason
-        case["time"] = int(case["time"].timestamp())
+        logs = await self.data.custom("MODLOGS", guild.id, user.id).x()
         try:
-            channel_id, message_id = case["modlog_message"].values()
-        except KeyError:
-            pass
-        else:
-            await edit_message(channel_id, message_id, new_reason)
+            case = logs[index - 1]
+        except IndexError:
+            raise errors.NotFound("The case requested doesn't exist.")
+        case["reason"] = new_reason
+        if "modlog_message" in case:
+            await self._edit_modlog_message(guild, user, case, logs[: index - 1])
         async with self.data.custom("MODLOGS", guild.id, user.id).x() as logs:
             logs[index - 1] = case
         log.debug(
@@ -542,45 +790,6 @@ class API:
         user: Union[discord.Member, UnavailableMember],
         index: int,
     ):
-        async def delete_message(channel_id: int, message_id: int):
-            channel: discord.TextChannel = guild.get_channel(channel_id)
-            if channel is None:
-                log.warn(
-                    f"[Guild {guild.id}] Failed to delete modlog message. "
-                    f"Channel {channel_id} not found."
-                )
-                return False
-            try:
-                message: discord.Message = await channel.fetch_message(message_id)
-            except discord.errors.NotFound:
-                log.warn(
-                    f"[Guild {guild.id}] Failed to delete modlog message. "
-                    f"Message {message_id} in channel {channel.id} not found."
-                )
-                return False
-            except discord.errors.Forbidden:
-                log.warn(
-                    f"[Guild {guild.id}] Failed to delete modlog message. "
-                    f"No permissions to fetch messages in channel {channel.id}."
-                )
-                return False
-            except discord.errors.HTTPException as e:
-                log.error(
-                    f"[Guild {guild.id}] Failed to delete modlog message. API exception raised.",
-                    exc_info=e,
-                )
-                return False
-            try:
-                await message.delete()
-            except discord.errors.HTTPException as e:
-                log.error(
-                    f"[Guild {guild.id}] Failed to delete modlog message. "
-                    "Unknown error when attempting message deletion.",
-                    exc_info=e,
-                )
-                return False
-            return True
-
         case = await self.get_case(guild, user, index)
         can_unmute = False
         add_roles = False
@@ -603,7 +812,7 @@ class API:
             except KeyError:
                 pass
             else:
-                await delete_message(channel_id, message_id)
+                await self._delete_modlog_message(guild, channel_id, message_id)
             logs.remove(logs[index - 1])
         if add_roles and roles:
             roles = [guild.get_role(x) for x in roles]
@@ -704,6 +913,9 @@ class API:
         time: Optional[timedelta] = None,
         date: Optional[datetime] = None,
         message_sent: bool = True,
+        previous_cases: Optional[list] = None,
+        create_invite: bool = True,
+        invite: Optional[str] = None,
     ) -> tuple:
         """
         Return two embeds, one for the modlog and one for the member.
@@ -731,6 +943,14 @@ class API:
             When the action was taken.
         message_sent: bool
             Set to :py:obj:`False` if the embed couldn't be sent to the warned user.
+        previous_cases: Optional[list]
+            The cases of the member before this warning, used for the status field. Read from
+            the modlog if omitted.
+        create_invite: bool
+            Set to :py:obj:`False` to prevent creating an invite for the ``{invite}``
+            substitution.
+        invite: Optional[str]
+            An existing invite used for the ``{invite}`` substitution, instead of creating one.
 
         Returns
         -------
@@ -748,7 +968,9 @@ class API:
         if not reason:
             reason = _("No reason was provided.")
             mod_message = _("\nEdit this with `[p]warnings {id}`").format(id=member.id)
-        logs = await self.data.custom("MODLOGS", guild.id, member.id).x()
+        if previous_cases is None:
+            previous_cases = await self.data.custom("MODLOGS", guild.id, member.id).x()
+        logs = previous_cases
 
         # prepare the status field
         total_warns = len(logs) + 1
@@ -770,9 +992,10 @@ class API:
         )
 
         # we set any value that can be used multiple times
-        invite = None
+        if invite is None and not create_invite:
+            invite = _("*[couldn't create an invite]*")
         log_description = await self.data.guild(guild).embed_description_modlog.get_raw(level)
-        if "{invite}" in log_description:
+        if "{invite}" in log_description and not invite:
             try:
                 invite = await guild.create_invite(max_uses=1)
             except Exception:
@@ -1101,6 +1324,7 @@ class API:
         async def warn_member(member: Union[discord.Member, UnavailableMember], audit_reason: str):
             nonlocal i
             roles = []
+            timer = self.metrics.timer(guild.id)
             # permissions check
             if level > 1 and guild.me.top_role.position <= member.top_role.position:
                 # check if the member is below the bot in the roles's hierarchy
@@ -1129,11 +1353,13 @@ class API:
                         "(use a manual kick/ban instead, warning the bot will cause issues)"
                     )
                 )
+            timer.lap("checks")
             # send the message to the user
             if log_modlog or log_dm:
                 modlog_e, user_e = await self.get_embeds(
                     guild, member, author, level, reason, time, date
                 )
+                timer.lap("embeds")
             if log_dm:
                 try:
                     await member.send(embed=user_e)
@@ -1156,6 +1382,7 @@ class API:
                         f"(ID: {member.id}) because of an HTTPException.",
                         exc_info=e,
                     )
+                timer.lap("dm")
             # take actions
             if take_action:
                 audit_reason = audit_reason.format(member=member)
@@ -1197,23 +1424,29 @@ class API:
                         exc_info=e,
                     )
                     return e
+                timer.lap("action")
             # actions were taken, time to log
             if log_modlog:
                 modlog_message = await mod_channel.send(embed=modlog_e)
+                timer.lap("modlog")
             else:
                 modlog_message = None
             data = await self._create_case(
                 guild, member, author, level, date, reason, time, roles, modlog_message
             )
+            timer.lap("case")
             # start timer if there is a temporary warning
             if time and (level == 2 or level == 5):
                 await self._start_timer(guild, member, data)
+                timer.lap("timer")
             if automod:
                 # This function can be pretty heavy, and the response can be seriously delayed
                 # because of this, so we make it a side process instead
-                self.bot.loop.create_task(
-                    self.automod_check_for_autowarn(guild, member, author, level)
-                )
+                # only one check is queued per member for the same level and kind of author
+                key = (guild.id, member.id, level, author.id == self.bot.user.id)
+                await self.autowarn_queue.put(key, guild, member, author, level)
+                timer.lap("autowarn")
+            timer.done()
             self.bot.dispatch(
                 "warnsystem_warn",
                 member=member,
@@ -1229,6 +1462,7 @@ class API:
 
         if not 1 <= level <= 5:
             raise errors.InvalidLevel("The level must be between 1 and 5.")
+        settings_timer = self.metrics.timer(guild.id)
         # we get the modlog channel now to make sure it exists before doing anything
         if log_modlog:
             mod_channel = await self.get_modlog_channel(guild, level)
@@ -1290,6 +1524,8 @@ class API:
                 audit_reason += _("Reason too long to be shown.")
         if not date:
             date = datetime.now(timezone.utc)
+        settings_timer.lap("settings")
+        settings_timer.done(total=False)
 
         i = 0
         fails = [await warn_member(x, audit_reason) for x in members if x]
@@ -1344,7 +1580,10 @@ class API:
             if not data:
                 continue
             to_remove = []
-            for member_id, action in data.items():
+            # listeners modify the temporary actions while we're awaiting below
+            for member_id, action in list(data.items()):
+                if (await self.cache.get_temp_action(guild)).get(member_id) is not action:
+                    continue  # removed or replaced in the meantime
                 member_id = int(member_id)
                 try:
                     taken_on = self._get_datetime(action["time"])
@@ -1436,6 +1675,7 @@ class API:
         while True:
             try:
                 await self._check_endwarn()
+                await self.cache.maybe_compact_temp_actions()
             except Exception as e:
                 errors += 1
                 if errors >= 3:
@@ -1460,7 +1700,7 @@ class API:
         """
         log.info("Enabling automod listeners and event loops.")
         self.bot.add_listener(self.automod_on_message, name="on_message")
-        self.automod_warn_task = self.bot.loop.create_task(self.automod_warn_loop())
+        self.antispam_warn_queue.start()
 
     def disable_automod(self):
         """
@@ -1468,8 +1708,7 @@ class API:
         """
         log.info("Disabling automod listeners and event loops.")
         self.bot.remove_listener(self.automod_on_message, name="on_message")
-        if hasattr(self, "automod_warn_task"):
-            self.automod_warn_task.cancel()
+        self.antispam_warn_queue.stop()
 
     async def _check_if_automod_valid(self, message: discord.Message):
         guild = message.guild
@@ -1482,11 +1721,11 @@ class API:
             return False
         if not self.cache.is_automod_enabled(guild):
             return False
-        if await self.bot.is_automod_immune(message):
-            return False
-        if await self.bot.is_mod(member):
-            return False
-        return True
+        exempt = self.cache.get_automod_exemption(member)
+        if exempt is None:
+            exempt = await self.bot.is_automod_immune(message) or await self.bot.is_mod(member)
+            self.cache.set_automod_exemption(member, exempt)
+        return not exempt
 
     async def automod_on_message(self, message: discord.Message):
         if not await self._check_if_automod_valid(message):
@@ -1606,9 +1845,8 @@ class API:
         antispam_data = await self.cache.get_automod_antispam(guild)
         if antispam_data is False:
             return
-        for word in antispam_data["whitelist"]:
-            if word in message.content:
-                return
+        if self.cache.is_antispam_whitelisted(guild, message.content):
+            return
 
         # we slowly go across each key, if it doesn't exist, data is created then the
         # function ends since there's no data to check
@@ -1660,16 +1898,15 @@ class API:
             data = InitialData(messages=[], warned=bot_message.created_at)
         else:
             # already warned once within delay_before_action, gotta take actions
-            warn_data = antispam_data["warn"]
+            warn_data = antispam_data["warn"].copy()
             warn_data["author"] = guild.me
             if warn_data["time"]:
                 warn_data["time"] = self._get_timedelta(warn_data["time"])
-            try:
-                self.antispam_warn_queue[guild.id][member] = warn_data
-            except KeyError:
-                self.antispam_warn_queue[guild.id] = {member: warn_data}
             # also reset the data
             data = InitialData(messages=[], warned=message.created_at)
+            self.antispam[guild.id][channel.id][member.id] = data
+            await self.antispam_warn_queue.put((guild.id, member.id), member, warn_data)
+            return
         self.antispam[guild.id][channel.id][member.id] = data
 
     def _automod_clean_old_messages(self, delay: int, current_time: datetime, messages: list):
@@ -1707,21 +1944,12 @@ class API:
         therefore, save performances.
 
         This can be a heavy call if there are a lot of possible autowarns and a long modlog.
+        Warnings queue this call in :attr:`autowarn_queue`, which records how long it takes.
         """
-        t = datetime.now()
         try:
             await self._automod_check_for_autowarn(guild, member, author, level)
         except Exception as e:
             log.error(f"[Guild {guild.id}] A problem occured with automod check.", exc_info=e)
-        time_taken: timedelta = datetime.now() - t
-        if time_taken.total_seconds() > 10 and guild.id not in self.warned_guilds:
-            self.warned_guilds.append(guild.id)
-            log.warning(
-                f"[Guild {guild.id}] Automod check took a long time! Time taken: {time_taken}\n"
-                "Try to reduce the amount of warns/autowarns or blame Laggron for poorly "
-                "written code (second option is preferred).\nThis warning will not show again "
-                "for this guild until reload."
-            )
 
     async def _automod_check_for_autowarn(
         self, guild: discord.Guild, member: discord.Member, author: discord.Member, level: int
@@ -1753,34 +1981,35 @@ class API:
             return  # no autowarn to iterate through
         for i, autowarn in enumerate(autowarns):
             # prepare for iteration
-            autowarns[i]["count"] = 0
+            # the index stays the same when other autowarns are removed from the list
+            autowarn["index"] = i
+            autowarn["count"] = 0
             # if the condition is met (within the specified time? not an automatic warn?)
             # we increase this value until reaching the given limit
             time = autowarn["time"]
             if time:
                 until = datetime.now(timezone.utc) - timedelta(seconds=time)
-                autowarns[i]["until"] = until
+                autowarn["until"] = until
         del time
-        found_warnings = {}  # we fill this list with the valid autowarns, there can be more than 1
+        found_warnings = {}  # we fill this dict with the valid autowarns, there can be more than 1
         for warn in warns[::-1]:
             to_remove = []  # list of autowarns to remove during the iteration (duration expired)
             taken_on = datetime.fromtimestamp(warn["time"], timezone.utc)
-            for i, autowarn in enumerate(autowarns):
+            for autowarn in autowarns:
                 try:
                     if autowarn["until"] >= taken_on:
-                        to_remove.append(i)
+                        to_remove.append(autowarn["index"])
                         continue
                 except KeyError:
                     pass
-                autowarns[i]["count"] += 1
-                if autowarns[i]["count"] == autowarn["number"]:
-                    found_warnings[i] = autowarn["warn"]
-                if autowarns[i]["count"] > autowarn["number"]:
+                autowarn["count"] += 1
+                if autowarn["count"] == autowarn["number"]:
+                    found_warnings[autowarn["index"]] = autowarn["warn"]
+                if autowarn["count"] > autowarn["number"]:
                     # value exceeded, no need to continue, it's already done for this one warn
-                    to_remove.append(i)
-                    del found_warnings[i]
-            for index in reversed(to_remove):
-                autowarns.pop(index)
+                    to_remove.append(autowarn["index"])
+                    del found_warnings[autowarn["index"]]
+            autowarns = [x for x in autowarns if x["index"] not in to_remove]
             if not autowarns:
                 # we could be out of autowarns to check after a certain time
                 # no need to continue the iteration
@@ -1808,54 +2037,11 @@ class API:
                     f"warn {i} on member {member} ({member.id})."
                 )
 
-    async def automod_warn_loop(self):
-        # since this is asyncronous code, sometimes there can be too many warnings performed
-        # especially with message antispam, since it treats multiple messages simultaneously
-        # instead, we have a dict of warnings to perform, and we remove it only once the warn is
-        # done. That way, duplicate warnings won't happen.
-
-        async def warn(member: discord.Member, data: dict):
-            guild = member.guild
-            try:
-                await self.warn(guild, [member], **data)
-            except Exception as e:
-                log.error(
-                    f"Cannot perform autowarn on member {member} ({member.id}). Data: {data}",
-                    exc_info=e,
-                )
-            finally:
-                await asyncio.sleep(1)
-                del self.antispam_warn_queue[guild.id][member]
-                if not self.antispam_warn_queue[guild.id]:
-                    del self.antispam_warn_queue[guild.id]
-
-        async def loop():
-            guild: discord.Guild
-            member: discord.Member
-            coros = []
-            for guild_id, data in self.antispam_warn_queue.items():
-                for member, value in data.items():
-                    coros.append(warn(member, value))
-            coros = asyncio.gather(*coros, return_exceptions=True)
-            await coros
-
-        errors = 0
-        while True:
-            try:
-                await loop()
-            except Exception as e:
-                errors += 1
-                if errors >= 3:
-                    # more than 3 errors in our loop, let's shut down the loop
-                    log.critical(
-                        "The loop for automod warnings encountered a third error. To prevent "
-                        "more damages, the loop will be cancelled. Timed mutes and bans no longer "
-                        "works for now. Reload the cog to start the loop back. If the problem "
-                        "persists, report the error and update the cog.",
-                        exc_info=e,
-                    )
-                    return
-                log.error(
-                    "Error in loop for automod warnings. The loop will be resumed.", exc_info=e
-                )
-            await asyncio.sleep(1)
+    async def _automod_antispam_warn(self, member: discord.Member, data: dict):
+        try:
+            await self.warn(member.guild, [member], **data)
+        except Exception as e:
+            log.error(
+                f"Cannot perform autowarn on member {member} ({member.id}). Data: {data}",
+                exc_info=e,
+            )
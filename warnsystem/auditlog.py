@@ -0,0 +1,211 @@
+import asyncio
+import discord
+import logging
+
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from redbot.core.bot import Red
+
+log = logging.getLogger("red.laggron.warnsystem")
+
+AUDIT_LOG_ACTIONS = {
+    3: discord.AuditLogAction.kick,
+    5: discord.AuditLogAction.ban,
+}
+
+
+class PendingAction:
+    """
+    A member removal or ban waiting for its audit log entry.
+    """
+
+    __slots__ = ("member", "level", "when", "poll")
+
+    def __init__(
+        self,
+        member: Union[discord.Member, discord.User],
+        level: int,
+        when: datetime,
+        poll: bool = True,
+    ):
+        self.member = member
+        self.level = level
+        self.when = when
+        self.poll = poll  # if False, only wait for the gateway to send the entry
+
+    def matches(self, entry: discord.AuditLogEntry) -> bool:
+        # same window as the previous implementation, one minute before and after the event
+        return abs(entry.created_at - self.when) < timedelta(minutes=1)
+
+
+class AuditLogWatcher:
+    """
+    Coalesce all manual kicks and bans of a guild waiting for their audit log entry.
+
+    Instead of scanning the audit log once per event, pending actions are stored and
+    the audit log is fetched once per interval, only for the new entries (``after``
+    cursor). All pending members are then matched in a single pass.
+
+    While actions younger than a minute are pending, the audit log is fetched every
+    ``interval`` seconds. Older actions are checked every ``slow_interval`` seconds, until they
+    expire after ``timeout`` seconds. A new action wakes the loop, the next fetch then happens
+    within ``interval`` seconds.
+
+    Entries received from the gateway (``on_audit_log_entry_create``) are given with
+    :meth:`feed`. Actions added with ``poll=False`` never trigger an audit log fetch and
+    only wait a minute for such an entry.
+    """
+
+    def __init__(
+        self,
+        bot: Red,
+        guild: discord.Guild,
+        callback: Callable[
+            [discord.Guild, Union[discord.Member, discord.User], int, discord.AuditLogEntry],
+            Awaitable[None],
+        ],
+        *,
+        interval: int = 10,
+        slow_interval: int = 300,
+        timeout: int = 900,
+    ):
+        self.bot = bot
+        self.guild = guild
+        self.callback = callback
+        self.interval = interval
+        self.slow_interval = slow_interval
+        self.timeout = timeout
+
+        self.pending: Dict[Tuple[int, int], PendingAction] = {}  # (level, member ID) = action
+        # entries we fetched before the gateway event arrived, kept for a minute
+        self.unmatched: Dict[Tuple[int, int], discord.AuditLogEntry] = {}
+        self.cursors: Dict[int, discord.Object] = {}  # level = last audit log entry seen
+        self.task: Optional[asyncio.Task] = None
+        self.new_action = asyncio.Event()
+
+    def add(self, member: Union[discord.Member, discord.User], level: int, poll: bool = True):
+        """
+        Register a manual action and make sure the watcher is running.
+        """
+        now = datetime.now(timezone.utc)
+        key = (level, member.id)
+        action = PendingAction(member, level, now, poll)
+        self._clean_expired()
+        entry = self.unmatched.pop(key, None)
+        if entry is not None and action.matches(entry):
+            self.bot.loop.create_task(self._dispatch(action, entry))
+            return
+        self.pending[key] = action
+        if not poll:
+            return
+        if level not in self.cursors:
+            self.cursors[level] = discord.Object(
+                id=discord.utils.time_snowflake(now - timedelta(minutes=1))
+            )
+        if self.task is None or self.task.done():
+            self.task = self.bot.loop.create_task(self._loop())
+        else:
+            self.new_action.set()
+
+    def feed(self, entry: discord.AuditLogEntry):
+        """
+        Match an audit log entry received from the gateway with the pending actions.
+        """
+        level = next((k for k, v in AUDIT_LOG_ACTIONS.items() if v == entry.action), None)
+        if level is None or entry.target is None:
+            return
+        self._clean_expired()
+        key = (level, entry.target.id)
+        pending = self.pending.get(key)
+        if pending is not None and pending.matches(entry):
+            del self.pending[key]
+            self.bot.loop.create_task(self._dispatch(pending, entry))
+        else:
+            self.unmatched[key] = entry
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def _dispatch(self, action: PendingAction, entry: discord.AuditLogEntry):
+        try:
+            await self.callback(self.guild, action.member, action.level, entry)
+        except Exception as e:
+            log.error(
+                f"[Guild {self.guild.id}] Failed to process manual action of member "
+                f"{action.member} ({action.member.id}).",
+                exc_info=e,
+            )
+
+    def _next_delay(self) -> int:
+        now = datetime.now(timezone.utc)
+        if any(now - x.when < timedelta(minutes=1) for x in self.pending.values() if x.poll):
+            return self.interval
+        return self.slow_interval
+
+    async def _wait(self):
+        """
+        Sleep until the next fetch, a new action shortens the delay to ``interval``.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._next_delay()
+        while True:
+            self.new_action.clear()
+            try:
+                await asyncio.wait_for(self.new_action.wait(), timeout=deadline - loop.time())
+            except asyncio.TimeoutError:
+                return
+            deadline = min(deadline, loop.time() + self.interval)
+
+    def _clean_expired(self):
+        now = datetime.now(timezone.utc)
+        timeout = timedelta(seconds=self.timeout)
+        self.pending = {
+            k: v
+            for k, v in self.pending.items()
+            if now - v.when < (timeout if v.poll else timedelta(minutes=1))
+        }
+        self.unmatched = {
+            k: v for k, v in self.unmatched.items() if now - v.created_at < timedelta(minutes=1)
+        }
+        for level in list(self.cursors):
+            if not any(x.level == level and x.poll for x in self.pending.values()):
+                del self.cursors[level]
+
+    async def _fetch(self, level: int):
+        action = AUDIT_LOG_ACTIONS[level]
+        async for entry in self.guild.audit_logs(
+            limit=None, action=action, after=self.cursors[level], oldest_first=True
+        ):
+            self.cursors[level] = discord.Object(id=entry.id)
+            if entry.target is None:
+                continue
+            key = (level, entry.target.id)
+            pending = self.pending.get(key)
+            if pending is not None and pending.matches(entry):
+                del self.pending[key]
+                await self._dispatch(pending, entry)
+            else:
+                self.unmatched[key] = entry
+
+    def _polling_levels(self) -> set:
+        return {x.level for x in self.pending.values() if x.poll}
+
+    async def _loop(self):
+        while self._polling_levels():
+            await self._wait()
+            for level in self._polling_levels():
+                try:
+                    await self._fetch(level)
+                except discord.Forbidden:
+                    # lost view_audit_log, nothing else can be found
+                    self.pending = {k: v for k, v in self.pending.items() if not v.poll}
+                    break
+                except discord.HTTPException as e:
+                    log.warning(
+                        f"[Guild {self.guild.id}] Failed to fetch the audit log for manual "
+                        "actions, retrying next time.",
+                        exc_info=e,
+                    )
+            self._clean_expired()
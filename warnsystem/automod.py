@@ -702,7 +702,7 @@ automod infractions, like a mute after 3 warns.
                     await ctx.send(_("`{word}` is already in the whitelist.").format(word=word))
                     return
             whitelist.extend(words)
-        await self.cache.update_automod_antispam()
+        await self.cache.update_automod_antispam(guild)
         if len(words) == 1:
             await ctx.send(_("Added one word to the whitelist."))
         else:
@@ -724,8 +724,8 @@ automod infractions, like a mute after 3 warns.
                 if word not in whitelist:
                     await ctx.send(_("`{word}` isn't in the whitelist.").format(word=word))
                     return
-            whitelist = [x for x in whitelist if x not in words]
-        await self.cache.update_automod_antispam()
+            whitelist[:] = [x for x in whitelist if x not in words]
+        await self.cache.update_automod_antispam(guild)
         if len(words) == 1:
             await ctx.send(_("Removed one word from the whitelist."))
         else:
@@ -754,7 +754,7 @@ automod infractions, like a mute after 3 warns.
         """
         guild = ctx.guild
         await self.data.guild(guild).automod.antispam.whitelist.set([])
-        await self.cache.update_automod_antispam()
+        await self.cache.update_automod_antispam(guild)
         await ctx.tick()
 
     @automod_antispam.command(name="info")
@@ -1,15 +1,59 @@
+import asyncio
 import discord
 import logging
 import contextlib
 import re
+import time
 
 from redbot.core import Config
 from redbot.core.bot import Red
 
-from typing import Mapping, Optional
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+from .journal import TempActionJournal
 
 log = logging.getLogger("red.laggron.warnsystem")
 
+# Red doesn't dispatch any event when its immunity or mod roles settings are modified
+# outside of its own commands, this bounds how long a decision can be outdated
+AUTOMOD_EXEMPTION_TTL = 300
+AUTOMOD_EXEMPTION_MAX_SIZE = 5000  # per guild, expired entries are pruned above this size
+# the temporary actions journal is compacted after this many events or seconds
+JOURNAL_MAX_SIZE = 1000
+JOURNAL_MAX_AGE = 300
+
+
+def _compile_whitelist(words: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compile the antispam whitelist into a single pattern matching any of the words.
+
+    Words are stored in a trie before being converted into a regex, so common prefixes are
+    only tried once per position instead of once per word.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of a word
+    if not trie:
+        return None
+
+    def build(node: dict) -> str:
+        text = ""
+        # single branches are walked without recursion, words can be long
+        while "" not in node and len(node) == 1:
+            char, node = next(iter(node.items()))
+            text += re.escape(char)
+        if "" in node:
+            # a shorter word is already found, no need to look for the longer ones
+            return text
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return text + "(?:" + "|".join(branches) + ")"
+
+    return re.compile(build(trie))
+
 
 class MemoryCache:
     """
@@ -22,11 +66,18 @@ class MemoryCache:
         self.data = config
 
         self.mute_roles = {}
-        self.temp_actions = {}
+        self.temp_actions = {}  # guild ID = {member ID as str: case}
+        self.temp_actions_journal: Optional[TempActionJournal] = None  # see init_temp_actions
+        self.temp_actions_dirty = set()  # guilds with changes not saved in Config yet
+        self.temp_actions_lock = asyncio.Lock()  # one compaction at a time
+        self.temp_actions_compacted = time.monotonic()
         self.automod_enabled = []
         self.automod_antispam = {}
+        self.automod_antispam_whitelist = {}  # compiled patterns, see _compile_whitelist
         self.automod_regex = {}
         self.automod_regex_edited = []
+        # guild ID = {member ID: (role set hash, expiration, exempt)}
+        self.automod_exemptions = {}
 
     async def init_automod_enabled(self):
         for guild_id, data in (await self.data.all_guilds()).items():
@@ -72,36 +123,100 @@ class MemoryCache:
         await self.data.guild(guild).mute_role.set(role.id)
         self.mute_roles[guild.id] = role.id
 
+    async def init_temp_actions(self, journal_path: Path):
+        """
+        Load all temporary actions, replay the journal on top of them then compact it.
+
+        Until this is called, changes are written directly in Config.
+        """
+        for guild_id, data in (await self.data.all_guilds()).items():
+            if data.get("temporary_warns"):
+                self.temp_actions[guild_id] = data["temporary_warns"]
+        journal = TempActionJournal(journal_path)
+        for event in journal.replay():
+            guild_temp_actions = self.temp_actions.setdefault(event["guild"], {})
+            if event["op"] == "add":
+                guild_temp_actions[event["member"]] = event["data"]
+            else:
+                guild_temp_actions.pop(event["member"], None)
+            self.temp_actions_dirty.add(event["guild"])
+        journal.open()
+        self.temp_actions_journal = journal
+        if journal.size:
+            log.info(f"Replayed {journal.size} events from the temporary actions journal.")
+            await self.compact_temp_actions()
+
+    async def compact_temp_actions(self):
+        """
+        Save the temporary actions of modified guilds in Config, then remove the saved events
+        from the journal.
+
+        Events added while saving are kept in the journal, their guilds are saved by the
+        next compaction.
+        """
+        async with self.temp_actions_lock:
+            journal = self.temp_actions_journal
+            # nothing below can be modified by other tasks before the first await
+            dirty, self.temp_actions_dirty = self.temp_actions_dirty, set()
+            offset, count = journal.tell(), journal.size
+            try:
+                for guild_id in dirty:
+                    await self.data.guild_from_id(guild_id).temporary_warns.set(
+                        self.temp_actions.get(guild_id, {})
+                    )
+            except Exception:
+                self.temp_actions_dirty.update(dirty)
+                raise
+            journal.discard(offset, count)
+            self.temp_actions_compacted = time.monotonic()
+
+    async def maybe_compact_temp_actions(self):
+        journal = self.temp_actions_journal
+        if journal is None or not journal.size or self.temp_actions_lock.locked():
+            return
+        if (
+            journal.size >= JOURNAL_MAX_SIZE
+            or time.monotonic() - self.temp_actions_compacted > JOURNAL_MAX_AGE
+        ):
+            await self.compact_temp_actions()
+
     async def get_temp_action(self, guild: discord.Guild, member: Optional[discord.Member] = None):
         guild_temp_actions = self.temp_actions.get(guild.id, {})
-        if not guild_temp_actions:
+        if not guild_temp_actions and self.temp_actions_journal is None:
             guild_temp_actions = await self.data.guild(guild).temporary_warns.all()
             if guild_temp_actions:
                 self.temp_actions[guild.id] = guild_temp_actions
         if member is None:
             return guild_temp_actions
-        return guild_temp_actions.get(member.id)
+        return guild_temp_actions.get(str(member.id))
 
     async def add_temp_action(self, guild: discord.Guild, member: discord.Member, data: dict):
-        await self.data.guild(guild).temporary_warns.set_raw(member.id, value=data)
-        try:
-            guild_temp_actions = self.temp_actions[guild.id]
-        except KeyError:
-            self.temp_actions[guild.id] = {member.id: data}
+        member_id = str(member.id)  # same keys as Config (JSON)
+        if self.temp_actions_journal is None:
+            await self.data.guild(guild).temporary_warns.set_raw(member_id, value=data)
         else:
-            guild_temp_actions[member.id] = data
+            self.temp_actions_journal.append("add", guild.id, member_id, data)
+            self.temp_actions_dirty.add(guild.id)
+        self.temp_actions.setdefault(guild.id, {})[member_id] = data
+        await self.maybe_compact_temp_actions()
 
     async def remove_temp_action(self, guild: discord.Guild, member: discord.Member):
-        await self.data.guild(guild).temporary_warns.clear_raw(member.id)
-        with contextlib.suppress(KeyError):
-            del self.temp_actions[guild.id][member.id]
+        await self.bulk_remove_temp_action(guild, [member])
 
     async def bulk_remove_temp_action(self, guild: discord.Guild, members: list):
-        members = [x.id for x in members]
-        warns = await self.get_temp_action(guild)
-        warns = {x: y for x, y in warns.items() if int(x) not in members}
-        await self.data.guild(guild).temporary_warns.set(warns)
-        self.temp_actions[guild.id] = warns
+        members = [str(x.id) for x in members]
+        if self.temp_actions_journal is None:
+            warns = await self.get_temp_action(guild)
+            warns = {x: y for x, y in warns.items() if x not in members}
+            await self.data.guild(guild).temporary_warns.set(warns)
+            self.temp_actions[guild.id] = warns
+            return
+        warns = self.temp_actions.get(guild.id, {})
+        for member_id in members:
+            if warns.pop(member_id, None) is not None:
+                self.temp_actions_journal.append("remove", guild.id, member_id)
+                self.temp_actions_dirty.add(guild.id)
+        await self.maybe_compact_temp_actions()
 
     def is_automod_enabled(self, guild: discord.Guild):
         return guild.id in self.automod_enabled
@@ -118,20 +233,22 @@ class MemoryCache:
         automod_antispam = self.automod_antispam.get(guild.id, None)
         if automod_antispam is not None:
             return automod_antispam
-        automod_antispam = await self.data.guild(guild).automod.antispam.all()
-        if automod_antispam["enabled"] is False:
-            self.automod_antispam[guild.id] = False
-        else:
-            self.automod_antispam[guild.id] = automod_antispam
-        return automod_antispam
+        await self.update_automod_antispam(guild)
+        return self.automod_antispam[guild.id]
 
     async def update_automod_antispam(self, guild: discord.Guild):
         data = await self.data.guild(guild).automod.antispam.all()
         if data["enabled"] is False:
             # if the antispam is disabled, no need to store the entire dict, too heavy
             self.automod_antispam[guild.id] = False
+            self.automod_antispam_whitelist.pop(guild.id, None)
         else:
             self.automod_antispam[guild.id] = data
+            self.automod_antispam_whitelist[guild.id] = _compile_whitelist(data["whitelist"])
+
+    def is_antispam_whitelisted(self, guild: discord.Guild, content: str) -> bool:
+        pattern = self.automod_antispam_whitelist.get(guild.id)
+        return pattern is not None and pattern.search(content) is not None
 
     async def get_automod_regex(self, guild: discord.Guild):
         automod_regex = self.automod_regex.get(guild.id, {})
@@ -177,3 +294,41 @@ class MemoryCache:
 
     def is_automod_regex_edited_enabled(self, guild: discord.Guild):
         return guild.id in self.automod_regex_edited
+
+    def get_automod_exemption(self, member: discord.Member) -> Optional[bool]:
+        """
+        Return the cached automod immunity/mod status of a member, or None if unknown.
+
+        The decision is only valid for the exact set of roles the member had.
+        """
+        try:
+            roles_hash, expiration, exempt = self.automod_exemptions[member.guild.id][member.id]
+        except KeyError:
+            return None
+        if expiration < time.monotonic() or roles_hash != hash(frozenset(member._roles)):
+            return None
+        return exempt
+
+    def set_automod_exemption(self, member: discord.Member, exempt: bool):
+        guild_exemptions = self.automod_exemptions.setdefault(member.guild.id, {})
+        now = time.monotonic()
+        if len(guild_exemptions) >= AUTOMOD_EXEMPTION_MAX_SIZE:
+            for member_id in [x for x, y in guild_exemptions.items() if y[1] < now]:
+                del guild_exemptions[member_id]
+        guild_exemptions[member.id] = (
+            hash(frozenset(member._roles)),
+            now + AUTOMOD_EXEMPTION_TTL,
+            exempt,
+        )
+
+    def invalidate_automod_exemptions(
+        self, guild: discord.Guild, member: Optional[discord.Member] = None
+    ):
+        """
+        Drop the cached automod decisions of a guild, or only of a member if given.
+        """
+        if member is None:
+            self.automod_exemptions.pop(guild.id, None)
+            return
+        with contextlib.suppress(KeyError):
+            del self.automod_exemptions[guild.id][member.id]
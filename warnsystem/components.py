@@ -7,7 +7,7 @@ from discord.interactions import Interaction
 from discord.ui import Button, View, Modal, TextInput
 from asyncio import TimeoutError as AsyncTimeoutError
 from datetime import datetime, timezone
-from typing import Optional, Union, List, Tuple, TYPE_CHECKING, cast
+from typing import Dict, Optional, Set, Union, List, Tuple, TYPE_CHECKING, cast
 
 from redbot.core.i18n import Translator
 from redbot.core.utils import mod
@@ -182,13 +182,25 @@ class WarningEditionView(View):
         self.api: "API" = self.ws.api
         self.user = user
         self.case = case
-        self.case_index = case_index
+        self.menu_index = case_index
         if disabled:
             self.edit_button.disabled = True
             self.delete_button.disabled = True
 
+    @property
+    def case_index(self) -> int:
+        return self.list.get_case_index(self.menu_index)
+
+    async def _check_deleted(self, interaction: discord.Interaction) -> bool:
+        if self.menu_index in self.list.deleted_cases:
+            await interaction.response.send_message(_("This case was deleted."), ephemeral=True)
+            return True
+        return False
+
     @discord.ui.button(style=discord.ButtonStyle.secondary, label=_("Edit reason"), emoji="✏")
     async def edit_button(self, interaction: discord.Interaction, button: Button):
+        if await self._check_deleted(interaction):
+            return
         modal = WarningEditionModal()
         await interaction.response.send_modal(modal)
         if await modal.wait():
@@ -214,6 +226,8 @@ class WarningEditionView(View):
         emoji="\N{HEAVY MULTIPLICATION X}\N{VARIATION SELECTOR-16}",
     )
     async def delete_button(self, interaction: discord.Interaction, button: Button):
+        if await self._check_deleted(interaction):
+            return
         guild = interaction.guild
         embed = discord.Embed()
         can_unmute = False
@@ -239,31 +253,47 @@ class WarningEditionView(View):
         if response is False:
             return
         await self.api.delete_case(guild, self.user, self.case_index + 1)  # does not starting at 0
-        self.list.deleted_cases.append(self.case_index)
+        self.list.deleted_cases.add(self.menu_index)
         await interaction.followup.edit_message(
             "@original", content=_("The case was successfully deleted!"), embed=None, view=None
         )
 
 
 class WarningsSource(menus.ListPageSource):
-    def __init__(self, entries: List[dict]):
-        super().__init__(entries, per_page=25)
+    """
+    Pages of the cases of a member as stored (see `API.get_all_cases`), only the cases of
+    the displayed page are converted.
+    """
+
+    def __init__(self, cases: List[dict]):
+        super().__init__(cases, per_page=25)
 
     async def format_page(self, menu: WarningsSelector, balls: List[dict]):
         menu.set_options(balls)
         return True  # signal to edit the page
 
 
-class WarningsSelector(Pages[menus.ListPageSource]):
-    def __init__(self, ctx: Context, user: Union[discord.Member, UnavailableMember], warnings: List[dict]):
+class WarningsSelector(Pages[WarningsSource]):
+    def __init__(
+        self, ctx: Context, user: Union[discord.Member, UnavailableMember], cases: List[dict]
+    ):
         self.user = user
         self.ws = cast("WarnSystem", ctx.bot.get_cog("WarnSystem"))
         self.api: "API" = self.ws.api
-        source = WarningsSource(warnings)
+        source = WarningsSource(cases)
         super().__init__(source, ctx=ctx)
-        self.deleted_cases: list[int] = []  # to prevent referencing deleted cases
+        # indexes of the cases deleted from this menu, to prevent referencing them
+        self.deleted_cases: Set[int] = set()
+        self.cases: Dict[int, dict] = {}  # cases of the current page, by index
         self.add_item(self.select_warning_menu)
 
+    def get_case_index(self, index: int) -> int:
+        """
+        Index in the modlog of the case at this index of the menu. The cases deleted since
+        the menu was opened moved the following ones.
+        """
+        return index - sum(1 for x in self.deleted_cases if x < index)
+
     def _get_label(self, level: int) -> Tuple[str, str]:
         if level == 1:
             return (_("Warning"), "⚠")
@@ -278,7 +308,8 @@ class WarningsSelector(Pages[menus.ListPageSource]):
 
     def set_options(self, cases: List[dict]):
         options: List[discord.SelectOption] = []
-        for i, case in enumerate(cases, start=self.source.per_page * self.current_page):
+        self.cases = dict(enumerate(cases, start=self.source.per_page * self.current_page))
+        for i, case in self.cases.items():
             name, emote = self._get_label(case["level"])
             date = pretty_date(self.api._get_datetime(case["time"]))
             if case["reason"] and len(name) + len(case["reason"]) > 25:
@@ -306,15 +337,17 @@ class WarningsSelector(Pages[menus.ListPageSource]):
 
         guild = interaction.guild
         i = int(interaction.data["values"][0])
+        case = self.cases[i]
         if i in self.deleted_cases:
-            await interaction.response.send_message("This case was deleted.", ephemeral=True)
+            await interaction.response.send_message(_("This case was deleted."), ephemeral=True)
             return
-        case = self.source.entries[i]
         level = case["level"]
         moderator = guild.get_member(case["author"])
         moderator = "ID: " + str(case["author"]) if not moderator else moderator.mention
         time = self.api._get_datetime(case["time"])
-        embed = discord.Embed(description=_("Case #{number} informations").format(number=i + 1))
+        embed = discord.Embed(
+            description=_("Case #{number} informations").format(number=self.get_case_index(i) + 1)
+        )
         embed.set_author(
             name=f"{self.user} | {self.user.id}", icon_url=self.user.display_avatar.url
         )
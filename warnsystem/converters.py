@@ -1,9 +1,16 @@
 import argparse
-from typing import List
+import asyncio
+import functools
+import heapq
+from collections import deque
+from typing import Callable, Iterable, List, Set, Tuple
 import discord
 import re
 import logging
 
+from datetime import timezone
+from multiprocessing import TimeoutError
+
 from dateutil import parser
 from discord.ext.commands.converter import RoleConverter, MemberConverter
 
@@ -16,6 +23,12 @@ from .api import UnavailableMember
 _ = Translator("WarnSystem", __file__)
 log = logging.getLogger("red.laggron.warnsystem")
 
+SCAN_CHUNK_SIZE = 1000  # number of members checked before releasing the event loop
+REGEX_BATCH_SIZE = 1000  # number of names sent at once to the regex process pool
+# batches submitted to the pool at the same time, the other workers stay free for the automod
+REGEX_MAX_BATCHES = 2
+PREVIEW_SAMPLE_SIZE = 10  # number of members shown with --preview
+
 
 # credit to mikeshardmind (Sinbad) for parse_time
 # https://github.com/mikeshardmind/SinbadCogs/blob/v3/scheduler/time_utils.py
@@ -24,6 +37,14 @@ def parse_time(datetimestring: str):
     return ret
 
 
+def _regex_search_batch(pattern: str, texts: List[str]) -> List[int]:
+    """
+    Return the indexes of the texts matching the pattern. Runs inside the process pool.
+    """
+    compiled = re.compile(pattern)
+    return [i for i, text in enumerate(texts) if compiled.search(text)]
+
+
 # credit to mikeshardmind (Sinbad) once again for all the argument parsing stuff
 # this was mostly inspired from his rolemanagement cog
 # https://github.com/mikeshardmind/SinbadCogs/blob/v3/rolemanagement/converters.py
@@ -42,6 +63,7 @@ class AdvancedMemberSelect:
     --send-dm
     --send-modlog
     --confirm
+    --preview
     --reason <text>
     --time --length <duration>
 
@@ -84,11 +106,6 @@ class AdvancedMemberSelect:
     --below <role>
     """
 
-    def non_lurker_members(self, members: List[discord.Member]):
-        if not self._non_lurker_members:
-            self._non_lurker_members = [x for x in members if x.joined_at]
-        return self._non_lurker_members
-
     def parse_arguments(self, arguments: str):
         parser = NoExitParser(
             description="Mass member selection in a server for WarnSystem.", add_help=False
@@ -100,6 +117,7 @@ class AdvancedMemberSelect:
         parser.add_argument("--send-dm", dest="send_dm", action="store_true")
         parser.add_argument("--send-modlog", dest="send_modlog", action="store_true")
         parser.add_argument("--confirm", dest="confirm", action="store_true")
+        parser.add_argument("--preview", dest="preview", action="store_true")
         parser.add_argument("--reason", dest="reason", nargs="*")
         parser.add_argument("--length", "--time", dest="time", nargs="*")
 
@@ -146,7 +164,7 @@ class AdvancedMemberSelect:
         members: List[discord.Member] = []
         unavailable_members: List[UnavailableMember] = []
 
-        if not args.take_action and not args.send_dm and not args.send_modlog:
+        if not (args.take_action or args.send_dm or args.send_modlog or args.preview):
             raise BadArgument(
                 _(
                     "I'm not doing anything! Please provide at least one of these "
@@ -157,106 +175,233 @@ class AdvancedMemberSelect:
             raise BadArgument(_("Can't combine `--only-humans` with `--only-bots`."))
 
         if args.everyone:
-            return guild.members, []
-        members = guild.members
+            return guild.members, [], len(guild.members)
+
+        # all arguments are compiled into predicates, then checked in a single pass
+        # --last-njoins and --first-njoins are applied on the result of the conditions given
+        # before them, so the following conditions are checked after the selection
+        predicates: List[Callable[[discord.Member], bool]] = []
         if args.name:
-            members = self._name_regex(members, args.name, "name")
+            predicates.append(await self._name_regex(args.name, "name", "name"))
         if args.nickname:
-            members = self._name_regex(members, args.nickname, "nickname")
+            predicates.append(await self._name_regex(args.nickname, "nick", "nickname"))
         if args.display_name:
-            members = self._name_regex(members, args.display_name, "display_name")
+            predicates.append(
+                await self._name_regex(args.display_name, "display_name", "display-name")
+            )
         if args.activity:
-            members = self._status_regex(members, args.activity)
+            predicates.append(await self._status_regex(args.activity))
         if args.only_humans:
-            members = list(filter(lambda x: not x.bot, members))
+            predicates.append(lambda x: not x.bot)
         if args.only_bots:
-            members = list(filter(lambda x: x.bot, members))
+            predicates.append(lambda x: x.bot)
+        if args.joined_before or args.joined_after or args.last_njoins or args.first_njoins:
+            predicates.append(lambda x: x.joined_at is not None)  # exclude lurkers
         if args.joined_before:
-            members = self._join(
-                self.non_lurker_members(members), " ".join(args.joined_before), "before"
-            )
+            predicates.append(self._join(" ".join(args.joined_before), "before"))
         if args.joined_after:
-            members = self._join(
-                self.non_lurker_members(members), " ".join(args.joined_after), "after"
-            )
-        if args.last_njoins:
-            members = self._last_njoins(self.non_lurker_members(members), args.last_njoins)
-        if args.first_njoins:
-            members = self._first_njoins(self.non_lurker_members(members), args.first_njoins)
+            predicates.append(self._join(" ".join(args.joined_after), "after"))
+
+        njoins_predicates = predicates
+        if args.last_njoins or args.first_njoins:
+            predicates = []
 
         if args.has_perm:
-            members = self._perms(members, [args.has_perm], "perm")
+            predicates.append(self._perms([args.has_perm], "perm"))
         if args.has_any_perm:
-            members = self._perms(members, args.has_any_perm, "any-perm")
+            predicates.append(self._perms(args.has_any_perm, "any-perm"))
         if args.has_all_perms:
-            members = self._perms(members, args.has_all_perms, "all-perms")
+            predicates.append(self._perms(args.has_all_perms, "all-perms"))
         if args.has_none_perms:
-            members = self._perms(members, args.has_none_perms, "none-perms")
+            predicates.append(self._perms(args.has_none_perms, "none-perms"))
         if args.has_perm_int:
-            members = self._perm_int(members, args.has_perm_int)
+            predicates.append(self._perm_int(args.has_perm_int))
 
         if args.has_role:
-            members = await self._role(members, [args.has_role], "has-role")
+            predicates.append(await self._role([args.has_role], "has-role"))
         if args.has_any_role:
-            members = await self._role(members, args.has_any_role, "has-any-role")
+            predicates.append(await self._role(args.has_any_role, "has-any-role"))
         if args.has_all_roles:
-            members = await self._role(members, args.has_all_roles, "has-all-roles")
+            predicates.append(await self._role(args.has_all_roles, "has-all-roles"))
         if args.has_none_roles:
-            members = await self._role(members, args.has_none_roles, "has-none-roles")
+            predicates.append(await self._role(args.has_none_roles, "has-none-roles"))
         if args.has_no_roles:
-            members = await self._role(members, None, "has-no-roles")
+            predicates.append(await self._role(None, "has-no-roles"))
         if args.has_exactly_nroles:
-            members = self._nroles(members, args.has_exactly_nroles[0], "exactly")
+            predicates.append(self._nroles(args.has_exactly_nroles[0], "exactly"))
         if args.has_more_than_nroles:
-            members = self._nroles(members, args.has_more_than_nroles[0], "more")
+            predicates.append(self._nroles(args.has_more_than_nroles[0], "more"))
         if args.has_less_than_nroles:
-            members = self._nroles(members, args.has_less_than_nroles[0], "less")
+            predicates.append(self._nroles(args.has_less_than_nroles[0], "less"))
         if args.above:
-            members = await self._role(members, [args.above], "above")
+            predicates.append(await self._role([args.above], "above"))
         if args.below:
-            members = await self._role(members, [args.below], "below")
+            predicates.append(await self._role([args.below], "below"))
 
         if args.exclude:
-            members = await self._selection(members, args.exclude, "exclude")
+            excluded = {x.id for x in await self._convert_selection(args.exclude, "exclude")}
+            predicates.append(lambda member: member.id not in excluded)
+        filtered = bool(predicates or njoins_predicates)
+        selected = []
         if args.select:
-            if members == guild.members:
-                members = []
-            members = await self._selection(members, args.select, "select")
+            selected = await self._convert_selection(args.select, "select")
         if args.hackban_select:
-            if members == guild.members:
-                members = []
             unavailable_members = await self._unavailable_selection(args.hackban_select)
 
+        if args.last_njoins or args.first_njoins:
+            members = await self._scan(guild.members, njoins_predicates)
+            if args.last_njoins:
+                members = self._last_njoins(members, args.last_njoins)
+            if args.first_njoins:
+                members = self._first_njoins(members, args.first_njoins)
+            members = await self._scan(members, predicates)
+            total = len(members)
+            is_selected = set(members).__contains__
+        elif args.preview:
+            # count-only fast path, only a sample of the members is kept
+            if filtered:
+                total, members = await self._count(guild.members, predicates)
+            else:
+                total, members = len(guild.members), guild.members[:PREVIEW_SAMPLE_SIZE]
+            is_selected = lambda member: all(predicate(member) for predicate in predicates)
+        elif filtered:
+            members = await self._scan(guild.members, predicates)
+            total = len(members)
+            is_selected = set(members).__contains__
+        else:
+            members = guild.members
+            total = len(members)
+            is_selected = lambda member: True
+
+        if (selected or unavailable_members) and not filtered:
+            # only the given selection is warned
+            members, total = [], 0
+            is_selected = lambda member: False
+        for member in selected:
+            if not is_selected(member):
+                members.append(member)
+                total += 1
+
         if not members and not unavailable_members:
             raise BadArgument(_("The search could't find any member."))
-        return members, unavailable_members
-
-    def _name_regex(self, members: List[discord.Member], pattern: str, attribute: str):
-        pattern = re.compile(pattern)
-
-        def member_filter(member: discord.Member):
-            if pattern.search(getattr(member, attribute)):
-                return True
-            return False
-
-        return list(filter(member_filter, members))
+        return members, unavailable_members, total
+
+    async def _count(
+        self,
+        members: Iterable[discord.Member],
+        predicates: List[Callable[[discord.Member], bool]],
+    ) -> Tuple[int, List[discord.Member]]:
+        """
+        Same as :meth:`_scan`, but only count the matching members and keep a sample.
+        """
+        total = 0
+        sample = []
+        for i, member in enumerate(members, start=1):
+            if all(predicate(member) for predicate in predicates):
+                total += 1
+                if total <= PREVIEW_SAMPLE_SIZE:
+                    sample.append(member)
+            if i % SCAN_CHUNK_SIZE == 0:
+                await asyncio.sleep(0)
+        return total, sample
+
+    async def _scan(
+        self,
+        members: Iterable[discord.Member],
+        predicates: List[Callable[[discord.Member], bool]],
+    ) -> List[discord.Member]:
+        """
+        Check all predicates on each member in a single pass.
+
+        The event loop is released every ``SCAN_CHUNK_SIZE`` members, so large servers
+        don't block the bot.
+        """
+        if not predicates:
+            return list(members)
+        result = []
+        for i, member in enumerate(members, start=1):
+            if all(predicate(member) for predicate in predicates):
+                result.append(member)
+            if i % SCAN_CHUNK_SIZE == 0:
+                await asyncio.sleep(0)
+        return result
 
-    def _status_regex(self, members: List[discord.Member], pattern: str):
-        pattern = re.compile(pattern)
+    async def _name_regex(self, pattern: str, attribute: str, state: str):
+        members = self.ctx.guild.members
+        texts = [(x.id, getattr(x, attribute) or "") for x in members]
+        matches = await self._regex_search(pattern, texts, state)
+        return lambda member: member.id in matches
 
-        def member_filter(member: discord.Member):
+    async def _status_regex(self, pattern: str):
+        texts = []
+        for member in self.ctx.guild.members:
             # credit to mikeshardmind for this part of code
             # https://github.com/mikeshardmind/SinbadCogs/blob/4d265a9819fd25be44bc7422e6e60c44624624da/statuswarn/statuswarn.py#L27
             maybe_custom = next(filter(lambda a: a.type == 4, member.activities), None)
-            if not maybe_custom:
-                return False
-            if pattern.search(maybe_custom.state or ""):
-                return True
-            return False
+            if maybe_custom:
+                texts.append((member.id, maybe_custom.state or ""))
+        matches = await self._regex_search(pattern, texts, "activity")
+        return lambda member: member.id in matches
+
+    async def _regex_search(
+        self, pattern: str, texts: List[Tuple[int, str]], state: str
+    ) -> Set[int]:
+        """
+        Search a user defined regex pattern inside the process pool of the API, like the
+        automod regex, to prevent reDOS from freezing the bot.
+
+        The texts are sent in batches, each batch must be processed within the regex timeout.
+        Only ``REGEX_MAX_BATCHES`` are in the pool at once, the next one is sent when one is
+        done, and nothing else is sent after a timeout. Returns the IDs of the matching members.
+        """
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise BadArgument(
+                _("`{arg}` from `--{state}` is not a valid regex pattern. {e}").format(
+                    arg=pattern, state=state, e=e
+                )
+            )
+        api = self.ctx.bot.get_cog("WarnSystem").api
+        batches = iter(
+            [texts[i : i + REGEX_BATCH_SIZE] for i in range(0, len(texts), REGEX_BATCH_SIZE)]
+        )
 
-        return list(filter(member_filter, members))
+        def submit():
+            batch = next(batches, None)
+            if batch is not None:
+                process = api.re_pool.apply_async(
+                    _regex_search_batch, (pattern, [x[1] for x in batch])
+                )
+                in_flight.append((batch, process))
+
+        in_flight = deque()
+        for _i in range(REGEX_MAX_BATCHES):
+            submit()
+        matches = set()
+        while in_flight:
+            batch, process = in_flight.popleft()
+            task = functools.partial(process.get, timeout=api.regex_timeout)
+            try:
+                result = await asyncio.wait_for(
+                    self.ctx.bot.loop.run_in_executor(None, task), timeout=api.regex_timeout + 5
+                )
+            except (TimeoutError, asyncio.TimeoutError):
+                log.warning(
+                    f"[Guild {self.ctx.guild.id}] Masswarn: regex process took too long. "
+                    f"Offending regex: {pattern}"
+                )
+                raise BadArgument(
+                    _(
+                        "The regex pattern `{arg}` from `--{state}` took too long to process. "
+                        "Please provide a simpler pattern."
+                    ).format(arg=pattern, state=state)
+                )
+            matches.update(batch[i][0] for i in result)
+            submit()
+        return matches
 
-    def _join(self, members: List[discord.Member], date: str, when: str):
+    def _join(self, date: str, when: str):
         try:
             date = parse_time(date)
         except Exception:
@@ -269,87 +414,44 @@ class AdvancedMemberSelect:
                     "- `jan 4 16:09`"
                 ).format(arg=date, state=when)
             )
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
 
-        def member_filter(member: discord.Member):
-            if when == "before" and member.joined_at < date:
-                return True
-            if when == "after" and member.joined_at > date:
-                return True
-            return False
-
-        return list(filter(member_filter, members))
+        if when == "before":
+            return lambda member: member.joined_at < date
+        return lambda member: member.joined_at > date
 
     def _last_njoins(self, members: List[discord.Member], number: int):
-        try:
-            last_member = sorted(members, key=lambda x: x.joined_at, reverse=True)[number]
-        except IndexError:
-            last_member = sorted(members, key=lambda x: x.joined_at, reverse=True)[
-                len(members) - 1
-            ]
-
-        def member_filter(member: discord.Member):
-            if member.joined_at > last_member.joined_at:
-                return True
-            return False
-
-        return list(filter(member_filter, members))
+        return heapq.nlargest(number, members, key=lambda x: x.joined_at)
 
     def _first_njoins(self, members: List[discord.Member], number: int):
-        try:
-            last_member = sorted(members, key=lambda x: x.joined_at)[number]
-        except IndexError:
-            last_member = sorted(members, key=lambda x: x.joined_at)[len(members) - 1]
-
-        def member_filter(member: discord.Member):
-            if member.joined_at < last_member.joined_at:
-                return True
-            return False
+        return heapq.nsmallest(number, members, key=lambda x: x.joined_at)
 
-        return list(filter(member_filter, members))
-
-    def _perms(self, members: List[discord.Member], permissions: list, requires: str):
-        allowed_permissions = dir(discord.Permissions)
+    def _perms(self, permissions: list, requires: str):
         for permission in permissions:
-            if permission not in allowed_permissions:
+            if permission not in discord.Permissions.VALID_FLAGS:
                 raise BadArgument(
                     _(
                         "Can't convert `{arg}` from `--has-{state}` into a valid "
                         "permission object. Please provide something like this: `send_messages`"
                     ).format(arg=permission, state=requires)
                 )
+        # permissions are compared as bit fields
+        mask = discord.Permissions(**{x: True for x in permissions}).value
+
+        if requires == "all-perms":
+            return lambda member: member.guild_permissions.value & mask == mask
+        if requires == "none-perms":
+            return lambda member: not member.guild_permissions.value & mask
+        # "perm" and "any-perm"
+        return lambda member: bool(member.guild_permissions.value & mask)
+
+    def _perm_int(self, permissions: int):
+        return lambda member: member.guild_permissions.value == permissions
 
-        def member_filter(member: discord.Member):
-            if requires == "perm":
-                if getattr(member.guild_permissions, permissions[0]):
-                    return True
-            elif requires == "any-perm":
-                if set([x[0] for x in member.guild_permissions if x[1]]).intersection(permissions):
-                    return True
-            elif requires == "all-perms":
-                if set(permissions).issubset([x[0] for x in member.guild_permissions if x[1]]):
-                    return True
-            elif requires == "none-perms":
-                if not set([x[0] for x in member.guild_permissions if x[1]]).intersection(
-                    permissions
-                ):
-                    return True
-            return False
-
-        return list(filter(member_filter, members))
-
-    def _perm_int(self, members: List[discord.Member], permissions: int):
-        def member_filter(member: discord.Member):
-            if member.guild_permissions.value == permissions:
-                return True
-            return False
-
-        return list(filter(member_filter, members))
-
-    async def _role(
-        self, members: List[discord.Member], _roles: List[discord.Role], requires: str
-    ):
+    async def _role(self, _roles: List[str], requires: str):
+        roles: List[discord.Role] = []
         if _roles:
-            roles: List[discord.Role] = []
             for role in _roles:
                 try:
                     roles.append(await RoleConverter().convert(self.ctx, role))
@@ -361,46 +463,39 @@ class AdvancedMemberSelect:
                             "name (in quotes if it has spaces) or an ID."
                         ).format(arg=role, state=requires)
                     )
-
-        def member_filter(member: discord.Member):
-            if requires == "has-role" and roles[0] in member.roles:
-                return True
-            elif requires == "has-any-roles" and set(member.roles).intersection(roles):
-                return True
-            elif requires == "has-all-roles" and set(roles).issubset(member.roles):
-                return True
-            elif requires == "has-none-roles" and not set(member.roles).intersection(roles):
-                return True
-            elif requires == "has-no-roles" and len(member.roles) == 1:
-                return True
-            elif requires == "above" and member.top_role.position > roles[0].position:
-                return True
-            elif requires == "below" and member.top_role.position < roles[0].position:
-                return True
-            return False
-
-        return list(filter(member_filter, members))
-
-    def _nroles(self, members: List[discord.Member], number: int, condition: str):
+        # roles are resolved once, members are checked by ID
+        role_ids = [x.id for x in roles]
+
+        if requires == "has-role":
+            return lambda member: member.get_role(role_ids[0]) is not None
+        if requires == "has-any-role":
+            return lambda member: any(member.get_role(x) is not None for x in role_ids)
+        if requires == "has-all-roles":
+            return lambda member: all(member.get_role(x) is not None for x in role_ids)
+        if requires == "has-none-roles":
+            return lambda member: all(member.get_role(x) is None for x in role_ids)
+        if requires == "has-no-roles":
+            return lambda member: len(member.roles) == 1
+        position = roles[0].position
+        if requires == "above":
+            return lambda member: member.top_role.position > position
+        return lambda member: member.top_role.position < position
+
+    def _nroles(self, number: int, condition: str):
         number += 1  # do not count @everyone role
 
-        def member_filter(member: discord.Member):
-            if condition == "exactly" and len(member.roles) == number:
-                return True
-            elif condition == "more" and len(member.roles) > number:
-                return True
-            elif condition == "less" and len(member.roles) < number:
-                return True
-            return False
-
-        return list(filter(member_filter, members))
+        if condition == "exactly":
+            return lambda member: len(member.roles) == number
+        if condition == "more":
+            return lambda member: len(member.roles) > number
+        return lambda member: len(member.roles) < number
 
-    async def _selection(self, members: list, _selection: list, requires: str):
+    async def _convert_selection(self, _selection: list, requires: str):
         selection = []
         for member in _selection:
             try:
                 selection.append(await MemberConverter().convert(self.ctx, member))
-            except discord.errors.NotFound:
+            except (discord.errors.NotFound, discord.ext.commands.errors.BadArgument):
                 raise BadArgument(
                     _(
                         "Can't convert `{arg}` from `--{state}` into a valid member object. "
@@ -408,12 +503,7 @@ class AdvancedMemberSelect:
                         "mention him, or provide its ID."
                     ).format(arg=member, state=requires)
                 )
-
-        if requires == "select":
-            members.extend(selection)
-            return members
-        else:
-            return list(set(members) - set(selection))
+        return selection
 
     async def _unavailable_selection(self, _selection):
         # don't question my function names
@@ -433,7 +523,6 @@ class AdvancedMemberSelect:
 
     async def convert(self, ctx, arguments):
         self.ctx = ctx
-        self._non_lurker_members = None
         async with ctx.typing():
             args = self.parse_arguments(arguments)
             self.reason = " ".join(args.reason or "")
@@ -453,7 +542,12 @@ class AdvancedMemberSelect:
             self.send_dm = args.send_dm
             self.send_modlog = args.send_modlog
             self.confirm = args.confirm
-            self.members, self.unavailable_members = await self.process_arguments(args)
+            self.preview = args.preview
+            (
+                self.members,
+                self.unavailable_members,
+                self.total_members,
+            ) = await self.process_arguments(args)
             return self
 
 
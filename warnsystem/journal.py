@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+
+from pathlib import Path
+from typing import Iterator, Optional
+
+log = logging.getLogger("red.laggron.warnsystem")
+
+
+class TempActionJournal:
+    """
+    Append-only file recording the start and the end of temporary actions.
+
+    Each event is a JSON line, written and synced to the disk immediately, instead of
+    rewriting the whole dict of temporary actions of a guild. The journal is replayed on top
+    of the Config data when the cog loads, then compacted: the result is saved in Config and
+    the events it covers are removed from the file.
+
+    Events are idempotent (``add`` sets a member's action, ``remove`` deletes it), so a
+    crash at any point, even between saving to Config and emptying the file, only replays
+    events that are already applied.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.size = 0  # number of events written since the last compaction
+        self.file = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "ab")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def append(self, op: str, guild_id: int, member_id: str, data: Optional[dict] = None):
+        event = {"op": op, "guild": guild_id, "member": member_id}
+        if data is not None:
+            event["data"] = data
+        self.file.write(json.dumps(event, separators=(",", ":")).encode() + b"\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.size += 1
+
+    def tell(self) -> int:
+        """
+        Position after the last event, to be given to `discard`.
+        """
+        return self.file.tell()
+
+    def replay(self) -> Iterator[dict]:
+        """
+        Read all events of the journal, in order.
+
+        A line cut by a crash can only be the last one, it is skipped.
+        """
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as file:
+            for i, line in enumerate(file, start=1):
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning(f"Skipped malformed line {i} of the temporary actions journal.")
+                    continue
+                self.size += 1
+                yield event
+
+    def discard(self, offset: int, count: int):
+        """
+        Remove the ``count`` events written before ``offset``, keeping the following ones.
+
+        The remaining events are written in a new file replacing the journal, so a crash
+        leaves either the old or the new journal.
+        """
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            remaining = file.read()
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "wb") as file:
+            file.write(remaining)
+            file.flush()
+            os.fsync(file.fileno())
+        self.file.close()
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, "ab")
+        self.size -= count
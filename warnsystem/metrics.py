@@ -0,0 +1,144 @@
+import bisect
+import time
+
+from typing import Dict, Optional, Set
+
+from redbot.core import Config
+from redbot.core.bot import Red
+
+# stages of API.warn, in order
+STAGES = ("settings", "checks", "embeds", "dm", "action", "modlog", "case", "timer", "autowarn")
+# upper bounds of the histogram buckets, in milliseconds
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class Histogram:
+    """
+    Distribution of latencies, counted in fixed buckets.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last bucket is above the highest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        milliseconds = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKETS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        if milliseconds > self.max:
+            self.max = milliseconds
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Return the upper bound of the bucket containing the given percentile, in milliseconds.
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "average": self.average,
+            "max": self.max,
+            "buckets": dict(zip(BUCKETS + ("inf",), self.counts)),
+        }
+
+
+class StageTimer:
+    """
+    Measure the time taken by each stage of a warning.
+
+    Call :meth:`lap` at the end of each stage, the time since the previous lap is recorded
+    under the given name.
+    """
+
+    __slots__ = ("metrics", "guild_id", "start", "last", "stages")
+
+    def __init__(self, metrics: "WarnMetrics", guild_id: int):
+        self.metrics = metrics
+        self.guild_id = guild_id
+        self.start = self.last = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    def done(self, total: bool = True):
+        if total:
+            self.stages["total"] = time.perf_counter() - self.start
+        self.metrics.record(self.guild_id, self.stages)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def done(self, total: bool = True):
+        pass
+
+
+_noop_timer = _NoopTimer()
+
+
+class WarnMetrics:
+    """
+    Per guild histograms of the time taken by each stage of :meth:`API.warn`.
+
+    Collection is disabled by default and enabled per guild with ``[p]warnset stats``.
+    Each measured warning also dispatches a ``warnsystem_metrics`` event with the guild ID
+    and the time taken by each stage in seconds, so other cogs can export them.
+    """
+
+    def __init__(self, bot: Red):
+        self.bot = bot
+        self.enabled: Set[int] = set()
+        self.histograms: Dict[int, Dict[str, Histogram]] = {}
+
+    async def init_enabled(self, config: Config):
+        for guild_id, data in (await config.all_guilds()).items():
+            if data.get("collect_metrics") is True:
+                self.enabled.add(guild_id)
+
+    def timer(self, guild_id: int):
+        if guild_id not in self.enabled:
+            return _noop_timer
+        return StageTimer(self, guild_id)
+
+    def record(self, guild_id: int, stages: Dict[str, float]):
+        histograms = self.histograms.setdefault(guild_id, {})
+        for stage, seconds in stages.items():
+            try:
+                histogram = histograms[stage]
+            except KeyError:
+                histogram = histograms[stage] = Histogram()
+            histogram.observe(seconds)
+        self.bot.dispatch("warnsystem_metrics", guild_id=guild_id, stages=stages)
+
+    def get(self, guild_id: int) -> Dict[str, Histogram]:
+        return self.histograms.get(guild_id, {})
+
+    def reset(self, guild_id: Optional[int] = None):
+        if guild_id is None:
+            self.histograms.clear()
+        else:
+            self.histograms.pop(guild_id, None)
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+log = logging.getLogger("red.laggron.warnsystem")
+
+# the queue whose worker is running the current task, if any
+_running_queue: ContextVar[Optional["KeyedQueue"]] = ContextVar("running_queue", default=None)
+
+
+class KeyedQueue:
+    """
+    A bounded work queue consumed by a fixed number of workers.
+
+    Jobs are identified by a key, a job is not queued again while another one with the
+    same key is waiting (or also running if ``dedupe_running`` is set). When the queue is
+    full, :meth:`put` waits for a free slot, slowing down the producers.
+
+    Workers are started on the first job and wait on the queue, nothing runs while idle.
+
+    Queue depth, jobs count and latencies are recorded, see :meth:`stats`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        callback: Callable[..., Awaitable[Any]],
+        *,
+        workers: int = 4,
+        maxsize: int = 1000,
+        dedupe_running: bool = False,
+    ):
+        self.name = name
+        self.callback = callback
+        self.workers = workers
+        self.dedupe_running = dedupe_running
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.keys: Set[Hashable] = set()
+        self.tasks: List[asyncio.Task] = []
+
+        # metrics
+        self.processed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.total_wait_time = 0.0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+        self.backed_up = False
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.keys
+
+    def start(self):
+        if self.tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self.tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+
+    async def put(self, key: Hashable, *args) -> bool:
+        """
+        Queue a job calling the callback with the given arguments.
+
+        Returns
+        -------
+        bool
+            :py:obj:`False` if a job with the same key was already queued.
+        """
+        if key in self.keys:
+            self.coalesced += 1
+            return False
+        self.keys.add(key)
+        self.start()
+        item = (key, args, time.monotonic())
+        if self.queue.full():
+            if not self.backed_up:
+                self.backed_up = True
+                log.warning(
+                    f"The {self.name} queue is full ({self.queue.maxsize} jobs), new jobs "
+                    "will wait for a free slot."
+                )
+            if _running_queue.get() is self:
+                # a job of this queue waiting for a free slot could block all workers
+                asyncio.get_running_loop().create_task(self.queue.put(item))
+                return True
+        try:
+            await self.queue.put(item)
+        except BaseException:
+            self.keys.discard(key)
+            raise
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the metrics of this queue.
+
+        Latencies are in seconds. ``wait`` is the time between the moment a job is queued and
+        the moment it starts, ``run`` is the time taken by the job itself.
+        """
+        done = self.processed + self.failed
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "average_wait": self.total_wait_time / done if done else 0.0,
+            "average_run": self.total_run_time / done if done else 0.0,
+            "max_run": self.max_run_time,
+        }
+
+    async def _worker(self):
+        _running_queue.set(self)
+        while True:
+            key, args, queued_at = await self.queue.get()
+            if not self.dedupe_running:
+                self.keys.discard(key)
+            started_at = time.monotonic()
+            self.total_wait_time += started_at - queued_at
+            try:
+                await self.callback(*args)
+            except Exception as e:
+                self.failed += 1
+                log.error(f"Error in the {self.name} queue. Job: {key}", exc_info=e)
+            else:
+                self.processed += 1
+            finally:
+                run_time = time.monotonic() - started_at
+                self.total_run_time += run_time
+                self.max_run_time = max(self.max_run_time, run_time)
+                if self.dedupe_running:
+                    self.keys.discard(key)
+                if self.queue.empty():
+                    self.backed_up = False
+                self.queue.task_done()
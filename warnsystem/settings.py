@@ -10,9 +10,10 @@ from json import loads
 from redbot.core import commands, checks
 from redbot.core.i18n import Translator
 from redbot.core.utils import predicates, menus
-from redbot.core.utils.chat_formatting import pagify
+from redbot.core.utils.chat_formatting import box, pagify
 
 from .abc import MixinMeta
+from .metrics import STAGES
 
 log = logging.getLogger("red.laggron.warnsystem")
 _ = Translator("WarnSystem", __file__)
@@ -631,6 +632,45 @@ channels, and prevented from talking in all voice channels.
         for page in pagify(text):
             await ctx.send(page)
 
+    @warnset.command(name="rerender")
+    async def warnset_rerender(self, ctx: commands.Context, restart: bool = False):
+        """
+        Edit all modlog messages with the current settings.
+
+        Use this after changing the colors, descriptions or thumbnails of the embeds.\
+ The messages are edited in the background. If the job is interrupted (bot restart, cog\
+ reload), invoking this command again will continue where it stopped, unless `restart` is True.
+        """
+        guild = ctx.guild
+        task = self.rerender_tasks.get(guild.id)
+        if task is not None and not task.done():
+            await ctx.send(_("The modlog messages are already being edited."))
+            return
+
+        async def rerender():
+            try:
+                edited, failed = await self.api.rerender_modlog(guild, restart=restart)
+            except Exception as e:
+                log.error(f"[Guild {guild.id}] Failed to re-render modlog messages.", exc_info=e)
+                await ctx.send(
+                    _("An error occured while editing the modlog messages. Check your logs.")
+                )
+                return
+            finally:
+                self.rerender_tasks.pop(guild.id, None)
+            text = _("Done. {edited} modlog messages were edited.").format(edited=edited)
+            if failed:
+                text += _(" {failed} messages couldn't be edited.").format(failed=failed)
+            await ctx.send(text)
+
+        self.rerender_tasks[guild.id] = self.bot.loop.create_task(rerender())
+        await ctx.send(
+            _(
+                "The modlog messages will be edited in the background, "
+                "I will send a message once it's done."
+            )
+        )
+
     @warnset.command(name="reinvite")
     async def warnset_reinvite(self, ctx: commands.Context, enable: bool = None):
         """
@@ -861,6 +901,76 @@ channels, and prevented from talking in all voice channels.
             await self.data.guild(guild).show_mod.set(False)
             await ctx.send(_("Done. The bot will no longer show the responsible moderator."))
 
+    @warnset.command(name="stats")
+    async def warnset_stats(self, ctx: commands.Context, enable: bool = None):
+        """
+        Show how long each step of a warning takes.
+
+        Measures are disabled by default, enable them with `[p]warnset stats True`. They are\
+ kept in memory until the cog is reloaded.
+        Other cogs can export the measures by listening to the `warnsystem_metrics` event.
+        """
+        guild = ctx.guild
+        metrics = self.api.metrics
+        if enable is True:
+            await self.data.guild(guild).collect_metrics.set(True)
+            metrics.enabled.add(guild.id)
+            await ctx.send(_("Done. The time taken by warnings will now be measured."))
+            return
+        if enable is False:
+            await self.data.guild(guild).collect_metrics.set(False)
+            metrics.enabled.discard(guild.id)
+            metrics.reset(guild.id)
+            await ctx.send(_("Done. Warnings are no longer measured."))
+            return
+        histograms = metrics.get(guild.id)
+        if guild.id not in metrics.enabled and not histograms:
+            await ctx.send(
+                _(
+                    "Warnings are not measured on this server. "
+                    "Enable this with `{prefix}warnset stats True`."
+                ).format(prefix=ctx.clean_prefix)
+            )
+            return
+        text = _("Time taken by each step of a warning, in milliseconds.\n\n")
+        text += "{:<10}{:>8}{:>10}{:>10}{:>10}{:>10}\n".format(
+            _("Step"), _("Count"), _("Average"), "p50", "p95", _("Max")
+        )
+        for stage in STAGES + ("total",):
+            histogram = histograms.get(stage)
+            if histogram is None:
+                continue
+            text += "{:<10}{:>8}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}\n".format(
+                stage,
+                histogram.count,
+                histogram.average,
+                histogram.percentile(50),
+                histogram.percentile(95),
+                histogram.max,
+            )
+        text += "\n"
+        for name, queue in (
+            (_("Autowarn checks"), self.api.autowarn_queue),
+            (_("Antispam warns"), self.api.antispam_warn_queue),
+        ):
+            stats = queue.stats()
+            text += _(
+                "{name} queue: {depth} pending (max {max_depth}), {processed} done, "
+                "{failed} failed, {coalesced} merged. Average wait {wait:.1f}ms, "
+                "average run {run:.1f}ms.\n"
+            ).format(
+                name=name,
+                depth=stats["depth"],
+                max_depth=stats["max_depth"],
+                processed=stats["processed"],
+                failed=stats["failed"],
+                coalesced=stats["coalesced"],
+                wait=stats["average_wait"] * 1000,
+                run=stats["average_run"] * 1000,
+            )
+        for page in pagify(text):
+            await ctx.send(box(page))
+
     @warnset.group(name="substitutions")
     async def warnset_substitutions(self, ctx: commands.Context):
         """
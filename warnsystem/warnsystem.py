@@ -3,11 +3,12 @@ import discord
 import logging
 import asyncio
 
+from collections import Counter
 from io import BytesIO
 from typing import Optional, TYPE_CHECKING
 from asyncio import TimeoutError as AsyncTimeoutError
 from abc import ABC
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 
 from redbot.core import commands, Config, checks
 from redbot.core.commands.converter import TimedeltaConverter
@@ -19,9 +20,10 @@ from warnsystem.components import WarningsSelector
 
 from . import errors
 from .api import API, UnavailableMember
+from .auditlog import AuditLogWatcher
 from .automod import AutomodMixin
 from .cache import MemoryCache
-from .converters import AdvancedMemberSelect
+from .converters import PREVIEW_SAMPLE_SIZE, AdvancedMemberSelect
 from .settings import SettingsMixin
 
 if TYPE_CHECKING:
@@ -110,6 +112,8 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
             "5": 0xFF4C4C,
         },
         "url": None,  # URL set for the title of all embeds
+        "rerender_cursor": None,  # last modlog message edited by [p]warnset rerender
+        "collect_metrics": False,  # if the time taken by each stage of a warn is measured
         "temporary_warns": {},  # list of temporary warns (need to unmute/unban after some time)
         "automod": {  # everything related to auto moderation
             "enabled": False,
@@ -146,6 +150,8 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
 
         self.cache = MemoryCache(self.bot, self.data)
         self.api = API(self.bot, self.data, self.cache)
+        self.audit_log_watchers = {}  # see on_manual_action
+        self.rerender_tasks = {}  # see warnset rerender
 
         self.task: asyncio.Task
 
@@ -438,6 +444,40 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
             if message:
                 await message.delete()
 
+    async def call_masswarn_preview(
+        self, ctx: commands.Context, level: int, selection: AdvancedMemberSelect
+    ):
+        """Show the number of members matching a mass warn selection, without warning."""
+        total_members = selection.total_members
+        total_unavailable_members = len(selection.unavailable_members)
+        targets = []
+        if total_members:
+            targets.append(
+                _("{total} {members} ({percent}% of the server)").format(
+                    total=total_members,
+                    members=_("members") if total_members > 1 else _("member"),
+                    percent=round((total_members / len(ctx.guild.members) * 100), 2),
+                )
+            )
+        if total_unavailable_members:
+            targets.append(
+                _("{total} {users} not in the server.").format(
+                    total=total_unavailable_members,
+                    users=_("users") if total_unavailable_members > 1 else _("user"),
+                )
+            )
+        sample = "\n".join(
+            f"- {str(x)} ({x.id})"
+            for x in (selection.members + selection.unavailable_members)[:PREVIEW_SAMPLE_SIZE]
+        )
+        text = _(
+            "A level {level} warning would be set on {target}.\n\n"
+            "Sample of the selection:\n{sample}\n\n"
+            "Remove the `--preview` flag to perform the warn."
+        ).format(level=level, target=_(" and ").join(targets), sample=sample)
+        for page in pagify(text):
+            await ctx.send(page)
+
     # all warning commands
     @commands.group(invoke_without_command=True, name="warn")
     @checks.mod_or_permissions(administrator=True)
@@ -568,6 +608,9 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         except commands.BadArgument as e:
             await ctx.send(e)
             return
+        if selection.preview:
+            await self.call_masswarn_preview(ctx, 1, selection)
+            return
         await self.call_masswarn(
             ctx,
             1,
@@ -595,6 +638,9 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         except commands.BadArgument as e:
             await ctx.send(e)
             return
+        if selection.preview:
+            await self.call_masswarn_preview(ctx, 1, selection)
+            return
         await self.call_masswarn(
             ctx,
             1,
@@ -625,6 +671,9 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         except commands.BadArgument as e:
             await ctx.send(e)
             return
+        if selection.preview:
+            await self.call_masswarn_preview(ctx, 2, selection)
+            return
         await self.call_masswarn(
             ctx,
             2,
@@ -652,6 +701,9 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         except commands.BadArgument as e:
             await ctx.send(e)
             return
+        if selection.preview:
+            await self.call_masswarn_preview(ctx, 3, selection)
+            return
         await self.call_masswarn(
             ctx,
             3,
@@ -679,6 +731,9 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         except commands.BadArgument as e:
             await ctx.send(e)
             return
+        if selection.preview:
+            await self.call_masswarn_preview(ctx, 4, selection)
+            return
         await self.call_masswarn(
             ctx,
             4,
@@ -709,6 +764,9 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         except commands.BadArgument as e:
             await ctx.send(e)
             return
+        if selection.preview:
+            await self.call_masswarn_preview(ctx, 5, selection)
+            return
         await self.call_masswarn(
             ctx,
             5,
@@ -746,15 +804,18 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         ):
             await ctx.send(_("You are not allowed to see other's warnings!"))
             return
+        # one read for the summary and all pages of the menu
         cases = await self.api.get_all_cases(ctx.guild, user)
-        if not cases:
+        summary = Counter(x["level"] for x in cases)
+        total_cases = len(cases)
+        if not total_cases:
             await ctx.send(_("That member was never warned."))
             return
-        if 0 < index < len(cases):
+        if 0 < index < total_cases:
             await ctx.send(_("That case doesn't exist."))
             return
 
-        total = lambda level: len([x for x in cases if x["level"] == level])
+        total = lambda level: summary[level]
         warning_str = lambda level, plural: {
             1: (_("Warning"), _("Warnings")),
             2: (_("Mute"), _("Mutes")),
@@ -772,7 +833,7 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         embed = discord.Embed(description=_("User modlog summary."))
         embed.set_author(name=f"{user} | {user.id}", icon_url=user.display_avatar.url)
         embed.add_field(
-            name=_("Total number of warnings: ") + str(len(cases)), value=warn_field, inline=False
+            name=_("Total number of warnings: ") + str(total_cases), value=warn_field, inline=False
         )
         embed.colour = user.top_role.colour
 
@@ -953,18 +1014,30 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
         guild = after.guild
+        if before._roles != after._roles:
+            self.cache.invalidate_automod_exemptions(guild, after)
         mute_role = guild.get_role(await self.cache.get_mute_role(guild))
         if not mute_role:
             return
         if not (mute_role in before.roles and mute_role not in after.roles):
             return
-        if after.id in self.cache.temp_actions:
+        if await self.cache.get_temp_action(guild, after):
             await self.cache.remove_temp_action(guild, after)
             log.info(
                 f"[Guild {guild.id}] The temporary mute of member {after} (ID: {after.id}) "
                 "was ended due to a manual unmute (role removed)."
             )
 
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx: commands.Context):
+        # Red's automod immunity and mod roles settings are cached for the automod
+        if ctx.guild is None or ctx.command.root_parent is None:
+            return
+        if ctx.command.root_parent.name == "autoimmune" or (
+            ctx.command.parent.qualified_name == "set roles"
+        ):
+            self.cache.invalidate_automod_exemptions(ctx.guild)
+
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
         guild = channel.guild
@@ -1005,6 +1078,18 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
     async def on_member_remove(self, member: discord.Member):
         await self.on_manual_action(member.guild, member, 3)
 
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        if entry.action not in (discord.AuditLogAction.kick, discord.AuditLogAction.ban):
+            return
+        guild = entry.guild
+        if (
+            guild.id not in self.audit_log_watchers
+            and not await self.data.guild(guild).log_manual()
+        ):
+            return
+        self._get_audit_log_watcher(guild).feed(entry)
+
     async def on_manual_action(self, guild: discord.Guild, member: discord.Member, level: int):
         # most of this code is from Cog-Creators, modlog cog
         # https://github.com/Cog-Creators/Red-DiscordBot/blob/bc21f779762ec9f460aecae525fdcd634f6c2d85/redbot/core/modlog.py#L68
@@ -1017,56 +1102,59 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
             await self.api.get_modlog_channel(guild, level)
         except errors.NotFound:
             return
-        when = datetime.now(timezone.utc)
-        before = when + timedelta(minutes=1)
-        after = when - timedelta(minutes=1)
-        await asyncio.sleep(10)  # prevent small delays from causing a 5 minute delay on entry
-        attempts = 0
-        action = {
-            3: discord.AuditLogAction.kick,
-            5: discord.AuditLogAction.ban,
-        }[level]
-        # wait up to 15 min to find a matching case
-        while attempts < 3:
-            attempts += 1
-            try:
-                async for entry in guild.audit_logs(action=action, before=before, after=after):
-                    if entry.target.id == member.id and after < entry.created_at < before:
-                        break
-                else:
-                    break
-            except discord.Forbidden:
-                break
-            except discord.HTTPException:
-                pass
-            else:
-                if entry:
-                    if entry.user.id != guild.me.id:
-                        # Don't create modlog entires for the bot's own bans, cogs do this.
-                        mod, reason, date = entry.user, entry.reason, entry.created_at
-                        if isinstance(member, discord.User):
-                            member = UnavailableMember(self.bot, guild._state, member.id)
-                        try:
-                            await self.api.warn(
-                                guild,
-                                [member],
-                                mod,
-                                level,
-                                reason,
-                                date=date,
-                                log_dm=True if level <= 2 else False,
-                                take_action=False,
-                            )
-                        except Exception as e:
-                            log.error(
-                                f"[Guild {guild.id}] Failed to create a case "
-                                "based on manual action. "
-                                f"Member: {member} ({member.id}). Author: {mod} ({mod.id}). "
-                                f"Reason: {reason}",
-                                exc_info=e,
-                            )
-                    return
-            await asyncio.sleep(300)
+        # the audit log isn't scanned for each event, a watcher per guild looks for all pending
+        # actions at once, see auditlog.py
+        # most removals are voluntary leaves, if the gateway sends us audit log entries, we just
+        # wait for a kick entry instead of fetching the audit log
+        poll = level != 3 or not self.bot.intents.moderation
+        self._get_audit_log_watcher(guild).add(member, level, poll=poll)
+
+    def _get_audit_log_watcher(self, guild: discord.Guild) -> AuditLogWatcher:
+        try:
+            return self.audit_log_watchers[guild.id]
+        except KeyError:
+            watcher = AuditLogWatcher(self.bot, guild, self._log_manual_action)
+            self.audit_log_watchers[guild.id] = watcher
+            return watcher
+
+    async def _log_manual_action(
+        self,
+        guild: discord.Guild,
+        member: discord.Member,
+        level: int,
+        entry: discord.AuditLogEntry,
+    ):
+        if entry.user_id == guild.me.id:
+            # Don't create modlog entires for the bot's own bans, cogs do this.
+            return
+        # entries from the gateway may not have the user resolved
+        mod = (
+            entry.user
+            or guild.get_member(entry.user_id)
+            or UnavailableMember(self.bot, guild._state, entry.user_id)
+        )
+        reason, date = entry.reason, entry.created_at
+        if isinstance(member, discord.User):
+            member = UnavailableMember(self.bot, guild._state, member.id)
+        try:
+            await self.api.warn(
+                guild,
+                [member],
+                mod,
+                level,
+                reason,
+                date=date,
+                log_dm=True if level <= 2 else False,
+                take_action=False,
+            )
+        except Exception as e:
+            log.error(
+                f"[Guild {guild.id}] Failed to create a case "
+                "based on manual action. "
+                f"Member: {member} ({member.id}). Author: {mod} ({mod.id}). "
+                f"Reason: {reason}",
+                exc_info=e,
+            )
 
     async def _red_get_data_for_user(self, *, user_id: int):
         readme = (
@@ -1173,4 +1261,12 @@ class WarnSystem(SettingsMixin, AutomodMixin, commands.Cog, metaclass=CompositeM
         # stop checking for unmute and unban
         self.task.cancel()
         self.api.disable_automod()
+        self.api.autowarn_queue.stop()
         self.api.re_pool.close()
+        for watcher in self.audit_log_watchers.values():
+            watcher.cancel()
+        for task in self.rerender_tasks.values():
+            task.cancel()  # position is saved, the job can be resumed later
+        if self.cache.temp_actions_journal is not None:
+            # not compacted, the journal is replayed on next load
+            self.cache.temp_actions_journal.close()